@@ -0,0 +1,118 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import metrics
+from instance_config import InstanceConfig
+
+# Latências abaixo deste valor (segundos) nunca contam como pico
+MIN_SPIKE_LATENCY = 0.05
+
+
+def is_overload_error(error: Exception) -> bool:
+    """True for errors that mean the server is struggling: connection errors, timeouts, 429 and 5xx."""
+    import requests
+
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    # 429 (limite de requisições) e 5xx indicam sobrecarga do servidor
+    return status is not None and (status == 429 or status >= 500)
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit for one Evolution instance (additive increase,
+    multiplicative decrease).
+
+    Every healthy response adds 1/limit to the limit, so it grows by about one
+    slot per round of requests. A 429, a 5xx, a connection error or a latency
+    spike (more than `latency_factor` times the smoothed baseline) multiplies it
+    by `decrease`, at most once per baseline latency so one burst of failures
+    counts as a single congestion signal.
+    """
+
+    def __init__(self, instance: str, initial: float = 4, minimum: float = 1, maximum: float = 32,
+                 decrease: float = 0.5, latency_factor: float = 3.0):
+        self.instance = instance
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.baseline = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._report()
+
+    def _report(self):
+        metrics.UPSTREAM_CONCURRENCY_LIMIT.set(self.instance, value=round(self.limit, 2))
+        metrics.UPSTREAM_IN_FLIGHT.set(self.instance, value=self.in_flight)
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            self._report()
+
+    def release(self, latency: float, overloaded: bool = False):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            spike = self.baseline is not None and latency > max(self.baseline * self.latency_factor, MIN_SPIKE_LATENCY)
+            if overloaded or spike:
+                if now - self._last_decrease > (self.baseline or latency):
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                # Linha de base suavizada, só com respostas saudáveis
+                self.baseline = latency if self.baseline is None else 0.9 * self.baseline + 0.1 * latency
+            self._report()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Holds one in-flight slot for the duration of a request."""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.release(time.perf_counter() - start, overloaded=is_overload_error(e))
+            raise
+        else:
+            self.release(time.perf_counter() - start)
+
+
+_limiters: Dict[str, AIMDLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(instance: str) -> AIMDLimiter:
+    """
+    Returns the limiter of `instance`. Bounds come from EVO_AIMD_INITIAL (4),
+    EVO_AIMD_MIN (1), EVO_AIMD_MAX (32) and EVO_AIMD_LATENCY_FACTOR (3).
+    """
+    limiter = _limiters.get(instance)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(instance)
+            if limiter is None:
+                limiter = _limiters[instance] = AIMDLimiter(
+                    instance,
+                    initial=float(InstanceConfig.getenv("EVO_AIMD_INITIAL", "4")),
+                    minimum=float(InstanceConfig.getenv("EVO_AIMD_MIN", "1")),
+                    maximum=float(InstanceConfig.getenv("EVO_AIMD_MAX", "32")),
+                    latency_factor=float(InstanceConfig.getenv("EVO_AIMD_LATENCY_FACTOR", "3")),
+                )
+    return limiter
+
+
+def limit(instance: str):
+    """Context manager that runs one upstream read within the instance's adaptive limit."""
+    return get_limiter(instance).slot()
@@ -0,0 +1,349 @@
+"""
+Teste de carga do evoapi_mcp com vários clientes MCP simultâneos.
+
+Inicia a Evolution API falsa e o servidor (`evoapi_mcp.py` com transporte
+streamable-http ou sse), cada um em seu processo, e abre `--clients` sessões
+MCP virtuais. Cada sessão chama ferramentas sorteadas segundo `--mix`, com
+argumentos variados tirados dos dados sintéticos, até o fim do teste. As
+chamadas feitas durante a rampa de subida e o aquecimento são descartadas.
+
+Ao final mostra, por ferramenta, a vazão (chamadas por segundo) e as latências
+p50/p95/p99 e máxima, medidas pelo cliente.
+
+Uso:
+    python benchmarks/bench_load.py --clients 50 --duration 30 --latency-ms 20
+    python benchmarks/bench_load.py --mix get_contacts_by_name=5 send_message_to_phone=1 --json carga.json
+    python benchmarks/bench_load.py --server-env EVO_MAX_CONCURRENT_TOOLS=4 --clients 32
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_evolution import FakeData  # noqa: E402
+
+# Peso padrão de cada ferramenta no sorteio das chamadas
+DEFAULT_MIX = {
+    "get_contacts_by_name": 4,
+    "get_group_messages": 3,
+    "find_contact_by_number": 2,
+    "send_message_to_phone": 1,
+    "send_message_to_group": 1,
+}
+
+
+def make_arguments(name, data, rng):
+    """Returns random but valid arguments for the tool `name`."""
+    fmt = "%Y-%m-%d %H:%M:%S"
+    contact = rng.choice(data.contacts)
+    number = contact["remoteJid"].split("@")[0]
+    group_id = rng.choice(data.groups)["id"]
+    if name == "get_contacts_by_name":
+        return {"name": contact["pushName"]}
+    if name == "get_group_messages":
+        end = datetime.now() - timedelta(days=rng.randint(0, 20))
+        return {
+            "group_id": group_id,
+            "start_date": (end - timedelta(days=rng.choice([1, 3, 7]))).strftime(fmt),
+            "end_date": end.strftime(fmt),
+        }
+    if name == "find_contact_by_number":
+        return {"phone_number": number}
+    if name == "send_message_to_phone":
+        return {"cellphone": number, "message": "teste de carga", "campaign": "bench_load"}
+    if name == "send_message_to_group":
+        return {"group_id": group_id, "message": "teste de carga", "campaign": "bench_load"}
+    if name == "get_contact_common_groups":
+        return {"remote_jid": contact["remoteJid"]}
+    if name == "search_messages":
+        return {"query": rng.choice(["nota fiscal", "reunião", "boleto", "entrega"])}
+    return {}
+
+
+def parse_mix(values):
+    if not values:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition("=")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, proc, log_path, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            with open(log_path, encoding="utf-8", errors="replace") as f:
+                raise RuntimeError(f"Servidor encerrou ao iniciar:\n{f.read()}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Servidor não abriu a porta {port} em {timeout:.0f}s (log: {log_path})")
+
+
+def start_backend(args):
+    """Starts the fake Evolution API in its own process and returns (process, environment)."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-u", os.path.join(BENCH_DIR, "fake_evolution.py"),
+            "--port", str(port),
+            "--contacts", str(args.contacts),
+            "--groups", str(args.groups),
+            "--messages-per-chat", str(args.messages_per_chat),
+            "--media-ratio", str(args.media_ratio),
+            "--latency-ms", str(args.latency_ms),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    env = {}
+    # O processo imprime as variáveis de ambiente assim que está ouvindo
+    while "EVO_INSTANCE_DEFAULT" not in env:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("Evolution API falsa encerrou ao iniciar")
+        key, _, value = line.strip().partition("=")
+        env[key] = value
+    return proc, env
+
+
+def start_server(args, backend_env, log_file):
+    """Starts evoapi_mcp.py with an HTTP transport and returns (process, url)."""
+    port = _free_port()
+    env = dict(os.environ)
+    env.update(backend_env)
+    env.update(
+        {
+            # Isola o teste de um .env local
+            "EVO_ENV_FILE": os.devnull,
+            "EVO_EXPORT_DIR": os.path.join(tempfile.gettempdir(), "evoapi_bench_exports"),
+            "EVO_MCP_TRANSPORT": args.transport,
+            "EVO_MCP_HOST": "127.0.0.1",
+            "EVO_MCP_PORT": str(port),
+        }
+    )
+    for item in args.server_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "evoapi_mcp.py")],
+        cwd=ROOT,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    _wait_for_port(port, proc, log_file.name)
+    path = "/mcp" if args.transport == "streamable-http" else "/sse"
+    return proc, f"http://127.0.0.1:{port}{path}"
+
+
+@asynccontextmanager
+async def connect(url, transport):
+    from mcp import ClientSession
+
+    if transport == "sse":
+        from mcp.client.sse import sse_client
+
+        client = sse_client(url)
+    else:
+        from mcp.client.streamable_http import streamablehttp_client
+
+        client = streamablehttp_client(url)
+    async with client as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            yield session
+
+
+class Recorder:
+    """Collects (tool, latency, ok) samples that started inside the measured window."""
+
+    def __init__(self, measure_start, measure_end):
+        self.measure_start = measure_start
+        self.measure_end = measure_end
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+        self.failed_sessions = 0
+
+    def record(self, name, started, elapsed, error=None):
+        if not self.measure_start <= started < self.measure_end:
+            return
+        self.latencies[name].append(elapsed * 1000)
+        if error is not None:
+            self.errors[name] += 1
+            self.error_samples.setdefault(name, error)
+
+
+async def virtual_client(index, args, url, data, mix, recorder, start_at):
+    rng = random.Random(args.seed + index)
+    names, weights = list(mix), list(mix.values())
+    await asyncio.sleep(max(0.0, start_at - time.perf_counter()))
+    try:
+        async with connect(url, args.transport) as session:
+            while time.perf_counter() < recorder.measure_end:
+                name = rng.choices(names, weights)[0]
+                arguments = make_arguments(name, data, rng)
+                started = time.perf_counter()
+                error = None
+                try:
+                    result = await session.call_tool(name, arguments)
+                    if result.isError:
+                        error = " ".join(getattr(block, "text", "") for block in result.content)[:200]
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                recorder.record(name, started, time.perf_counter() - started, error)
+                if args.think_ms:
+                    await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+    except Exception as e:
+        recorder.failed_sessions += 1
+        print(f"Cliente {index} falhou: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+async def run_load(args, url, data, mix):
+    now = time.perf_counter()
+    measure_start = now + args.ramp_up + args.warmup
+    recorder = Recorder(measure_start, measure_start + args.duration)
+    # Sessões abertas aos poucos ao longo da rampa de subida
+    step = args.ramp_up / args.clients if args.clients else 0
+    await asyncio.gather(
+        *(virtual_client(i, args, url, data, mix, recorder, now + i * step) for i in range(args.clients))
+    )
+    return recorder
+
+
+def summarize(recorder, duration):
+    results = {}
+    all_latencies = []
+    for name, latencies in sorted(recorder.latencies.items()):
+        latencies.sort()
+        all_latencies.extend(latencies)
+        results[name] = {
+            "calls": len(latencies),
+            "errors": recorder.errors[name],
+            "throughput": len(latencies) / duration,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1],
+            "error_sample": recorder.error_samples.get(name),
+        }
+    all_latencies.sort()
+    results["total"] = {
+        "calls": len(all_latencies),
+        "errors": sum(recorder.errors.values()),
+        "throughput": len(all_latencies) / duration,
+        "p50_ms": percentile(all_latencies, 50),
+        "p95_ms": percentile(all_latencies, 95),
+        "p99_ms": percentile(all_latencies, 99),
+        "max_ms": all_latencies[-1] if all_latencies else 0.0,
+        "error_sample": None,
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="sessões MCP simultâneas")
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos descartados após a rampa")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="segundos para abrir todas as sessões")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pausa média entre chamadas de um cliente")
+    parser.add_argument("--mix", nargs="*", help="ferramenta=peso (padrão: %s)" % " ".join(
+        f"{name}={weight}" for name, weight in DEFAULT_MIX.items()))
+    parser.add_argument("--transport", choices=["streamable-http", "sse"], default="streamable-http")
+    parser.add_argument("--server-url", help="usa um servidor já em execução (com os mesmos dados falsos)")
+    parser.add_argument("--server-env", nargs="*", default=[], help="KEY=VALUE extras para o servidor")
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--messages-per-chat", type=int, default=500)
+    parser.add_argument("--media-ratio", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência artificial por requisição")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    # Mesma semente da API falsa: só contatos e grupos são necessários para os argumentos
+    data = FakeData(args.contacts, args.groups, messages_per_chat=0, media_bytes=0)
+
+    processes = []
+    log_file = tempfile.NamedTemporaryFile("w", prefix="bench_load_server_", suffix=".log", delete=False)
+    try:
+        url = args.server_url
+        if not url:
+            backend, backend_env = start_backend(args)
+            processes.append(backend)
+            server, url = start_server(args, backend_env, log_file)
+            processes.append(server)
+
+        recorder = asyncio.run(run_load(args, url, data, mix))
+    finally:
+        for proc in reversed(processes):
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        log_file.close()
+
+    results = summarize(recorder, args.duration)
+    print(f"{args.clients} clientes, {args.duration:.0f}s medidos, transporte {args.transport}")
+    header = (
+        f"{'ferramenta':28} {'chamadas':>9} {'erros':>6} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:28} {r['calls']:9d} {r['errors']:6d} {r['throughput']:8.1f} "
+            f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['max_ms']:8.1f}"
+            + (f"  erro: {r['error_sample']}" if r["error_sample"] else "")
+        )
+    if recorder.failed_sessions:
+        print(f"{recorder.failed_sessions} sessões falharam (log do servidor: {log_file.name})")
+    else:
+        os.unlink(log_file.name)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Mede o tempo até a primeira resposta de `tools/list` do servidor stdio.
+
+Cada rodada inicia `evoapi_mcp.py` num processo novo (como o Claude Desktop
+faz), envia `initialize` e `tools/list` e cronometra até a resposta. O script
+termina com código 1 quando a mediana passa do orçamento.
+
+Uso:
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _send(proc, message):
+    proc.stdin.write((json.dumps(message) + "\n").encode())
+    proc.stdin.flush()
+
+
+def _read_response(proc, request_id):
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("Servidor encerrou antes de responder: " + proc.stderr.read().decode(errors="replace"))
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def time_to_list_tools(python=sys.executable):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [python, os.path.join(ROOT, "evoapi_mcp.py")],
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        _send(
+            proc,
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "initialize",
+                "params": {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {},
+                    "clientInfo": {"name": "bench_startup", "version": "0"},
+                },
+            },
+        )
+        _read_response(proc, 1)
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        response = _read_response(proc, 2)
+        elapsed = time.perf_counter() - start
+        return elapsed, len(response["result"]["tools"])
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms", type=float, default=float(os.getenv("EVO_STARTUP_BUDGET_MS", "1500")),
+        help="orçamento para a mediana, em ms (padrão: EVO_STARTUP_BUDGET_MS ou 1500)",
+    )
+    args = parser.parse_args()
+
+    samples = []
+    tools = 0
+    for _ in range(args.runs):
+        elapsed, tools = time_to_list_tools()
+        samples.append(elapsed * 1000)
+
+    median = statistics.median(samples)
+    print(f"tools/list: {tools} ferramentas")
+    print(f"tempo até tools/list (ms): mediana={median:.1f} min={min(samples):.1f} max={max(samples):.1f}")
+
+    if median > args.budget_ms:
+        print(f"FALHOU: mediana {median:.1f} ms acima do orçamento de {args.budget_ms:.0f} ms")
+        return 1
+    print(f"OK: dentro do orçamento de {args.budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Benchmark das ferramentas MCP do evoapi_mcp contra a Evolution API falsa.
+
+Para cada ferramenta mede a latência (mediana e máximo de várias execuções),
+o número de requisições e bytes recebidos da API na primeira chamada (cache
+frio) e o pico de memória alocada (tracemalloc, numa execução separada para
+não distorcer a latência).
+
+Uso:
+    python benchmarks/bench_tools.py --contacts 5000 --groups 50 --messages-per-chat 2000
+    python benchmarks/bench_tools.py --only get_contacts get_group_messages --json resultado.json
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_evolution import FakeData, FakeEvolutionServer  # noqa: E402
+
+
+def build_cases(data: FakeData):
+    """
+    Returns (tool name, kwargs) pairs covering every tool in evoapi_mcp, in run
+    order: the reading tools fill the local store before search_messages, and
+    the sends come before get_delivery_status.
+    """
+    group_id = data.groups[0]["id"] if data.groups else "0@g.us"
+    group_ids = [g["id"] for g in data.groups[:3]] or [group_id]
+    contact = data.contacts[0] if data.contacts else {"remoteJid": "5511900000000@s.whatsapp.net", "pushName": "x"}
+    number = contact["remoteJid"].split("@")[0]
+    now = datetime.now()
+    fmt = "%Y-%m-%d %H:%M:%S"
+    week = {"start_date": (now - timedelta(days=7)).strftime(fmt), "end_date": now.strftime(fmt)}
+
+    return [
+        ("configure_profiling", {}),
+        ("list_instances", {}),
+        ("get_groups", {}),
+        ("get_group_messages", {"group_id": group_id, **week}),
+        ("get_multi_group_messages", {"group_ids": group_ids, **week}),
+        ("get_group_digest", {"group_id": group_id, **week}),
+        ("get_contacts", {}),
+        ("get_contacts_by_name", {"name": contact["pushName"].split()[0]}),
+        ("get_contacts_by_phone_number", {"phone_number": contact["remoteJid"]}),
+        ("find_contact_by_number", {"phone_number": number}),
+        ("get_contact_profile_picture", {"remote_jid": contact["remoteJid"]}),
+        ("get_contact_common_groups", {"remote_jid": contact["remoteJid"]}),
+        ("check_phone_exists", {"phone_number": contact["remoteJid"]}),
+        ("fecth_all_contact_messages", {"remote_jid": group_id}),
+        ("fecth_interval_contact_messages", {"remote_jid": group_id, **week}),
+        ("get_export_job", {}),
+        ("export_contact_messages", {"remote_jid": group_id}),
+        ("search_messages", {"query": "relatório prazo"}),
+        ("send_message_to_group", {"group_id": group_id, "message": "benchmark"}),
+        ("send_message_to_phone", {"cellphone": number, "message": "benchmark"}),
+        ("get_delivery_status", {}),
+    ]
+
+
+def registered_tools(module):
+    """Names of the tools registered on the module's FastMCP server."""
+    return [t.name for t in asyncio.run(module.mcp.list_tools())]
+
+
+def missing_cases(cases, module):
+    """Registered tools without a benchmark case."""
+    covered = {name for name, _ in cases}
+    return [name for name in registered_tools(module) if name not in covered]
+
+
+def call(fn, kwargs):
+    result = fn(**kwargs)
+    # Ferramentas assíncronas (exportações com progresso) rodam sem Context
+    if inspect.iscoroutine(result):
+        result = asyncio.run(result)
+    return result
+
+
+def run_case(server, fn, kwargs, repeat):
+    latencies = []
+    error = None
+    requests = received = 0
+    for i in range(repeat):
+        server.reset_counters()
+        start = time.perf_counter()
+        try:
+            call(fn, kwargs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latencies.append((time.perf_counter() - start) * 1000)
+        if i == 0:
+            # Requisições e bytes da primeira chamada (cache frio)
+            requests = server.total_requests()
+            received = server.total_bytes()
+
+    tracemalloc.start()
+    try:
+        call(fn, kwargs)
+    except Exception:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": statistics.median(latencies),
+        "max_ms": max(latencies),
+        "upstream_requests": requests,
+        "upstream_bytes": received,
+        "peak_mem_kb": peak / 1024,
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--messages-per-chat", type=int, default=500)
+    parser.add_argument("--media-ratio", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latência artificial por requisição")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="ferramentas a medir (padrão: todas)")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    data = FakeData(args.contacts, args.groups, args.messages_per_chat, args.media_ratio)
+    server = FakeEvolutionServer(data, latency_ms=args.latency_ms).start()
+
+    # Isola o benchmark de um .env local
+    os.environ["EVO_ENV_FILE"] = os.devnull
+    os.environ.setdefault("EVO_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "evoapi_bench_exports"))
+    os.environ.update(server.env())
+
+    import evoapi_mcp
+
+    cases = build_cases(data)
+    missing = missing_cases(cases, evoapi_mcp)
+    if missing:
+        server.stop()
+        sys.exit(f"Ferramentas sem caso no benchmark: {', '.join(missing)}")
+
+    results = {}
+    try:
+        for name, kwargs in cases:
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_case(server, getattr(evoapi_mcp, name), kwargs, args.repeat)
+    finally:
+        server.stop()
+
+    header = f"{'ferramenta':34} {'mediana ms':>11} {'máx ms':>9} {'reqs':>5} {'KB api':>9} {'pico KB':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:34} {r['median_ms']:11.1f} {r['max_ms']:9.1f} {r['upstream_requests']:5d} "
+            f"{r['upstream_bytes'] / 1024:9.1f} {r['peak_mem_kb']:9.1f}"
+            + (f"  erro: {r['error']}" if r["error"] else "")
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"params": vars(args), "results": results},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Servidor HTTP local que imita os endpoints da Evolution API usados pelo evoapi_mcp.
+
+Emula `chat/findContacts`, `chat/findMessages` (com paginação `pages`/`records`),
+`group/fetchAllGroups` (com `getParticipants`), `chat/fetchProfilePictureUrl`,
+`message/sendText` e `chat/findStatusMessage` sobre dados sintéticos de tamanho
+configurável, e conta as requisições e os bytes servidos por endpoint.
+
+Uso isolado:
+    python benchmarks/fake_evolution.py --port 8081 --contacts 5000 --groups 50
+"""
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+INSTANCE_TOKEN = "fake-instance-token"
+API_KEY = "fake-api-key"
+
+_WORDS = (
+    "reunião amanhã projeto nota fiscal boleto entrega cliente pedido orçamento "
+    "contrato prazo relatório ok obrigado bom dia boa tarde vamos confirmar agenda"
+).split()
+
+
+class FakeData:
+    """Synthetic contacts, groups and chat histories generated from a fixed seed."""
+
+    def __init__(self, contacts=1000, groups=20, messages_per_chat=500, media_ratio=0.1,
+                 media_bytes=20_000, days=30, seed=42):
+        rng = random.Random(seed)
+        now = int(time.time())
+        self.instance = "bench"
+
+        self.contacts = []
+        for i in range(contacts):
+            number = f"5511{900000000 + i}"
+            self.contacts.append(
+                {
+                    "id": f"c{i}",
+                    "remoteJid": f"{number}@s.whatsapp.net",
+                    "pushName": f"{rng.choice(['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa'])} {i}",
+                    "profilePicUrl": None,
+                    "createdAt": "2025-01-01T00:00:00.000Z",
+                    "updatedAt": "2025-01-01T00:00:00.000Z",
+                    "instanceId": self.instance,
+                }
+            )
+
+        self.groups = []
+        for i in range(groups):
+            self.groups.append(
+                {
+                    "id": f"1203634000{i:08d}@g.us",
+                    "subject": f"Grupo {i}",
+                    "subjectOwner": None,
+                    "subjectTime": now - 86400 * days,
+                    "pictureUrl": None,
+                    "size": rng.randint(3, 200),
+                    "creation": now - 86400 * days,
+                    "owner": None,
+                    "restrict": False,
+                    "announce": False,
+                    "isCommunity": False,
+                    "isCommunityAnnounce": False,
+                }
+            )
+
+        media_payload = base64.b64encode(rng.randbytes(media_bytes)).decode() if media_bytes else None
+        senders = [c["remoteJid"] for c in self.contacts[:50]] or ["5511900000000@s.whatsapp.net"]
+
+        # Históricos por chat, em ordem cronológica
+        self.messages = {}
+        chats = [g["id"] for g in self.groups] + [c["remoteJid"] for c in self.contacts[:10]]
+        for jid in chats:
+            is_group = jid.endswith("@g.us")
+            records = []
+            for j in range(messages_per_chat):
+                timestamp = now - int(86400 * days * (messages_per_chat - j) / max(messages_per_chat, 1))
+                sender = rng.choice(senders)
+                key = {
+                    "id": uuid.UUID(int=rng.getrandbits(128)).hex.upper()[:20],
+                    "fromMe": rng.random() < 0.2,
+                    "remoteJid": jid,
+                }
+                if is_group:
+                    key["participant"] = sender
+
+                record = {
+                    "id": key["id"].lower(),
+                    "key": key,
+                    "pushName": f"Pessoa {sender[6:10]}",
+                    "messageTimestamp": timestamp,
+                    "source": "android",
+                    "instanceId": self.instance,
+                }
+                text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(2, 30)))
+                if media_payload and rng.random() < media_ratio:
+                    record["messageType"] = "imageMessage"
+                    record["message"] = {
+                        "imageMessage": {"url": "https://example.invalid/m", "mimetype": "image/jpeg", "caption": text},
+                        "base64": media_payload,
+                    }
+                else:
+                    record["messageType"] = "conversation"
+                    record["message"] = {"conversation": text}
+                records.append(record)
+            self.messages[jid] = records
+
+
+def _iso_to_timestamp(value):
+    # O controller envia horário local com sufixo "Z"; interpretar da mesma forma
+    return int(datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").timestamp())
+
+
+class FakeEvolutionServer:
+    """Runs the fake API in a background thread and keeps per-endpoint counters."""
+
+    def __init__(self, data: FakeData, host="127.0.0.1", port=0, latency_ms=0.0):
+        self.data = data
+        self.latency = latency_ms / 1000.0
+        self.requests = Counter()
+        self.bytes_sent = Counter()
+        self.sent_messages = []
+        # keyId -> status atual das mensagens enviadas, avançado por ack()
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+        handler = type("FakeEvolutionHandler", (_Handler,), {"server_state": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fake-evolution", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests.clear()
+            self.bytes_sent.clear()
+
+    def total_requests(self):
+        return sum(self.requests.values())
+
+    def total_bytes(self):
+        return sum(self.bytes_sent.values())
+
+    def record(self, endpoint, size):
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.bytes_sent[endpoint] += size
+
+    def env(self):
+        """Environment variables that point evoapi_mcp to this server."""
+        return {
+            "EVO_INSTANCES": self.data.instance,
+            f"EVO_INSTANCE_{self.data.instance}_URL": self.url,
+            f"EVO_INSTANCE_{self.data.instance}_TOKEN": INSTANCE_TOKEN,
+            f"EVO_INSTANCE_{self.data.instance}_APIKEY": API_KEY,
+            "EVO_INSTANCE_DEFAULT": self.data.instance,
+        }
+
+    # ------------------------------------------------------------------
+    # endpoints
+    # ------------------------------------------------------------------
+    def find_contacts(self, body):
+        where = (body or {}).get("where") or {}
+        remote_jid = where.get("remoteJid")
+        if not remote_jid:
+            return self.data.contacts
+        digits = "".join(filter(str.isdigit, remote_jid.split("@")[0]))
+        return [c for c in self.data.contacts if c["remoteJid"] == remote_jid or c["remoteJid"].startswith(digits + "@")]
+
+    def find_messages(self, body, query):
+        body = body or {}
+        where = body.get("where") or {}
+        jid = (where.get("key") or {}).get("remoteJid")
+        records = self.data.messages.get(jid, [])
+
+        interval = where.get("messageTimestamp") or {}
+        if interval.get("gte"):
+            start = _iso_to_timestamp(interval["gte"])
+            records = [r for r in records if r["messageTimestamp"] >= start]
+        if interval.get("lte"):
+            end = _iso_to_timestamp(interval["lte"])
+            records = [r for r in records if r["messageTimestamp"] <= end]
+
+        # A API mais recente primeiro, como a Evolution
+        records = records[::-1]
+
+        page = int(query.get("page", [body.get("page", 1)])[0])
+        limit = int(query.get("limit", [body.get("offset", 50)])[0])
+        pages = max(1, -(-len(records) // limit))
+        start = (page - 1) * limit
+        return {
+            "messages": {
+                "total": len(records),
+                "pages": pages,
+                "currentPage": page,
+                "records": records[start:start + limit],
+            }
+        }
+
+    def fetch_all_groups(self, query):
+        if (query.get("getParticipants") or ["false"])[0] != "true":
+            return self.data.groups
+        # Cada contato participa do grupo de índice (posição do contato % número de grupos)
+        count = len(self.data.groups)
+        return [
+            {
+                **group,
+                "participants": [
+                    {"id": contact["remoteJid"], "admin": None}
+                    for contact in self.data.contacts[i::count]
+                ],
+            }
+            for i, group in enumerate(self.data.groups)
+        ]
+
+    def fetch_profile_picture_url(self, body):
+        number = str((body or {}).get("number", "")).split("@")[0]
+        return {"wuid": f"{number}@s.whatsapp.net", "profilePictureUrl": f"https://example.invalid/pic/{number}.jpg"}
+
+    def send_text(self, body):
+        body = body or {}
+        key_id = uuid.uuid4().hex.upper()[:20]
+        number = str(body.get("number", ""))
+        jid = number if "@" in number else f"{number}@s.whatsapp.net"
+        with self._lock:
+            self.sent_messages.append({"id": key_id, "remoteJid": jid, "text": body.get("text")})
+            self.statuses[key_id] = "PENDING"
+        return {
+            "key": {"remoteJid": jid, "fromMe": True, "id": key_id},
+            "message": {"conversation": body.get("text")},
+            "messageTimestamp": int(time.time()),
+            "status": "PENDING",
+        }
+
+    def ack(self, key_id, status):
+        """Advances the delivery status of a sent message, as the phone would."""
+        with self._lock:
+            self.statuses[key_id] = status
+
+    def find_status_message(self, body):
+        where = (body or {}).get("where") or {}
+        with self._lock:
+            return [
+                {"keyId": sent["id"], "remoteJid": sent["remoteJid"], "fromMe": True, "status": self.statuses[sent["id"]]}
+                for sent in self.sent_messages
+                if (not where.get("remoteJid") or sent["remoteJid"] == where["remoteJid"])
+                and (not where.get("id") or sent["id"] == where["id"])
+            ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_state: FakeEvolutionServer = None
+
+    def _route(self, method):
+        parsed = urlparse(self.path)
+        parts = [p for p in parsed.path.split("/") if p]
+        query = parse_qs(parsed.query)
+        body = None
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body = json.loads(raw) if raw else {}
+
+        state = self.server_state
+        if state.latency:
+            time.sleep(state.latency)
+
+        endpoint = "/".join(parts[:2])
+        if endpoint == "chat/findContacts" and method == "POST":
+            return endpoint, state.find_contacts(body)
+        if endpoint == "chat/findMessages" and method == "POST":
+            return endpoint, state.find_messages(body, query)
+        if endpoint == "group/fetchAllGroups" and method == "GET":
+            return endpoint, state.fetch_all_groups(query)
+        if endpoint == "chat/fetchProfilePictureUrl" and method == "POST":
+            return endpoint, state.fetch_profile_picture_url(body)
+        if endpoint == "chat/findStatusMessage" and method == "POST":
+            return endpoint, state.find_status_message(body)
+        if endpoint == "message/sendText" and method == "POST":
+            return endpoint, state.send_text(body)
+        return endpoint, None
+
+    def _handle(self, method):
+        endpoint, result = self._route(method)
+        status = 200 if result is not None else 404
+        data = json.dumps(result if result is not None else {"error": "not found"}).encode()
+        self.server_state.record(endpoint, len(data))
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--messages-per-chat", type=int, default=500)
+    parser.add_argument("--media-ratio", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    data = FakeData(args.contacts, args.groups, args.messages_per_chat, args.media_ratio)
+    server = FakeEvolutionServer(data, args.host, args.port, args.latency_ms).start()
+    for key, value in server.env().items():
+        print(f"{key}={value}")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
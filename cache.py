@@ -0,0 +1,131 @@
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import metrics
+from instance_config import InstanceConfig
+
+
+class StaleList(list):
+    """
+    A result served from old data because the Evolution API could not be reached;
+    `note` tells the user how old it is and why.
+    """
+
+    def __init__(self, items, note: str):
+        super().__init__(items)
+        self.note = note
+
+
+def describe_age(seconds: float) -> str:
+    if seconds < 120:
+        return f"{seconds:.0f} s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with a time-to-live per entry.
+
+    Expired entries are kept (not served by `get`) so callers can still fall
+    back to the last known value with `get_stale`. Entries restored from a
+    snapshot are decoded on first access (see `put_lazy`).
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._pending: Dict[Hashable, Tuple[float, Callable[[], Any]]] = {}
+
+    def _entry(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        # Chamado com o lock adquirido
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            stored_at, loader = pending
+            try:
+                self._entries[key] = (stored_at, loader())
+            except Exception as e:
+                print(f"Erro ao decodificar {self.name}/{key} do snapshot: {e}", file=sys.stderr)
+        return self._entries.get(key)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entry(key)
+        hit = entry is not None and time.time() - entry[0] < self.ttl
+        metrics.record_cache(self.name, hit)
+        return entry[1] if hit else None
+
+    def get_stale(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Returns (value, age in seconds) even if the entry expired."""
+        with self._lock:
+            entry = self._entry(key)
+        if entry is None:
+            return None
+        return entry[1], time.time() - entry[0]
+
+    def put(self, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._entries[key] = (stored_at if stored_at is not None else time.time(), value)
+
+    def put_lazy(self, key: Hashable, loader: Callable[[], Any], stored_at: Optional[float] = None):
+        """Stores an entry whose value is only built by `loader` when first read."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._pending[key] = (stored_at if stored_at is not None else time.time(), loader)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._pending.clear()
+            else:
+                self._entries.pop(key, None)
+                self._pending.pop(key, None)
+
+    def items(self):
+        """Copy of the (key, (stored_at, value)) pairs, for persistence. Decodes pending entries."""
+        with self._lock:
+            for key in list(self._pending):
+                self._entry(key)
+            return list(self._entries.items())
+
+
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> TTLCache:
+    """
+    Returns the process-wide cache `name`, shared by every client of the server.
+
+    The TTL comes from EVO_CACHE_TTL_<NAME> or EVO_CACHE_TTL (seconds, default 60).
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                ttl = InstanceConfig.getenv(
+                    f"EVO_CACHE_TTL_{name.upper()}", InstanceConfig.getenv("EVO_CACHE_TTL", "60")
+                )
+                cache = _caches[name] = TTLCache(name, float(ttl))
+    return cache
+
+
+def all_caches() -> Dict[str, TTLCache]:
+    """The caches created so far, by name."""
+    with _caches_lock:
+        return dict(_caches)
@@ -0,0 +1,162 @@
+import atexit
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import all_caches, get_cache
+from contact_table import ContactTable
+from instance_config import InstanceConfig
+
+MAGIC = b"EVOSNAP\0"
+# Incrementar quando o layout mudar; snapshots de outra versão são ignorados
+FORMAT_VERSION = 1
+# magic, versão, ordem dos bytes (0 little, 1 big), tamanho do índice JSON
+_HEADER = struct.Struct("<8sHBI")
+
+_save_lock = threading.Lock()
+
+
+def get_path() -> Optional[str]:
+    """Snapshot file from EVO_SNAPSHOT_PATH; snapshots are disabled when unset."""
+    return InstanceConfig.getenv("EVO_SNAPSHOT_PATH") or None
+
+
+def _encode(value: Any) -> Optional[Tuple[str, Dict[str, Any], Dict[str, bytes]]]:
+    if isinstance(value, ContactTable):
+        meta, sections = value.to_sections()
+        return "contact_table", meta, sections
+    try:
+        return "json", {}, {"json": json.dumps(value, ensure_ascii=False).encode("utf-8")}
+    except (TypeError, ValueError):
+        return None
+
+
+def save(path: Optional[str] = None) -> int:
+    """
+    Writes every cache entry to the snapshot file and returns how many were
+    saved. The file is written next to the target and renamed, so readers
+    never see a partial snapshot. Values that are neither ContactTables nor
+    JSON-serializable are skipped.
+    """
+    path = path or get_path()
+    if not path:
+        return 0
+
+    with _save_lock:
+        entries: List[Dict[str, Any]] = []
+        blobs: List[bytes] = []
+        offset = 0
+        for name, cache in all_caches().items():
+            for key, (stored_at, value) in cache.items():
+                encoded = _encode(value)
+                if encoded is None or not isinstance(key, str):
+                    continue
+                kind, meta, sections = encoded
+                layout = {}
+                for section, blob in sections.items():
+                    layout[section] = [offset, len(blob)]
+                    blobs.append(blob)
+                    offset += len(blob)
+                entries.append(
+                    {"cache": name, "key": key, "stored_at": stored_at, "kind": kind, "meta": meta, "sections": layout}
+                )
+
+        index = json.dumps(
+            {"version": FORMAT_VERSION, "created_at": time.time(), "entries": entries}, ensure_ascii=False
+        ).encode("utf-8")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == "big", len(index)))
+            f.write(index)
+            for blob in blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        return len(entries)
+
+
+def _loader(mapped: mmap.mmap, data_start: int, entry: Dict[str, Any]):
+    def load():
+        sections = {
+            name: memoryview(mapped)[data_start + start:data_start + start + size]
+            for name, (start, size) in entry["sections"].items()
+        }
+        if entry["kind"] == "contact_table":
+            return ContactTable.from_sections(entry["meta"], sections)
+        return json.loads(bytes(sections["json"]))
+
+    return load
+
+
+def load(path: Optional[str] = None) -> int:
+    """
+    Memory-maps the snapshot and registers its entries in the caches, to be
+    decoded only when first read. Returns how many entries were restored.
+
+    Entries are restored as fresh, so the first calls are served from them;
+    callers should revalidate in the background (see warmup). Entries older
+    than EVO_SNAPSHOT_MAX_AGE seconds (default 86400) are not restored.
+    """
+    path = path or get_path()
+    if not path or not os.path.exists(path):
+        return 0
+
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, big_endian, index_size = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or bool(big_endian) != (sys.byteorder == "big"):
+            print(f"Snapshot de cache {path} ignorado: formato incompatível.", file=sys.stderr)
+            return 0
+        data_start = _HEADER.size + index_size
+        index = json.loads(bytes(mapped[_HEADER.size:data_start]))
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Snapshot de cache {path} ignorado: {e}", file=sys.stderr)
+        return 0
+
+    max_age = float(InstanceConfig.getenv("EVO_SNAPSHOT_MAX_AGE", "86400"))
+    now = time.time()
+    restored = 0
+    for entry in index["entries"]:
+        if now - entry["stored_at"] > max_age:
+            continue
+        get_cache(entry["cache"]).put_lazy(entry["key"], _loader(mapped, data_start, entry), stored_at=now)
+        restored += 1
+    return restored
+
+
+def _save_quietly():
+    try:
+        save()
+    except Exception as e:
+        print(f"Erro ao gravar o snapshot de cache: {e}", file=sys.stderr)
+
+
+def start_snapshots() -> int:
+    """
+    Restores the snapshot at EVO_SNAPSHOT_PATH, then saves it again every
+    EVO_SNAPSHOT_INTERVAL seconds (default 300) and at shutdown.
+
+    Returns how many entries were restored; does nothing when the path is unset.
+    """
+    if not get_path():
+        return 0
+    restored = load()
+
+    interval = float(InstanceConfig.getenv("EVO_SNAPSHOT_INTERVAL", "300"))
+
+    def run():
+        while True:
+            time.sleep(interval)
+            _save_quietly()
+
+    threading.Thread(target=run, name="evo-snapshot", daemon=True).start()
+    atexit.register(_save_quietly)
+    return restored
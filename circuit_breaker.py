@@ -0,0 +1,129 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import requests
+
+import metrics
+from adaptive_limiter import is_overload_error
+from instance_config import InstanceConfig
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor do gauge evoapi_circuit_state por estado
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while an instance's circuit is open."""
+
+
+def describe_failure(error: Exception) -> str:
+    """Short reason for user-facing staleness notes."""
+    if isinstance(error, CircuitOpenError):
+        return str(error)
+    return type(error).__name__
+
+
+class CircuitBreaker:
+    """
+    Per-instance circuit breaker for Evolution API calls.
+
+    After `failure_threshold` consecutive failures (connection errors, timeouts,
+    429 or 5xx) the circuit opens and calls fail immediately with
+    CircuitOpenError. After `reset_timeout` seconds one probe call is let
+    through (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, instance: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.instance = instance
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._report()
+
+    def _report(self):
+        metrics.CIRCUIT_STATE.set(self.instance, value=_STATE_VALUES[self.state])
+
+    def before_call(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+                self._probing = False
+                self._report()
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(
+                f"Instância {self.instance} indisponível após falhas seguidas; "
+                f"nova tentativa em {max(remaining, 0):.0f}s."
+            )
+
+    def on_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self._report()
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._report()
+
+    @contextmanager
+    def guard(self):
+        """Wraps one upstream call; only overload-type errors count as failures."""
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if is_overload_error(e):
+                self.on_failure()
+            else:
+                self.on_success()
+            raise
+        else:
+            self.on_success()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(instance: str) -> CircuitBreaker:
+    """
+    Returns the breaker of `instance`, configured by EVO_CIRCUIT_FAILURES
+    (default 5) and EVO_CIRCUIT_RESET_SECONDS (default 30).
+    """
+    breaker = _breakers.get(instance)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(instance)
+            if breaker is None:
+                breaker = _breakers[instance] = CircuitBreaker(
+                    instance,
+                    failure_threshold=int(InstanceConfig.getenv("EVO_CIRCUIT_FAILURES", "5")),
+                    reset_timeout=float(InstanceConfig.getenv("EVO_CIRCUIT_RESET_SECONDS", "30")),
+                )
+    return breaker
+
+
+def guard(instance: str):
+    """Context manager that fails fast while the instance's circuit is open."""
+    return get_breaker(instance).guard()
@@ -0,0 +1,92 @@
+import threading
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import json_stream
+from instance_config import InstanceConfig
+
+_clients: Dict[Tuple[str, str], object] = {}
+_client_class = None
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def get_timeout() -> Tuple[float, float]:
+    """(connect, read) timeout for Evolution API calls: EVO_HTTP_CONNECT_TIMEOUT (5s) and EVO_HTTP_TIMEOUT (30s)."""
+    return (
+        float(InstanceConfig.getenv("EVO_HTTP_CONNECT_TIMEOUT", "5")),
+        float(InstanceConfig.getenv("EVO_HTTP_TIMEOUT", "30")),
+    )
+
+
+def _get_client_class():
+    global _client_class
+    if _client_class is None:
+        from evolutionapi.client import EvolutionClient
+
+        class PooledEvolutionClient(EvolutionClient):
+            """
+            EvolutionClient whose JSON GET/POST calls go through the shared session
+            with timeouts. 429 and 5xx responses raise HTTPError so the circuit
+            breaker and the adaptive limiter can recognize them.
+            """
+
+            def _send(self, method, endpoint, instance_token=None, **kwargs):
+                response = get_session(self.base_url).request(
+                    method,
+                    self._get_full_url(endpoint),
+                    headers=self._get_headers(instance_token),
+                    timeout=get_timeout(),
+                    **kwargs,
+                )
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.close()
+                    response.raise_for_status()
+                return response
+
+            def get(self, endpoint: str, instance_token: str = None):
+                return self._handle_response(self._send("GET", endpoint, instance_token))
+
+            def post(self, endpoint: str, data: dict = None, instance_token: str = None, files: dict = None):
+                if files:
+                    # Envio multipart continua na implementação original
+                    return super().post(endpoint, data, instance_token, files)
+                # Decodificada à medida que chega; findMessages usa MessageService, que descarta a mídia inline
+                return json_stream.load(self._send("POST", endpoint, instance_token, json=data, stream=True))
+
+        _client_class = PooledEvolutionClient
+    return _client_class
+
+
+def get_client(base_url: str, api_token: str):
+    """Returns the shared EvolutionClient for the given server and API key."""
+    key = (base_url, api_token)
+    client = _clients.get(key)
+    if client is None:
+        client_class = _get_client_class()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = client_class(base_url=base_url, api_token=api_token)
+    return client
+
+
+def get_session(base_url: str) -> requests.Session:
+    """
+    Returns a shared `requests.Session` for the server, so direct REST calls
+    reuse keep-alive connections. The pool size follows EVO_HTTP_POOL_SIZE.
+    """
+    session = _sessions.get(base_url)
+    if session is None:
+        with _lock:
+            session = _sessions.get(base_url)
+            if session is None:
+                pool_size = int(InstanceConfig.getenv("EVO_HTTP_POOL_SIZE", "32"))
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _sessions[base_url] = session
+    return session
@@ -0,0 +1,126 @@
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+FORMATS = ("parquet", "arrow")
+
+# Extensão do arquivo gerado por formato
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Exportação colunar requer o pacote opcional pyarrow: pip install 'evoapi-mcp[export]'"
+        ) from e
+    return pyarrow
+
+
+class ColumnarWriter:
+    """
+    Streams rows (dicts) into a Parquet or Arrow IPC file.
+
+    Rows are buffered and flushed as one row group / record batch every
+    `row_group_size` rows, so memory stays bounded however long the export.
+    The file is written to `path + ".tmp"` and only moved to `path` by a
+    successful close; `abort` (or an exception inside the with block) removes it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fields: Dict[str, str],
+        fmt: str = "parquet",
+        columns: Optional[Sequence[str]] = None,
+        compression: str = "zstd",
+        row_group_size: int = 50_000,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato inválido: {fmt}. Use um de: {', '.join(FORMATS)}")
+        columns = list(columns) if columns else list(fields)
+        unknown = [c for c in columns if c not in fields]
+        if unknown:
+            raise ValueError(f"Colunas desconhecidas: {', '.join(unknown)}. Disponíveis: {', '.join(fields)}")
+
+        pa = _require_pyarrow()
+        self._pa = pa
+        self.path = path
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self._buffer: List[dict] = []
+        self.schema = pa.schema([(name, getattr(pa, fields[name])()) for name in columns])
+        self._tmp_path = path + ".tmp"
+
+        try:
+            if fmt == "parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self._tmp_path, self.schema, compression=compression)
+            else:
+                self._sink = pa.OSFile(self._tmp_path, "wb")
+                self._writer = pa.ipc.new_file(
+                    self._sink, self.schema, options=pa.ipc.IpcWriteOptions(compression=compression)
+                )
+        except BaseException:
+            self._close_files()
+            self._remove_tmp()
+            raise
+
+    def write_rows(self, rows: Iterable[dict]):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        table = self._pa.Table.from_pydict(
+            {name: [row.get(name) for row in self._buffer] for name in self.columns}, schema=self.schema
+        )
+        # Cada descarga vira um row group (Parquet) ou um record batch (Arrow)
+        self._writer.write_table(table)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        try:
+            self.flush()
+            self._writer.close()
+            if hasattr(self, "_sink"):
+                self._sink.close()
+        except BaseException:
+            self.abort()
+            raise
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discards the partial file; `path` is left as it was."""
+        self._buffer = []
+        self._close_files()
+        self._remove_tmp()
+
+    def _close_files(self):
+        for handle in (getattr(self, "_writer", None), getattr(self, "_sink", None)):
+            if handle is None:
+                continue
+            try:
+                handle.close()
+            except Exception:
+                pass
+
+    def _remove_tmp(self):
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
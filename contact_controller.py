@@ -1,15 +1,16 @@
-import os
 from datetime import datetime
-from dotenv import load_dotenv
-from evolutionapi.client import EvolutionClient
 
+import adaptive_limiter
+import circuit_breaker
+import client_pool
+import metrics
+from cache import StaleList, describe_age, get_cache
+from circuit_breaker import describe_failure
 from contact import Contact
 from contact_service import ContactService
+from contact_table import ContactTable
+from event_store import get_store
 from instance_config import InstanceConfig
-from message_sandeco import MessageSandeco
-
-# Load env variables
-load_dotenv()
 
 
 class ContactController:
@@ -22,42 +23,104 @@ class ContactController:
         self.instance_id = creds.id
         self.instance_token = creds.token
         self.base_url = creds.url
-        self.api_token = os.getenv(f"EVO_INSTANCE_{self.instance_id}_APIKEY", os.getenv("EVO_API_TOKEN"))
+        self.api_token = creds.api_key
 
         if not all([self.base_url, self.api_token, self.instance_id, self.instance_token]):
             raise ValueError("Variáveis de ambiente necessárias não configuradas corretamente para a instância.")
 
-        self.client = EvolutionClient(base_url=self.base_url, api_token=self.api_token)
+        self.client = client_pool.get_client(self.base_url, self.api_token)
         self.contacts = []
+        # Preenchido quando a lista veio de um cache expirado por falha da API
+        self.stale_note = None
 
-    def fetch_contacts(self):
-        contact_service = ContactService(self.client)
-        contacts_data = contact_service.fetch_all_contacts(
-            instance_id=self.instance_id, instance_token=self.instance_token
-        )
+    def fetch_contacts(self, refresh: bool = False):
+        """
+        Loads the contact directory (event store, shared cache or the API).
+        `refresh` skips the cache and downloads it again, e.g. to revalidate
+        entries restored from a snapshot.
+        """
+        store = get_store()
+        live = store.is_live(self.instance_id, "contacts")
+        metrics.record_cache("event_store_contacts", live)
+        if live:
+            contacts_data = store.get_contacts(self.instance_id)
+        else:
+            # Cache compartilhado entre todos os clientes do servidor
+            contacts_cache = get_cache("contacts")
+            contacts_data = None if refresh else contacts_cache.get(self.instance_id)
+            if contacts_data is None:
+                contact_service = ContactService(self.client)
+                # Sem webhook, os registros vão direto da resposta para a tabela compacta
+                webhook_active = store.is_webhook_active(self.instance_id)
+                try:
+                    contacts_data = contact_service.fetch_all_contacts(
+                        instance_id=self.instance_id,
+                        instance_token=self.instance_token,
+                        raise_errors=True,
+                        into=list if webhook_active else ContactTable,
+                    )
+                except Exception as e:
+                    stale = contacts_cache.get_stale(self.instance_id)
+                    if stale is None:
+                        raise
+                    contacts_data, age = stale
+                    self.stale_note = f"Evolution API indisponível ({describe_failure(e)}); contatos do cache de {describe_age(age)} atrás."
+                    return self._set_contacts(contacts_data)
+                if webhook_active:
+                    store.replace_contacts(self.instance_id, contacts_data)
+                    # O cache guarda a tabela compacta, não os registros da API
+                    contacts_data = ContactTable(contacts_data)
+                contacts_data.instance_id = self.instance_id
+                if contacts_data:
+                    contacts_cache.put(self.instance_id, contacts_data)
+
+        return self._set_contacts(contacts_data)
+
+    def _set_contacts(self, contacts_data):
+        if not isinstance(contacts_data, ContactTable):
+            contacts_data = ContactTable(contacts_data, self.instance_id)
+        if self.stale_note:
+            contacts_data = contacts_data.with_note(self.stale_note)
+        self.contacts = contacts_data
+        return self.contacts
 
-        self.contacts = []
-        for contact in contacts_data:
-            self.contacts.append(
-                Contact(
-                    id=contact.get("id"),
-                    remote_jid=contact.get("remoteJid"),
-                    push_name=contact.get("pushName"),
-                )
-            )
+    def cached_contacts(self):
+        """
+        The contact directory if it is available without calling the API (event
+        store fed by the webhook, or a fresh entry of the shared cache); otherwise None.
+        """
+        if get_store().is_live(self.instance_id, "contacts"):
+            return self.fetch_contacts()
+        contacts_data = get_cache("contacts").get(self.instance_id)
+        return None if contacts_data is None else self._set_contacts(contacts_data)
 
-        return self.contacts
+    def resolve_names(self, jids, fetch: bool = True):
+        """
+        Resolves many JIDs to contact names from the cached contact table.
+
+        The number part is used as the key, so '...@c.us' and '...@s.whatsapp.net'
+        forms of the same contact match. Unknown JIDs are left out. With
+        `fetch` False the directory is only used if it is already cached, and
+        nothing is resolved otherwise.
+        """
+        contacts = self.get_contacts() if fetch else self.cached_contacts()
+        if contacts is None:
+            return {}
+        names = {}
+        for jid in set(jids):
+            if not jid:
+                continue
+            name = contacts.name_of(jid.split("@")[0])
+            if name:
+                names[jid] = name
+        return names
 
     def fetch_contacts_by_name(self, name: str):
         if not self.contacts:
             self.fetch_contacts()
 
-        filtered = []
-        name_lower = name.lower()
-        for contact in self.contacts:
-            if contact.push_name and name_lower in contact.push_name.lower():
-                filtered.append(contact)
-        return filtered
+        filtered = self.contacts.search_names(name)
+        return StaleList(filtered, self.stale_note) if self.stale_note else filtered
 
     def fetch_contacts_by_phone_number(self, phone_number: str):
         contact_service = ContactService(self.client)
@@ -67,9 +130,10 @@ class ContactController:
             phone_number=phone_number,
         )
 
-        self.contacts = []
+        # Resultado parcial: não substitui a agenda completa carregada em self.contacts
+        contacts = []
         for contact in contacts_data:
-            self.contacts.append(
+            contacts.append(
                 Contact(
                     id=contact.get("id"),
                     remote_jid=contact.get("remoteJid"),
@@ -81,7 +145,7 @@ class ContactController:
                 )
             )
 
-        return self.contacts
+        return contacts
 
     def get_contacts(self):
         if not self.contacts:
@@ -92,41 +156,32 @@ class ContactController:
         if not self.contacts:
             self.contacts = self.fetch_contacts()
 
-        for contact in self.contacts:
-            if contact.id == contact_id:
-                return contact
-        return None
+        return self.contacts.find_by_id(contact_id)
 
     def find_contact_by_jid(self, remote_jid):
         if not self.contacts:
             self.contacts = self.fetch_contacts()
 
-        for contact in self.contacts:
-            if contact.remote_jid == remote_jid:
-                return contact
-        return None
+        return self.contacts.find_by_jid(remote_jid)
 
     def find_contact_by_number(self, number):
         if not self.contacts:
             self.contacts = self.fetch_contacts()
 
         normalized_number = "".join(filter(str.isdigit, number))
-        search_jid = f"{normalized_number}@c.us"
-
-        for contact in self.contacts:
-            if contact.remote_jid == search_jid:
-                return contact
-            if contact.number == normalized_number:
-                return contact
-
-        return None
+        return self.contacts.find_by_number(normalized_number)
 
     def get_profile_picture(self, remote_jid):
-        result = self.client.contact.get_profile_picture(
-            instance_id=self.instance_id,
-            instance_token=self.instance_token,
-            remote_jid=remote_jid,
-        )
+        from evolutionapi.models.chat import ProfilePicture
+
+        with (
+            circuit_breaker.guard(self.instance_id),
+            adaptive_limiter.limit(self.instance_id),
+            metrics.upstream("fetchProfilePictureUrl", self.instance_id),
+        ):
+            result = self.client.chat.fetch_profile_picture_url(
+                self.instance_id, ProfilePicture(remote_jid.split("@")[0]), self.instance_token
+            )
 
         if result and "profilePictureUrl" in result:
             contact = self.find_contact_by_jid(remote_jid)
@@ -136,15 +191,10 @@ class ContactController:
         return None
 
     def get_common_groups(self, remote_jid):
-        result = self.client.contact.get_common_groups(
-            instance_id=self.instance_id,
-            instance_token=self.instance_token,
-            remote_jid=remote_jid,
-        )
+        """Ids of the instance's groups that have the contact as a participant."""
+        from group_controller import GroupController
 
-        messages = MessageSandeco.get_messages(result.get("messages", []))
-        unique_group_ids = list({msg.group_id for msg in messages if msg.group_id})
-        return unique_group_ids
+        return GroupController(self.instance_id).get_member_groups(remote_jid)
 
     def check_contact_exists(self, phone_number: str):
         contact_service = ContactService(self.client)
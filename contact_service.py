@@ -1,11 +1,23 @@
 import requests
 
+import adaptive_limiter
+import circuit_breaker
+import client_pool
+import json_stream
+import metrics
+from singleflight import coalesce
+
 
 class ContactService:
     def __init__(self, client):
         self.client = client
 
-    def fetch_all_contacts(self, instance_id, instance_token):
+    def _find_contacts(self, instance_id, instance_token, where, raise_errors=False, into=list):
+        """
+        Runs findContacts and passes the records, decoded one at a time while the
+        response is read, to `into` (a list by default; ContactTable avoids ever
+        holding every record as a dict).
+        """
         url = f"{self.client.base_url}/chat/findContacts/{instance_id}"
         headers = {
             "Authorization": f"Bearer {self.client.api_token}",
@@ -13,33 +25,36 @@ class ContactService:
             "Instance-Token": instance_token,
             "Content-Type": "application/json",
         }
-        payload = {"where": {"1": 1}}
+        payload = {"where": where}
+
+        def request():
+            with (
+                circuit_breaker.guard(instance_id),
+                adaptive_limiter.limit(instance_id),
+                metrics.upstream("findContacts", instance_id) as call,
+            ):
+                response = client_pool.get_session(self.client.base_url).post(
+                    url, headers=headers, json=payload, timeout=client_pool.get_timeout(), stream=True
+                )
+                if not response.ok:
+                    response.close()
+                    response.raise_for_status()
+                return into(json_stream.iter_items(response, "item", call.add_bytes))
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json()
+            # Buscas idênticas simultâneas compartilham uma única requisição
+            return coalesce(instance_id, f"findContacts:{into.__name__}", payload, request)
         except requests.exceptions.RequestException as e:
+            if raise_errors:
+                raise
             print(f"Erro ao buscar contatos: {e}")
             return []
 
-    def fetch_contacts_by_phone_number(self, instance_id, instance_token, phone_number: str):
-        url = f"{self.client.base_url}/chat/findContacts/{instance_id}"
-        headers = {
-            "Authorization": f"Bearer {self.client.api_token}",
-            "apikey": self.client.api_token,
-            "Instance-Token": instance_token,
-            "Content-Type": "application/json",
-        }
-        payload = {"where": {"remoteJid": phone_number}}
+    def fetch_all_contacts(self, instance_id, instance_token, raise_errors=False, into=list):
+        return self._find_contacts(instance_id, instance_token, {"1": 1}, raise_errors, into)
 
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao buscar contatos: {e}")
-            return []
+    def fetch_contacts_by_phone_number(self, instance_id, instance_token, phone_number: str):
+        return self._find_contacts(instance_id, instance_token, {"remoteJid": phone_number})
 
     def check_contact_exists(self, instance_id, instance_token, phone_number: str) -> bool:
         result = self.fetch_contacts_by_phone_number(instance_id, instance_token, phone_number)
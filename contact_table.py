@@ -0,0 +1,267 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class StringColumn:
+    """
+    Strings packed into one UTF-8 buffer plus an offsets array: about one byte
+    per ASCII character and four per row, instead of a str object per value.
+    None and "" are both stored as an empty slot and read back as None.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("I", [0])
+
+    def append(self, value: Optional[str]):
+        if value:
+            self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self.data[start:end].decode("utf-8") if end > start else None
+
+    def raw(self, row: int) -> bytes:
+        """Undecoded value; UTF-8 bytes sort in the same order as the strings."""
+        return self.data[self.offsets[row]:self.offsets[row + 1]]
+
+    def rows(self, value: str) -> Iterator[int]:
+        """Rows equal to `value`, found by searching the buffer without decoding every row."""
+        if not value:
+            return
+        needle = value.encode("utf-8")
+        pos = self.data.find(needle)
+        while pos != -1:
+            # Última linha que começa em pos ou antes (linhas vazias têm o mesmo offset)
+            row = bisect_right(self.offsets, pos) - 1
+            if self.offsets[row] == pos and self.offsets[row + 1] == pos + len(needle):
+                yield row
+            pos = self.data.find(needle, pos + 1)
+
+
+class InternedColumn:
+    """Low-cardinality strings (e.g. JID domains) stored as 2-byte codes into a list of distinct values."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self._codes_by_value: Dict[Optional[str], int] = {None: 0}
+        self.codes = array("H")
+
+    def append(self, value: Optional[str]):
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        return self.values[self.codes[row]]
+
+
+class ContactView:
+    """
+    Read view of one row of a ContactTable with the attributes of `Contact`.
+
+    Views hold only the table and the row, so they are cheap to create on
+    iteration and lookup; values are decoded on access.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    # Metadados adicionais (não presentes diretamente na tabela)
+    is_business = None
+    is_enterprise = None
+    is_verified = None
+    status = None
+    status_timestamp = None
+
+    def __init__(self, table: "ContactTable", row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def id(self) -> Optional[str]:
+        return self._table.ids[self._row]
+
+    @property
+    def remote_jid(self) -> Optional[str]:
+        return self._table.remote_jid(self._row)
+
+    @property
+    def number(self) -> Optional[str]:
+        return self._table.numbers[self._row]
+
+    @property
+    def push_name(self) -> Optional[str]:
+        return self._table.names[self._row]
+
+    def _extra(self, name: str) -> Any:
+        return self._table.extras.get(self._row, {}).get(name)
+
+    @property
+    def profile_pic_url(self) -> Optional[str]:
+        return self._extra("profile_pic_url")
+
+    @profile_pic_url.setter
+    def profile_pic_url(self, value: Optional[str]):
+        self._table.extras.setdefault(self._row, {})["profile_pic_url"] = value
+
+    @property
+    def created_at(self):
+        return self._extra("created_at")
+
+    @property
+    def updated_at(self):
+        return self._extra("updated_at")
+
+    @property
+    def instance_id(self) -> Optional[str]:
+        return self._table.instance_id
+
+    def update_profile_pic(self, new_pic_url: str):
+        from datetime import datetime
+
+        extras = self._table.extras.setdefault(self._row, {})
+        extras["profile_pic_url"] = new_pic_url
+        extras["updated_at"] = datetime.now()
+
+    def __repr__(self):
+        return (
+            f"Contact(id={self.id}, remote_jid={self.remote_jid}, "
+            f"push_name={self.push_name or 'None'}, number={self.number})"
+        )
+
+
+class ContactTable:
+    """
+    Compact contact directory of one instance, built from findContacts records.
+
+    Each contact costs a few dozen bytes: ids, numbers and names live in packed
+    UTF-8 columns and the JID domain ('s.whatsapp.net', 'c.us', ...) is interned.
+    Iteration and lookups return ContactView objects, so code written against
+    `Contact` keeps working. Number lookups use a row order sorted by number
+    (four bytes per contact), built on first use. Profile picture updates are
+    kept in a sparse per-row dict.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = (), instance_id: Optional[str] = None):
+        self.instance_id = instance_id
+        self.ids = StringColumn()
+        self.numbers = StringColumn()
+        self.domains = InternedColumn()
+        self.names = StringColumn()
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self._number_order: Optional[array] = None
+        # Preenchido em cópias servidas de um cache expirado (ver with_note)
+        self.note: Optional[str] = None
+        for record in records:
+            self.append(record)
+
+    def append(self, record: Dict[str, Any]):
+        jid = record.get("remoteJid")
+        number, _, domain = (jid or "").partition("@")
+        self.ids.append(record.get("id"))
+        self.numbers.append(number)
+        self.domains.append(domain or None)
+        self.names.append(record.get("pushName"))
+
+    def to_sections(self) -> Tuple[Dict[str, Any], Dict[str, bytes]]:
+        """Metadata and raw column buffers (including the number index, if built) for cache snapshots."""
+        meta = {"instance_id": self.instance_id, "domains": self.domains.values}
+        sections = {"domains.codes": self.domains.codes.tobytes()}
+        for name in ("ids", "numbers", "names"):
+            column = getattr(self, name)
+            sections[f"{name}.data"] = bytes(column.data)
+            sections[f"{name}.offsets"] = column.offsets.tobytes()
+        if self._number_order is not None and len(self._number_order) == len(self):
+            sections["number_order"] = self._number_order.tobytes()
+        return meta, sections
+
+    @classmethod
+    def from_sections(cls, meta: Dict[str, Any], sections: Dict[str, Any]) -> "ContactTable":
+        """Rebuilds a table from `to_sections` output; buffers are copied, never decoded per contact."""
+        table = cls(instance_id=meta.get("instance_id"))
+        for name in ("ids", "numbers", "names"):
+            column = getattr(table, name)
+            column.data = bytearray(sections[f"{name}.data"])
+            column.offsets = array("I")
+            column.offsets.frombytes(sections[f"{name}.offsets"])
+        table.domains.values = list(meta["domains"])
+        table.domains._codes_by_value = {value: code for code, value in enumerate(table.domains.values)}
+        table.domains.codes.frombytes(sections["domains.codes"])
+        if "number_order" in sections:
+            table._number_order = array("I")
+            table._number_order.frombytes(sections["number_order"])
+        return table
+
+    def with_note(self, note: str) -> "ContactTable":
+        """Shallow copy sharing the columns, carrying a staleness note for the tools."""
+        table = ContactTable.__new__(ContactTable)
+        table.__dict__.update(self.__dict__)
+        table.note = note
+        return table
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[ContactView]:
+        for row in range(len(self)):
+            yield ContactView(self, row)
+
+    def __getitem__(self, row: int) -> ContactView:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("contact row out of range")
+        return ContactView(self, row)
+
+    def remote_jid(self, row: int) -> Optional[str]:
+        number, domain = self.numbers[row], self.domains[row]
+        return f"{number}@{domain}" if domain else number
+
+    def _rows_with_number(self, number: str) -> Iterator[int]:
+        key = self.numbers.raw
+        order = self._number_order
+        if order is None or len(order) != len(self):
+            # Ordenação estável: contatos com o mesmo número mantêm a ordem original
+            order = self._number_order = array("I", sorted(range(len(self)), key=key))
+        needle = number.encode("utf-8")
+        i = bisect_left(order, needle, key=key)
+        while i < len(order) and key(order[i]) == needle:
+            yield order[i]
+            i += 1
+
+    def find_by_id(self, contact_id: str) -> Optional[ContactView]:
+        for row in self.ids.rows(contact_id):
+            return ContactView(self, row)
+        return None
+
+    def find_by_jid(self, remote_jid: str) -> Optional[ContactView]:
+        number, _, domain = (remote_jid or "").partition("@")
+        for row in self._rows_with_number(number):
+            if self.domains[row] == (domain or None):
+                return ContactView(self, row)
+        return None
+
+    def find_by_number(self, number: str) -> Optional[ContactView]:
+        for row in self._rows_with_number(number):
+            return ContactView(self, row)
+        return None
+
+    def name_of(self, number: str) -> Optional[str]:
+        """Name of the first contact with this number that has one."""
+        for row in self._rows_with_number(number):
+            name = self.names[row]
+            if name:
+                return name
+        return None
+
+    def search_names(self, text: str) -> List[ContactView]:
+        """Contacts whose name contains `text`, ignoring case."""
+        text = text.lower()
+        return [ContactView(self, row) for row in range(len(self)) if text in (self.names[row] or "").lower()]
@@ -0,0 +1,164 @@
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from event_store import RECEIPT_STATUSES, EventStore, get_store
+from instance_config import InstanceConfig
+
+# Rótulos exibidos pelas ferramentas para cada status de entrega
+STATUS_LABELS = {
+    "ERROR": "falhou",
+    "PENDING": "pendente",
+    "SERVER_ACK": "enviada",
+    "DELIVERY_ACK": "entregue",
+    "READ": "lida",
+    "PLAYED": "reproduzida",
+}
+
+
+class SendRejectedError(Exception):
+    """The API answered a send without creating a message (invalid number, disconnected instance...)."""
+
+
+def rejection_reason(response: Any) -> Optional[str]:
+    """
+    Why a sendText response is not a sent message, or None when it is.
+
+    The client only raises on 429 and 5xx; 4xx rejections come back as a body
+    like {"status": 400, "error": "Bad Request", "response": {"message": [...]}}.
+    A small numeric status is a Baileys ack (see `normalize_status`), not an error.
+    """
+    if not isinstance(response, dict):
+        return "resposta inesperada da API"
+    status = response.get("status")
+    if response.get("error") or (isinstance(status, int) and not isinstance(status, bool) and status >= 400):
+        detail = response.get("response")
+        if isinstance(detail, dict):
+            detail = detail.get("message", detail)
+        reason = " ".join(str(part) for part in (status, response.get("error")) if part)
+        return f"{reason}: {detail}" if detail else reason or "erro sem descrição"
+    if not (response.get("key") or {}).get("id"):
+        return "resposta sem id da mensagem"
+    return None
+
+
+def normalize_status(value: Any) -> Optional[str]:
+    """
+    Maps an Evolution status ('DELIVERY_ACK') or a Baileys ack number (3, '3')
+    to one of RECEIPT_STATUSES; unknown values give None.
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, int):
+        return RECEIPT_STATUSES[value] if 0 <= value < len(RECEIPT_STATUSES) else None
+    status = str(value).strip().upper()
+    return status if status in RECEIPT_STATUSES else None
+
+
+def _jid(number: str) -> str:
+    number = str(number)
+    return number if "@" in number else f"{number}@s.whatsapp.net"
+
+
+def record_sent(instance: str, number: str, response: Any, campaign: Optional[str] = None,
+                store: Optional[EventStore] = None) -> str:
+    """Records an accepted sendText response (see `rejection_reason`) and returns the message id."""
+    key = response["key"]
+    message_id = key["id"]
+    status = normalize_status(response.get("status")) or "PENDING"
+    (store or get_store()).add_receipt(
+        instance, message_id, key.get("remoteJid") or _jid(number), status, campaign=campaign
+    )
+    return message_id
+
+
+def record_failure(instance: str, number: str, error: Exception, campaign: Optional[str] = None,
+                   store: Optional[EventStore] = None):
+    """Records a send that the API rejected, so campaign statistics count it as failed."""
+    (store or get_store()).add_receipt(
+        instance, None, _jid(number), "ERROR", campaign=campaign, error=f"{type(error).__name__}: {error}"
+    )
+
+
+def status_updates(records: Iterable[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """
+    Extracts (message id, status) pairs from messages.update events,
+    findStatusMessage results or messages.upsert records.
+
+    Evolution v2 sends {"keyId": ..., "status": "READ"}; v1 and Baileys-style
+    payloads send {"key": {"id": ...}, "update": {"status": 4}}.
+    """
+    updates = []
+    for record in records:
+        key = record.get("key") or {}
+        message_id = record.get("keyId") or key.get("id")
+        update = record.get("update") if isinstance(record.get("update"), dict) else {}
+        status = normalize_status(update.get("status", record.get("status")))
+        if message_id and status:
+            updates.append((message_id, status))
+    return updates
+
+
+def apply_events(instance: str, records: Iterable[Dict[str, Any]], store: Optional[EventStore] = None) -> int:
+    """Updates tracked receipts from status events; returns how many changed."""
+    updates = status_updates(records)
+    if not updates:
+        return 0
+    return (store or get_store()).update_receipts(instance, updates)
+
+
+def poll(instance_id: Optional[str] = None, window: Optional[float] = None) -> int:
+    """
+    Fetches the current status of messages sent in the last `window` seconds
+    (EVO_RECEIPT_POLL_WINDOW, default one day) that were not read yet: one
+    findStatusMessage request per chat. Returns how many receipts changed.
+    """
+    from message_controller import MessageController
+
+    controller = MessageController(instance_id)
+    if window is None:
+        window = float(InstanceConfig.getenv("EVO_RECEIPT_POLL_WINDOW", "86400"))
+    store = get_store()
+    pending = store.pending_receipts(controller.instance_id, since=int(time.time() - window))
+
+    changed = 0
+    for remote_jid in dict.fromkeys(receipt["remote_jid"] for receipt in pending):
+        result = controller.message_service.fetch_status_updates(
+            controller.instance_id, controller.instance_token, remote_jid
+        )
+        if isinstance(result, dict):
+            # Versões paginadas embrulham os registros
+            result = result.get("records") or []
+        changed += apply_events(controller.instance_id, [r for r in result or [] if isinstance(r, dict)], store)
+    return changed
+
+
+def start_receipt_polling(interval: Optional[float] = None) -> Optional[threading.Thread]:
+    """
+    Polls the delivery status of recent messages every EVO_RECEIPT_POLL_INTERVAL
+    seconds in a daemon thread. Disabled unless the interval is set; instances
+    whose webhook is already delivering events are skipped.
+    """
+    if interval is None:
+        interval = InstanceConfig.getenv("EVO_RECEIPT_POLL_INTERVAL")
+        if not interval:
+            return None
+    interval = float(interval)
+
+    def run():
+        while True:
+            time.sleep(interval)
+            for inst in InstanceConfig.load_instances():
+                if get_store().is_webhook_active(inst.id):
+                    continue
+                try:
+                    poll(inst.id)
+                except Exception as e:
+                    print(f"Erro ao consultar status de entrega da instância {inst.id}: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=run, name="evo-receipts", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,609 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from instance_config import InstanceConfig
+
+
+# Campos de texto pesquisáveis, por tipo de mensagem
+_TEXT_FIELDS = (
+    ("extendedTextMessage", "text"),
+    ("imageMessage", "caption"),
+    ("videoMessage", "caption"),
+    ("documentMessage", "caption"),
+    ("documentMessage", "fileName"),
+)
+
+
+def record_text(record: Dict[str, Any]) -> str:
+    """Returns the searchable text of a raw message record (body or media caption)."""
+    message = record.get("message")
+    if not isinstance(message, dict):
+        return ""
+    parts = [message["conversation"]] if message.get("conversation") else []
+    for block, field in _TEXT_FIELDS:
+        inner = message.get(block)
+        if isinstance(inner, dict) and inner.get(field):
+            parts.append(inner[field])
+    return "\n".join(parts)
+
+
+# Status de entrega do Evolution API na ordem em que avançam (a posição é o ack do Baileys)
+RECEIPT_STATUSES = ("ERROR", "PENDING", "SERVER_ACK", "DELIVERY_ACK", "READ", "PLAYED")
+_DELIVERED_RANK = RECEIPT_STATUSES.index("DELIVERY_ACK")
+_READ_RANK = RECEIPT_STATUSES.index("READ")
+
+
+def _match_expression(query: str) -> str:
+    """
+    Turns free text into an FTS5 query: every word must appear, as a prefix
+    (so "nota" also finds "notas"). Quoting keeps FTS5 operators inert.
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"*' for term in terms if term)
+
+
+class EventStore:
+    """
+    Local SQLite store fed by Evolution API webhook events.
+
+    Messages are deduplicated by (instance, key id). Contacts and groups are
+    kept per instance and only served to read tools once the instance is
+    "live": a full directory was seeded from the REST API and the webhook
+    receiver has started pushing events for that instance.
+
+    Coverage only describes events received by this process without gaps: it
+    is cleared on startup, and an instance silent for longer than `heartbeat`
+    seconds (EVO_WEBHOOK_HEARTBEAT_SECONDS, default 600) falls back to the
+    REST API until events arrive and its directories are seeded again.
+
+    Message text is also kept in an FTS5 index (accent-insensitive), fed by
+    both webhook events and messages fetched from the REST API.
+
+    The message table is bounded: beyond `max_messages` (EVO_STORE_MAX_MESSAGES,
+    default 100000, 0 = unbounded) the oldest messages are pruned, as are
+    messages older than `retention` seconds (EVO_STORE_RETENTION_DAYS, off by
+    default). Message coverage then starts after the newest pruned message.
+
+    Receipts track the delivery status of messages sent by the tools (see
+    delivery_tracker), indexed by campaign so statistics never scan history.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        heartbeat: Optional[float] = None,
+        max_messages: Optional[int] = None,
+        retention: Optional[float] = None,
+    ):
+        self.path = path
+        if max_messages is None:
+            max_messages = int(InstanceConfig.getenv("EVO_STORE_MAX_MESSAGES", "100000"))
+        if retention is None:
+            retention = float(InstanceConfig.getenv("EVO_STORE_RETENTION_DAYS", "0")) * 86400
+        self.max_messages = max_messages
+        self.retention = retention
+        # Inserções desde a última poda; a poda roda a cada ~10% do limite
+        self._added_since_prune = 0
+        # Sem eventos por mais que isso, o webhook deixa de ser considerado ativo
+        if heartbeat is None:
+            heartbeat = float(InstanceConfig.getenv("EVO_WEBHOOK_HEARTBEAT_SECONDS", "600"))
+        self.heartbeat = heartbeat
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._create_schema()
+        self.fts_enabled = self._create_search_index()
+        # Eventos entregues enquanto o processo estava parado se perderam
+        self.reset_coverage()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    instance TEXT NOT NULL,
+                    message_id TEXT NOT NULL,
+                    remote_jid TEXT NOT NULL,
+                    from_me INTEGER,
+                    participant TEXT,
+                    push_name TEXT,
+                    message_type TEXT,
+                    timestamp INTEGER,
+                    raw TEXT NOT NULL,
+                    PRIMARY KEY (instance, message_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_messages_jid_ts
+                    ON messages (instance, remote_jid, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_messages_ts
+                    ON messages (timestamp);
+
+                CREATE TABLE IF NOT EXISTS contacts (
+                    instance TEXT NOT NULL,
+                    remote_jid TEXT NOT NULL,
+                    raw TEXT NOT NULL,
+                    PRIMARY KEY (instance, remote_jid)
+                );
+
+                CREATE TABLE IF NOT EXISTS groups (
+                    instance TEXT NOT NULL,
+                    group_id TEXT NOT NULL,
+                    raw TEXT NOT NULL,
+                    PRIMARY KEY (instance, group_id)
+                );
+
+                CREATE TABLE IF NOT EXISTS coverage (
+                    instance TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    since INTEGER NOT NULL,
+                    PRIMARY KEY (instance, kind)
+                );
+
+                CREATE TABLE IF NOT EXISTS receipts (
+                    id INTEGER PRIMARY KEY,
+                    instance TEXT NOT NULL,
+                    message_id TEXT,
+                    remote_jid TEXT NOT NULL,
+                    campaign TEXT,
+                    status TEXT NOT NULL,
+                    status_rank INTEGER NOT NULL,
+                    error TEXT,
+                    sent_at INTEGER NOT NULL,
+                    delivered_at INTEGER,
+                    read_at INTEGER,
+                    updated_at INTEGER NOT NULL,
+                    UNIQUE (instance, message_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_receipts_campaign
+                    ON receipts (campaign, instance, status_rank);
+                CREATE INDEX IF NOT EXISTS idx_receipts_pending
+                    ON receipts (instance, status_rank, sent_at);
+                """
+            )
+
+    def _create_search_index(self) -> bool:
+        # O rowid do índice é o rowid da tabela messages
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                        body, sender_name, tokenize = 'unicode61 remove_diacritics 2'
+                    )
+                    """
+                )
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Busca de mensagens indisponível (SQLite sem FTS5): {e}", file=sys.stderr)
+            return False
+
+    # ------------------------------------------------------------------
+    # coverage
+    # ------------------------------------------------------------------
+    def _set_coverage(self, instance: str, kind: str, since: Optional[int] = None, replace: bool = False):
+        since = int(since if since is not None else time.time())
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"{verb} INTO coverage (instance, kind, since) VALUES (?, ?, ?)",
+                (instance, kind, since),
+            )
+
+    def _get_coverage(self, instance: str, kind: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT since FROM coverage WHERE instance = ? AND kind = ?", (instance, kind)
+            ).fetchone()
+        return row["since"] if row else None
+
+    def reset_coverage(self):
+        """Forgets every coverage record, e.g. when the receiver (re)starts."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM coverage")
+
+    def mark_webhook_active(self, instance: str):
+        """
+        Records an event received for the instance. When no event arrived
+        within the heartbeat window, some may have been lost: message coverage
+        restarts now and contacts and groups must be seeded again.
+        """
+        now = int(time.time())
+        with self._lock:
+            if not self.is_webhook_active(instance):
+                with self._conn:
+                    self._conn.execute("DELETE FROM coverage WHERE instance = ?", (instance,))
+                self._set_coverage(instance, "webhook", now)
+            self._set_coverage(instance, "last_event", now, replace=True)
+
+    def is_webhook_active(self, instance: str) -> bool:
+        """True while events keep arriving, at most `heartbeat` seconds apart."""
+        last_event = self._get_coverage(instance, "last_event")
+        return last_event is not None and time.time() - last_event <= self.heartbeat
+
+    def is_live(self, instance: str, kind: str) -> bool:
+        """True when `kind` ('contacts' or 'groups') can be answered from the store."""
+        return self.is_webhook_active(instance) and self._get_coverage(instance, kind) is not None
+
+    def covers_messages(self, instance: str, timestamp_start: int) -> bool:
+        """True when every message newer than `timestamp_start` was pushed to the store."""
+        if not self.is_webhook_active(instance):
+            return False
+        since = self._get_coverage(instance, "webhook")
+        return since is not None and timestamp_start >= since
+
+    # ------------------------------------------------------------------
+    # messages
+    # ------------------------------------------------------------------
+    def add_messages(self, instance: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Inserts or updates message records, deduplicated by key id."""
+        rows = []
+        texts = []
+        for record in records:
+            key = record.get("key") or {}
+            message_id = key.get("id")
+            remote_jid = key.get("remoteJid")
+            if not message_id or not remote_jid:
+                continue
+
+            raw = dict(record)
+            message = raw.get("message")
+            if isinstance(message, dict) and "base64" in message:
+                # Mídia inline não é necessária para consultas e ocuparia muito espaço
+                raw["message"] = {k: v for k, v in message.items() if k != "base64"}
+
+            try:
+                timestamp = int(record.get("messageTimestamp") or 0)
+            except (TypeError, ValueError):
+                timestamp = 0
+
+            rows.append(
+                (
+                    instance,
+                    message_id,
+                    remote_jid,
+                    int(bool(key.get("fromMe"))),
+                    key.get("participant"),
+                    record.get("pushName"),
+                    record.get("messageType"),
+                    timestamp,
+                    json.dumps(raw, ensure_ascii=False),
+                )
+            )
+            texts.append(record_text(record))
+
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO messages (instance, message_id, remote_jid, from_me, participant,
+                                      push_name, message_type, timestamp, raw)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (instance, message_id) DO UPDATE SET
+                    push_name = COALESCE(excluded.push_name, messages.push_name),
+                    message_type = excluded.message_type,
+                    raw = excluded.raw
+                """,
+                rows,
+            )
+            if self.fts_enabled:
+                self._conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO messages_fts (rowid, body, sender_name)
+                    SELECT rowid, ?, push_name FROM messages WHERE instance = ? AND message_id = ?
+                    """,
+                    [(text, row[0], row[1]) for row, text in zip(rows, texts)],
+                )
+            self._added_since_prune += len(rows)
+            interval = self._prune_interval()
+            due = interval is not None and self._added_since_prune >= interval
+        if due:
+            self.prune()
+        return len(rows)
+
+    def _prune_interval(self) -> Optional[int]:
+        if self.max_messages:
+            return max(self.max_messages // 10, 1)
+        # Só retenção por idade: poda a cada mil mensagens inseridas
+        return 1000 if self.retention else None
+
+    def prune(self) -> int:
+        """Applies the message cap and retention now; returns how many messages were deleted."""
+        deleted = 0
+        with self._lock:
+            self._added_since_prune = 0
+            if self.retention:
+                deleted += self._delete_messages_until(int(time.time() - self.retention) - 1)
+            if self.max_messages:
+                excess = self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] - self.max_messages
+                if excess > 0:
+                    row = self._conn.execute(
+                        "SELECT timestamp FROM messages ORDER BY timestamp LIMIT 1 OFFSET ?", (excess - 1,)
+                    ).fetchone()
+                    deleted += self._delete_messages_until(row["timestamp"])
+        return deleted
+
+    def _delete_messages_until(self, timestamp: int) -> int:
+        """Deletes messages up to `timestamp` (inclusive) and moves coverage past them."""
+        with self._lock, self._conn:
+            newest = self._conn.execute(
+                "SELECT instance, MAX(timestamp) AS newest FROM messages WHERE timestamp <= ? GROUP BY instance",
+                (timestamp,),
+            ).fetchall()
+            if not newest:
+                return 0
+            if self.fts_enabled:
+                self._conn.execute(
+                    "DELETE FROM messages_fts WHERE rowid IN (SELECT rowid FROM messages WHERE timestamp <= ?)",
+                    (timestamp,),
+                )
+            deleted = self._conn.execute("DELETE FROM messages WHERE timestamp <= ?", (timestamp,)).rowcount
+            # O armazenamento já não tem tudo até a mensagem mais nova removida
+            self._conn.executemany(
+                "UPDATE coverage SET since = MAX(since, ?) WHERE instance = ? AND kind = 'webhook'",
+                [(row["newest"] + 1, row["instance"]) for row in newest],
+            )
+        return deleted
+
+    def get_messages(self, instance: str, remote_jid: str, timestamp_start: int, timestamp_end: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT raw FROM messages
+                WHERE instance = ? AND remote_jid = ? AND timestamp BETWEEN ? AND ?
+                ORDER BY timestamp
+                """,
+                (instance, remote_jid, timestamp_start, timestamp_end),
+            ).fetchall()
+        return [json.loads(row["raw"]) for row in rows]
+
+    def search_messages(
+        self,
+        query: str,
+        instance: Optional[str] = None,
+        remote_jid: Optional[str] = None,
+        sender: Optional[str] = None,
+        timestamp_start: Optional[int] = None,
+        timestamp_end: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over stored messages, best matches first (bm25).
+
+        `sender` matches the participant / contact number or the push name.
+        Each result carries the message columns plus a highlighted `snippet`.
+        """
+        expression = _match_expression(query)
+        if not self.fts_enabled or not expression:
+            return []
+
+        conditions = ["messages_fts MATCH ?"]
+        params: List[Any] = [expression]
+        if instance:
+            conditions.append("m.instance = ?")
+            params.append(instance)
+        if remote_jid:
+            conditions.append("m.remote_jid = ?")
+            params.append(remote_jid)
+        if sender:
+            conditions.append(
+                "(COALESCE(m.participant, CASE WHEN m.from_me THEN '' ELSE m.remote_jid END) LIKE ? "
+                "OR m.push_name LIKE ?)"
+            )
+            params.extend([f"%{sender}%", f"%{sender}%"])
+        if timestamp_start is not None:
+            conditions.append("m.timestamp >= ?")
+            params.append(timestamp_start)
+        if timestamp_end is not None:
+            conditions.append("m.timestamp <= ?")
+            params.append(timestamp_end)
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT m.instance, m.message_id, m.remote_jid, m.from_me, m.participant,
+                       m.push_name, m.message_type, m.timestamp,
+                       snippet(messages_fts, 0, '**', '**', '…', 16) AS snippet,
+                       bm25(messages_fts) AS rank
+                FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+                WHERE {" AND ".join(conditions)}
+                ORDER BY rank
+                LIMIT ?
+                """,
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # ------------------------------------------------------------------
+    # contacts and groups
+    # ------------------------------------------------------------------
+    def _upsert_entities(self, table: str, id_column: str, instance: str, records: Iterable[Dict[str, Any]], id_key: str):
+        with self._lock, self._conn:
+            for record in records:
+                entity_id = record.get(id_key)
+                if not entity_id:
+                    continue
+                row = self._conn.execute(
+                    f"SELECT raw FROM {table} WHERE instance = ? AND {id_column} = ?",
+                    (instance, entity_id),
+                ).fetchone()
+                # Eventos de atualização costumam trazer apenas os campos alterados
+                merged = json.loads(row["raw"]) if row else {}
+                merged.update({k: v for k, v in record.items() if v is not None})
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {table} (instance, {id_column}, raw) VALUES (?, ?, ?)",
+                    (instance, entity_id, json.dumps(merged, ensure_ascii=False)),
+                )
+
+    def _replace_entities(self, table: str, id_column: str, instance: str, records: Iterable[Dict[str, Any]], id_key: str, kind: str):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {table} WHERE instance = ?", (instance,))
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (instance, {id_column}, raw) VALUES (?, ?, ?)",
+                [
+                    (instance, record[id_key], json.dumps(record, ensure_ascii=False))
+                    for record in records
+                    if record.get(id_key)
+                ],
+            )
+        self._set_coverage(instance, kind, replace=True)
+
+    def _get_entities(self, table: str, instance: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT raw FROM {table} WHERE instance = ?", (instance,)).fetchall()
+        return [json.loads(row["raw"]) for row in rows]
+
+    def upsert_contacts(self, instance: str, records: Iterable[Dict[str, Any]]):
+        self._upsert_entities("contacts", "remote_jid", instance, records, "remoteJid")
+
+    def replace_contacts(self, instance: str, records: Iterable[Dict[str, Any]]):
+        """Seeds the full contact directory fetched from the REST API."""
+        self._replace_entities("contacts", "remote_jid", instance, records, "remoteJid", "contacts")
+
+    def get_contacts(self, instance: str) -> List[Dict[str, Any]]:
+        return self._get_entities("contacts", instance)
+
+    def upsert_groups(self, instance: str, records: Iterable[Dict[str, Any]]):
+        self._upsert_entities("groups", "group_id", instance, records, "id")
+
+    def replace_groups(self, instance: str, records: Iterable[Dict[str, Any]]):
+        """Seeds the full group list fetched from the REST API."""
+        self._replace_entities("groups", "group_id", instance, records, "id", "groups")
+
+    def get_groups(self, instance: str) -> List[Dict[str, Any]]:
+        return self._get_entities("groups", instance)
+
+    # ------------------------------------------------------------------
+    # delivery receipts
+    # ------------------------------------------------------------------
+    def add_receipt(
+        self,
+        instance: str,
+        message_id: Optional[str],
+        remote_jid: str,
+        status: str,
+        campaign: Optional[str] = None,
+        error: Optional[str] = None,
+    ):
+        """Records the outcome of a send; failed sends have no message id."""
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO receipts (instance, message_id, remote_jid, campaign, status, status_rank,
+                                      error, sent_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (instance, message_id) DO UPDATE SET
+                    campaign = COALESCE(excluded.campaign, receipts.campaign)
+                """,
+                (instance, message_id, remote_jid, campaign, status, RECEIPT_STATUSES.index(status), error, now, now),
+            )
+
+    def update_receipts(self, instance: str, updates: Iterable[Tuple[str, str]]) -> int:
+        """
+        Applies (message_id, status) updates to tracked messages only.
+        Statuses only move forward, since acks may arrive out of order; an
+        error (rank 0) only replaces a message still waiting for the server.
+        Returns how many receipts changed.
+        """
+        now = int(time.time())
+        changed = 0
+        with self._lock, self._conn:
+            for message_id, status in updates:
+                rank = RECEIPT_STATUSES.index(status)
+                cursor = self._conn.execute(
+                    """
+                    UPDATE receipts SET
+                        status = ?,
+                        status_rank = ?,
+                        delivered_at = CASE WHEN ? >= ? THEN COALESCE(delivered_at, ?) ELSE delivered_at END,
+                        read_at = CASE WHEN ? >= ? THEN COALESCE(read_at, ?) ELSE read_at END,
+                        updated_at = ?
+                    WHERE instance = ? AND message_id = ?
+                      AND (status_rank < ? OR (? = 0 AND status_rank = 1))
+                    """,
+                    (status, rank, rank, _DELIVERED_RANK, now, rank, _READ_RANK, now, now,
+                     instance, message_id, rank, rank),
+                )
+                changed += cursor.rowcount
+        return changed
+
+    def get_receipt(self, message_id: str, instance: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        query = "SELECT * FROM receipts WHERE message_id = ?"
+        params: List[Any] = [message_id]
+        if instance:
+            query += " AND instance = ?"
+            params.append(instance)
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return dict(row) if row else None
+
+    def pending_receipts(self, instance: str, since: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Tracked messages sent after `since` that were neither read nor failed, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT message_id, remote_jid, status_rank FROM receipts
+                WHERE instance = ? AND status_rank BETWEEN 1 AND ? AND sent_at >= ?
+                  AND message_id IS NOT NULL
+                ORDER BY sent_at DESC
+                LIMIT ?
+                """,
+                (instance, _READ_RANK - 1, since, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def receipt_stats(self, instance: Optional[str] = None, campaign: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Delivery and read counts per campaign (messages sent without one are
+        grouped under None), with the average seconds until delivery and read.
+        """
+        conditions = []
+        params: List[Any] = [_DELIVERED_RANK, _READ_RANK]
+        if instance:
+            conditions.append("instance = ?")
+            params.append(instance)
+        if campaign:
+            conditions.append("campaign = ?")
+            params.append(campaign)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT campaign,
+                       COUNT(*) AS total,
+                       SUM(status_rank = 0) AS failed,
+                       SUM(status_rank >= ?) AS delivered,
+                       SUM(status_rank >= ?) AS read,
+                       AVG(delivered_at - sent_at) AS avg_delivery_seconds,
+                       AVG(read_at - sent_at) AS avg_read_seconds,
+                       MIN(sent_at) AS first_sent_at,
+                       MAX(sent_at) AS last_sent_at
+                FROM receipts
+                {where}
+                GROUP BY campaign
+                ORDER BY last_sent_at DESC
+                """,
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_store: Optional[EventStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> EventStore:
+    """Returns the process-wide event store (path from EVO_STORE_PATH, in memory by default)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EventStore(InstanceConfig.getenv("EVO_STORE_PATH", ":memory:"))
+    return _store
@@ -1,16 +1,202 @@
 # Path: evoapi_mcp\evoapi_mcp.py
 
-from mcp.server.fastmcp import FastMCP
-from group_controller import GroupController
+import functools
+import inspect
+import sys
+import time
+
+import anyio
+from mcp.server.fastmcp import Context, FastMCP
 from datetime import datetime
-from send_message import SendMessage
 from instance_config import InstanceConfig
+import metrics
+import profiling
 
 # Inicializa o servidor FastMCP com nome "pong"
 mcp = FastMCP("evoapi_mcp")
 
+_tool_limiter = None
+
+
+def _get_tool_limiter():
+    # Criado sob demanda, dentro do loop de eventos do transporte
+    global _tool_limiter
+    if _tool_limiter is None:
+        _tool_limiter = anyio.CapacityLimiter(int(InstanceConfig.getenv("EVO_MAX_CONCURRENT_TOOLS", "16")))
+    return _tool_limiter
+
+
+def tool(name):
+    """
+    Registra a função como ferramenta MCP, com métricas de latência e erros e perfilamento opcional.
+
+    As ferramentas síncronas (requests) rodam em threads, limitadas a
+    EVO_MAX_CONCURRENT_TOOLS chamadas simultâneas, para que um cliente lento não
+    bloqueie os demais; a função devolvida continua síncrona. Ferramentas assíncronas
+    (as que recebem o Context para notificar progresso) rodam no próprio loop de
+    eventos e não são perfiladas.
+    """
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            instrumented = metrics.instrument_tool(name)(fn)
+            mcp.tool(name=name)(instrumented)
+            return instrumented
+
+        instrumented = metrics.instrument_tool(name)(profiling.profile_tool(name)(fn))
+
+        @functools.wraps(instrumented)
+        async def run_in_thread(*args, **kwargs):
+            return await anyio.to_thread.run_sync(
+                functools.partial(instrumented, *args, **kwargs), limiter=_get_tool_limiter()
+            )
+
+        mcp.tool(name=name)(run_in_thread)
+        return instrumented
+
+    return decorator
+
+
+@mcp.resource("metrics://evoapi", name="metrics", mime_type="text/plain")
+def metrics_resource() -> str:
+    """Métricas do servidor (latência por ferramenta e por endpoint da Evolution API) no formato OpenMetrics."""
+    return metrics.render()
+
+
+@tool("configure_profiling")
+def configure_profiling(
+    enabled: bool | None = None, sample_rate: float | None = None, directory: str | None = None
+) -> str:
+    """
+    Ativa ou desativa o perfilamento (cProfile + tracemalloc) das chamadas de ferramentas.
+
+    Ferramenta administrativa: cada chamada amostrada grava um arquivo .prof e um
+    resumo .txt no diretório configurado. Sem argumentos, apenas informa o estado atual.
+
+    Args:
+        enabled (bool, opcional): True para ativar, False para desativar.
+        sample_rate (float, opcional): Fração das chamadas perfiladas, entre 0 e 1.
+        directory (str, opcional): Diretório onde os perfis são gravados.
+
+    Returns:
+        str: Estado atual do perfilamento.
+    """
+    profiling.configure(enabled, sample_rate, directory)
+    return profiling.status()
+
+
+def _collect(instance_id, fetch):
+    """
+    Executa `fetch(instance_id)` na instância escolhida ou, com instance_id="all",
+    em todas as instâncias configuradas ao mesmo tempo.
+
+    Returns:
+        tuple: lista de pares (instância, item) e o texto dos erros e avisos por
+            instância (por exemplo, dados servidos de um cache antigo). A instância
+            só é preenchida no modo "all".
+    """
+    if not InstanceConfig.is_all(instance_id):
+        items = fetch(instance_id)
+        return [(None, item) for item in items], _stale_warning(None, items)
+
+    from fanout import fan_out, resolve_targets
+
+    pairs = []
+    errors = ""
+    for result in fan_out(fetch, resolve_targets(instance_id)):
+        if result.error is not None:
+            errors += f"[instância {result.instance_id}] Erro: {result.error}\n"
+        else:
+            pairs.extend((result.instance_id, item) for item in result.value)
+            errors += _stale_warning(result.instance_id, result.value)
+    return pairs, errors
+
 
-@mcp.tool(name="list_instances")
+def _instance_tag(instance):
+    return f"[instância {instance}] " if instance else ""
+
+
+def _stale_warning(instance, items):
+    """Aviso exibido quando o resultado veio de dados antigos (API indisponível)."""
+    note = getattr(items, "note", None)
+    return f"{_instance_tag(instance)}Aviso: {note}\n" if note else ""
+
+
+def _message_sender(message):
+    """JID de quem enviou a mensagem (participante, em grupos)."""
+    if message.from_me:
+        return None
+    return message.participant or message.remote_jid
+
+
+def _resolve_sender_names(pairs, instance_id):
+    """
+    Resolve, de uma só vez por instância, os JIDs dos remetentes para os nomes da
+    agenda de contatos, sem uma consulta por mensagem.
+
+    A agenda em cache é sempre usada. Ela só é baixada quando algum remetente não
+    tem pushName em nenhuma das mensagens: nos demais casos o rótulo usa o
+    pushName e uma consulta curta não puxa a agenda inteira da instância.
+
+    Returns:
+        dict: JID -> nome do contato, apenas para os remetentes encontrados.
+    """
+    from contact_controller import ContactController
+
+    jids_by_instance = {}
+    named_by_instance = {}
+    for instance, message in pairs:
+        jid = _message_sender(message)
+        if not jid:
+            continue
+        jids_by_instance.setdefault(instance, set()).add(jid)
+        if message.push_name:
+            named_by_instance.setdefault(instance, set()).add(jid)
+
+    names = {}
+    for instance, jids in jids_by_instance.items():
+        unnamed = jids - named_by_instance.get(instance, set())
+        try:
+            names.update(ContactController(instance or instance_id).resolve_names(jids, fetch=bool(unnamed)))
+        except Exception as e:
+            # Sem a agenda, a listagem segue com o pushName de cada mensagem
+            print(f"Erro ao resolver nomes dos contatos: {e}", file=sys.stderr)
+    return names
+
+
+def _sender_label(message, names):
+    if message.from_me:
+        return "Eu"
+    jid = _message_sender(message) or ""
+    number = jid.split("@")[0]
+    name = names.get(jid) or message.push_name
+    return f"{name} ({number})" if name and number else name or number
+
+
+def _format_message(instance, message, names, group_id=None):
+    message_string = f"Mensagem -----------------------------------\n"
+    if instance:
+        message_string += f"Instância: {instance}\n"
+    if group_id:
+        message_string += f"Grupo: {group_id}\n"
+    message_string += f"Usuário: {_sender_label(message, names)}\n"
+    message_string += f"Data e hora: {datetime.fromtimestamp(message.message_timestamp).strftime('%d/%m/%Y %H:%M:%S')}\n"
+    message_string += f"Tipo: {message.message_type}\n"
+    message_string += f"Texto: {message.get_text()}\n"
+    return message_string
+
+
+def _format_contacts(pairs, errors):
+    string_contacts = ""
+    for instance, contato in pairs:
+        string_contacts += (
+            f"{_instance_tag(instance)}Contato ID: {contato.id}, JID: {contato.remote_jid}, "
+            f"Nome: {contato.push_name or 'Não definido'}\n"
+        )
+    return string_contacts + errors
+
+
+@tool("list_instances")
 def list_instances() -> str:
     """
     Lista as instâncias Evolution API disponíveis (sem expor tokens).
@@ -31,10 +217,13 @@ def list_instances() -> str:
         default_mark = " (padrão)" if inst.id == default_id else ""
         result += f"- id: {inst.id}, nome: {inst.name}, url: {inst.url}{default_mark}\n"
 
+    if len(instances) > 1:
+        result += 'Use instance_id="all" nas ferramentas de consulta para buscar em todas as instâncias.\n'
+
     return result
 
 
-@mcp.tool(name="get_groups")
+@tool("get_groups")
 def get_groups(instance_id: str | None = None) -> str:
     """
     Recupera e retorna uma lista formatada de grupos do WhatsApp disponíveis.
@@ -44,21 +233,26 @@ def get_groups(instance_id: str | None = None) -> str:
     A resposta pode ser usada para seleção posterior de um grupo para envio
     de mensagens.
 
+    Args:
+        instance_id (str, opcional): Instância a consultar. Use "all" para listar
+            os grupos de todas as instâncias; cada linha é marcada com a instância.
+
     Returns:
         str: Lista de grupos no formato:
             "Grupo ID: <id>, Nome: <nome>\n"
     """
-    controller = GroupController(instance_id)
-    groups = controller.fetch_groups()
+    from group_controller import GroupController
+
+    groups, errors = _collect(instance_id, lambda inst: GroupController(inst).fetch_groups())
 
     string_groups = ""
-    for grupo in groups:
-        string_groups += f"Grupo ID: {grupo.group_id}, Nome: {grupo.name}\n"
+    for instance, grupo in groups:
+        string_groups += f"{_instance_tag(instance)}Grupo ID: {grupo.group_id}, Nome: {grupo.name}\n"
 
-    return string_groups
+    return string_groups + errors
 
 
-@mcp.tool(name="get_group_messages")
+@tool("get_group_messages")
 def get_group_messages(group_id: str, start_date: str, end_date: str, instance_id: str | None = None) -> str:
     """
     Recupera as mensagens enviadas em um grupo do WhatsApp dentro de um intervalo de datas especificado.
@@ -71,6 +265,8 @@ def get_group_messages(group_id: str, start_date: str, end_date: str, instance_i
         group_id (str): Identificador único do grupo do WhatsApp.
         start_date (str): Data e hora de início no formato 'YYYY-MM-DD HH:MM:SS'.
         end_date (str): Data e hora de término no formato 'YYYY-MM-DD HH:MM:SS'.
+        instance_id (str, opcional): Instância a consultar. Use "all" para buscar o
+            grupo em todas as instâncias; as mensagens são intercaladas por horário.
 
     Returns:
         str: Lista de mensagens formatadas, com os campos:
@@ -81,39 +277,188 @@ def get_group_messages(group_id: str, start_date: str, end_date: str, instance_i
 
         Cada mensagem é separada por um delimitador visual.
     """
-    controller = GroupController(instance_id)
-    messages = controller.get_messages(group_id, start_date, end_date)
+    from group_controller import GroupController
+
+    messages, errors = _collect(
+        instance_id, lambda inst: GroupController(inst).get_messages(group_id, start_date, end_date)
+    )
+    if InstanceConfig.is_all(instance_id):
+        messages.sort(key=lambda pair: pair[1].message_timestamp or 0)
+    names = _resolve_sender_names(messages, instance_id)
 
     messages_string = ""
-    for message in messages:
-        messages_string += f"Mensagem -----------------------------------\n"
-        messages_string += f"Usuário: {message.push_name}\n"
-        messages_string += f"Data e hora: {datetime.fromtimestamp(message.message_timestamp).strftime('%d/%m/%Y %H:%M:%S')}\n"
-        messages_string += f"Tipo: {message.message_type}\n"
-        messages_string += f"Texto: {message.get_text()}\n"
+    for instance, message in messages:
+        messages_string += _format_message(instance, message, names)
+
+    return messages_string + errors
+
+
+@tool("get_multi_group_messages")
+def get_multi_group_messages(
+    group_ids: list[str],
+    start_date: str,
+    end_date: str,
+    max_chars: int = 20000,
+    instance_id: str | None = None,
+) -> str:
+    """
+    Recupera de uma só vez as mensagens de vários grupos do WhatsApp em um intervalo de datas.
+
+    Use no lugar de várias chamadas a `get_group_messages` (por exemplo, "o que aconteceu hoje
+    nos grupos do projeto"): os grupos são consultados em paralelo e as mensagens são
+    intercaladas por horário. Se o total passar de `max_chars`, as mensagens mais recentes
+    são mantidas e a resposta informa quantas foram omitidas.
+
+    Args:
+        group_ids (list[str]): Identificadores dos grupos do WhatsApp.
+        start_date (str): Data e hora de início no formato 'YYYY-MM-DD HH:MM:SS'.
+        end_date (str): Data e hora de término no formato 'YYYY-MM-DD HH:MM:SS'.
+        max_chars (int, opcional): Tamanho máximo da resposta em caracteres. Padrão: 20000.
+        instance_id (str, opcional): Instância a consultar. Use "all" para buscar os
+            grupos em todas as instâncias.
+
+    Returns:
+        str: Mensagens em ordem cronológica, com grupo, usuário, data e hora, tipo e texto.
+    """
+    import heapq
+
+    from fanout import fan_out_each, resolve_targets
+    from group_controller import GroupController
+
+    all_mode = InstanceConfig.is_all(instance_id)
+    results = fan_out_each(
+        lambda inst, group_id: GroupController(inst).get_messages(group_id, start_date, end_date),
+        resolve_targets(instance_id),
+        list(dict.fromkeys(group_ids)),
+    )
+
+    streams = []
+    errors = ""
+    for group_id, result in results:
+        instance = result.instance_id if all_mode else None
+        if result.error is not None:
+            errors += f"{_instance_tag(instance)}[grupo {group_id}] Erro: {result.error}\n"
+            continue
+        errors += _stale_warning(instance, result.value)
+        # Cada grupo em ordem decrescente: o merge entrega primeiro as mais recentes
+        streams.append(
+            sorted(
+                ((message.message_timestamp or 0, instance, group_id, message) for message in result.value),
+                key=lambda entry: entry[0],
+                reverse=True,
+            )
+        )
+
+    total = sum(len(stream) for stream in streams)
+    names = _resolve_sender_names(
+        [(instance, message) for stream in streams for _, instance, _, message in stream], instance_id
+    )
+
+    selected = []
+    used = 0
+    for _, instance, group_id, message in heapq.merge(*streams, key=lambda entry: entry[0], reverse=True):
+        block = _format_message(instance, message, names, group_id)
+        if used + len(block) > max_chars:
+            break
+        selected.append(block)
+        used += len(block)
+
+    messages_string = "".join(reversed(selected))
+    if len(selected) < total:
+        messages_string += (
+            f"\n{total - len(selected)} de {total} mensagens mais antigas omitidas pelo limite de "
+            f"{max_chars} caracteres; reduza o intervalo ou aumente max_chars.\n"
+        )
+    return messages_string + errors
+
+
+@tool("get_group_digest")
+def get_group_digest(
+    group_id: str,
+    start_date: str,
+    end_date: str,
+    max_chars: int = 6000,
+    temperature: float = 0.0,
+    seed: int | None = None,
+    instance_id: str | None = None,
+) -> str:
+    """
+    Gera um resumo das mensagens mais relevantes de um grupo do WhatsApp em um intervalo de datas.
+
+    Em grupos movimentados, use esta ferramenta no lugar de `get_group_messages`. As mensagens
+    recebem uma pontuação de relevância (tamanho do texto, respostas e citações, menções, mídia
+    e diversidade de remetentes) e são selecionadas até o limite de caracteres. Mensagens
+    consecutivas do mesmo remetente são agrupadas em um único item.
+
+    Args:
+        group_id (str): Identificador único do grupo do WhatsApp.
+        start_date (str): Data e hora de início no formato 'YYYY-MM-DD HH:MM:SS'.
+        end_date (str): Data e hora de término no formato 'YYYY-MM-DD HH:MM:SS'.
+        max_chars (int, opcional): Orçamento de caracteres do resumo (cerca de 4 caracteres
+            por token). Padrão: 6000.
+        temperature (float, opcional): 0 seleciona deterministicamente as mensagens mais
+            relevantes; valores maiores sorteiam com mais variedade. Padrão: 0.
+        seed (int, opcional): Semente do sorteio, para resultados reproduzíveis.
+        instance_id (str, opcional): Instância a consultar. Use "all" para combinar o
+            grupo em todas as instâncias.
+
+    Returns:
+        str: Itens do resumo em ordem cronológica, com remetente, horário, quantidade
+            de mensagens agrupadas e texto, seguidos do total selecionado.
+    """
+    from group_controller import GroupController
+    from message_digest import digest_messages, format_entry
+
+    pairs, errors = _collect(
+        instance_id, lambda inst: GroupController(inst).get_messages(group_id, start_date, end_date)
+    )
+    messages = [message for _, message in pairs]
+    names = _resolve_sender_names(pairs, instance_id)
+    # O rodapé e os avisos entram no orçamento; o rodapé é medido com o maior total possível
+    footer = f"\nResumo: {len(messages)} de {len(messages)} mensagens selecionadas.\n"
+    entries = digest_messages(
+        messages,
+        max_chars=max_chars - len(footer) - len(errors),
+        temperature=temperature,
+        seed=seed,
+        sender_names=names,
+        format_entry=format_entry,
+    )
 
-    return messages_string
+    digest_string = "".join(format_entry(entry) for entry in entries)
+    selected = sum(entry.count for entry in entries)
+    digest_string += f"\nResumo: {selected} de {len(messages)} mensagens selecionadas.\n"
+    return digest_string + errors
 
 
-def _send_message(recipient: str, message: str, instance_id: str | None = None) -> str:
+def _send_message(recipient: str, message: str, instance_id: str | None = None, campaign: str | None = None) -> str:
     """
     Método privado que encapsula a lógica comum de envio de mensagens.
 
     Args:
         recipient (str): ID do destinatário (grupo ou número de telefone)
         message (str): Conteúdo da mensagem
+        campaign (str, opcional): Campanha em que o envio é contabilizado
 
     Returns:
         str: Mensagem de sucesso ou erro
     """
+    from delivery_tracker import SendRejectedError
+    from send_message import SendMessage
+
     send = SendMessage(instance_id)
 
-    send.textMessage(recipient, message)
-    return "Mensagem enviada com sucesso"
+    try:
+        response = send.textMessage(recipient, message, campaign=campaign)
+    except SendRejectedError as e:
+        return f"Erro ao enviar mensagem: {e}"
+    return f"Mensagem enviada com sucesso (id: {response['key']['id']})"
 
 
-@mcp.tool(name="send_message_to_group")
-def send_message_to_group(group_id: str, message: str, instance_id: str | None = None) -> str:
+@tool("send_message_to_group")
+def send_message_to_group(
+    group_id: str, message: str, instance_id: str | None = None, campaign: str | None = None
+) -> str:
     """
     Envia uma mensagem de texto para um grupo específico do WhatsApp.
 
@@ -127,10 +472,13 @@ def send_message_to_group(group_id: str, message: str, instance_id: str | None =
             ferramenta get_groups().
         message (str): Conteúdo da mensagem a ser enviada. Pode conter texto
             formatado, emojis e quebras de linha.
+        campaign (str, opcional): Nome da campanha a que o envio pertence. As
+            estatísticas de entrega e leitura são agrupadas por campanha
+            (ver get_delivery_status).
 
     Returns:
         str: Mensagem indicando o resultado da operação:
-            - "Mensagem enviada com sucesso" em caso de êxito
+            - "Mensagem enviada com sucesso (id: <id>)" em caso de êxito
             - "Erro ao enviar mensagem: <descrição>" em caso de falha
 
     Raises:
@@ -140,11 +488,13 @@ def send_message_to_group(group_id: str, message: str, instance_id: str | None =
             - Falha na autenticação
             - Formato inválido de mensagem
     """
-    return _send_message(group_id, message, instance_id)
+    return _send_message(group_id, message, instance_id, campaign)
 
 
-@mcp.tool(name="send_message_to_phone")
-def send_message_to_phone(cellphone: str, message: str, instance_id: str | None = None) -> str:
+@tool("send_message_to_phone")
+def send_message_to_phone(
+    cellphone: str, message: str, instance_id: str | None = None, campaign: str | None = None
+) -> str:
     """
     Envia uma mensagem de texto para um número de telefone específico via WhatsApp.
     Somente use para enviar mensagens para números de telefone
@@ -162,10 +512,13 @@ def send_message_to_phone(cellphone: str, message: str, instance_id: str | None
 
         message (str): Conteúdo da mensagem a ser enviada. Pode conter texto
             formatado, emojis e quebras de linha.
+        campaign (str, opcional): Nome da campanha a que o envio pertence. As
+            estatísticas de entrega e leitura são agrupadas por campanha
+            (ver get_delivery_status).
 
     Returns:
         str: Mensagem indicando o resultado da operação:
-            - "Mensagem enviada com sucesso" em caso de êxito
+            - "Mensagem enviada com sucesso (id: <id>)" em caso de êxito
             - "Erro ao enviar mensagem: <descrição>" em caso de falha
 
     Raises:
@@ -176,16 +529,13 @@ def send_message_to_phone(cellphone: str, message: str, instance_id: str | None
             - Falha na autenticação
             - Formato inválido de mensagem
     """
-    return _send_message(cellphone, message, instance_id)
+    return _send_message(cellphone, message, instance_id, campaign)
 
 
 # ----------------------------------------------
 # acrescimo de ferramentas de contatos
 # ----------------------------------------------
-from contact_controller import ContactController
-
-
-@mcp.tool(name="get_contacts")
+@tool("get_contacts")
 def get_contacts(instance_id: str | None = None) -> str:
     """
     Recupera e retorna uma lista formatada de contatos do WhatsApp disponíveis.
@@ -195,21 +545,21 @@ def get_contacts(instance_id: str | None = None) -> str:
     A resposta pode ser usada para seleção posterior de um contato para envio
     de mensagens.
 
+    Args:
+        instance_id (str, opcional): Instância a consultar. Use "all" para buscar
+            em todas as instâncias; cada linha é marcada com a instância.
+
     Returns:
         str: Lista de contatos no formato:
             "Contato ID: <id>, JID: <remote_jid>, Nome: <push_name>\n"
     """
-    controller = ContactController(instance_id)
-    contacts = controller.fetch_contacts()
+    from contact_controller import ContactController
 
-    string_contacts = ""
-    for contato in contacts:
-        string_contacts += f"Contato ID: {contato.id}, JID: {contato.remote_jid}, Nome: {contato.push_name or 'Não definido'}\n"
-
-    return string_contacts
+    contacts, errors = _collect(instance_id, lambda inst: ContactController(inst).fetch_contacts())
+    return _format_contacts(contacts, errors)
 
 
-@mcp.tool(name="get_contacts_by_name")
+@tool("get_contacts_by_name")
 def get_contacts_by_name(name: str, instance_id: str | None = None) -> str:
     """
     Recupera e retorna uma lista formatada de contatos do WhatsApp disponíveis.
@@ -219,21 +569,22 @@ def get_contacts_by_name(name: str, instance_id: str | None = None) -> str:
     A resposta pode ser usada para seleção posterior de um contato para envio
     de mensagens.
 
+    Args:
+        name (str): Parte do nome do contato.
+        instance_id (str, opcional): Instância a consultar. Use "all" para buscar
+            em todas as instâncias; cada linha é marcada com a instância.
+
     Returns:
         str: Lista de contatos no formato:
             "Contato ID: <id>, JID: <remote_jid>, Nome: <push_name>\n"
     """
-    controller = ContactController(instance_id)
-    contacts = controller.fetch_contacts_by_name(name)
-
-    string_contacts = ""
-    for contato in contacts:
-        string_contacts += f"Contato ID: {contato.id}, JID: {contato.remote_jid}, Nome: {contato.push_name or 'Não definido'}\n"
+    from contact_controller import ContactController
 
-    return string_contacts
+    contacts, errors = _collect(instance_id, lambda inst: ContactController(inst).fetch_contacts_by_name(name))
+    return _format_contacts(contacts, errors)
 
 
-@mcp.tool(name="get_contacts_by_phone_number")
+@tool("get_contacts_by_phone_number")
 def get_contacts_by_phone_number(phone_number: str, instance_id: str | None = None) -> str:
     """
     Recupera e retorna uma lista formatada de contatos do WhatsApp disponíveis.
@@ -243,21 +594,22 @@ def get_contacts_by_phone_number(phone_number: str, instance_id: str | None = No
     A resposta pode ser usada para seleção posterior de um contato para envio
     de mensagens.
 
+    Args:
+        phone_number (str): Número ou JID do contato.
+        instance_id (str, opcional): Instância a consultar. Use "all" para buscar
+            em todas as instâncias; cada linha é marcada com a instância.
+
     Returns:
         str: Lista de contatos no formato:
             "Contato ID: <id>, JID: <remote_jid>, Nome: <push_name>\n"
     """
-    controller = ContactController(instance_id)
-    contacts = controller.fetch_contacts_by_phone_number(phone_number)
-
-    string_contacts = ""
-    for contato in contacts:
-        string_contacts += f"Contato ID: {contato.id}, JID: {contato.remote_jid}, Nome: {contato.push_name or 'Não definido'}\n"
+    from contact_controller import ContactController
 
-    return string_contacts
+    contacts, errors = _collect(instance_id, lambda inst: ContactController(inst).fetch_contacts_by_phone_number(phone_number))
+    return _format_contacts(contacts, errors)
 
 
-@mcp.tool(name="find_contact_by_number")
+@tool("find_contact_by_number")
 def find_contact_by_number(phone_number: str, instance_id: str | None = None) -> str:
     """
     Localiza um contato pelo número de telefone e retorna suas informações detalhadas.
@@ -282,6 +634,8 @@ def find_contact_by_number(phone_number: str, instance_id: str | None = None) ->
 
         Se o contato não for encontrado, retorna uma mensagem informativa.
     """
+    from contact_controller import ContactController
+
     controller = ContactController(instance_id)
     contact = controller.find_contact_by_number(phone_number)
 
@@ -314,7 +668,7 @@ def find_contact_by_number(phone_number: str, instance_id: str | None = None) ->
     return contact_info
 
 
-@mcp.tool(name="get_contact_profile_picture")
+@tool("get_contact_profile_picture")
 def get_contact_profile_picture(remote_jid: str, instance_id: str | None = None) -> str:
     """
     Recupera a URL da foto de perfil de um contato específico.
@@ -329,6 +683,8 @@ def get_contact_profile_picture(remote_jid: str, instance_id: str | None = None)
         str: URL da imagem de perfil do contato ou uma mensagem informativa caso
              não seja possível obter a imagem.
     """
+    from contact_controller import ContactController
+
     controller = ContactController(instance_id)
     picture_url = controller.get_profile_picture(remote_jid)
 
@@ -338,7 +694,7 @@ def get_contact_profile_picture(remote_jid: str, instance_id: str | None = None)
         return "Não foi possível obter a foto de perfil deste contato. O contato pode não ter uma imagem definida ou as permissões podem estar restritas."
 
 
-@mcp.tool(name="get_contact_common_groups")
+@tool("get_contact_common_groups")
 def get_contact_common_groups(remote_jid: str, instance_id: str | None = None) -> str:
     """
     Recupera os grupos em comum com um contato específico.
@@ -357,23 +713,26 @@ def get_contact_common_groups(remote_jid: str, instance_id: str | None = None) -
 
         Se nenhum grupo em comum for encontrado, retorna uma mensagem informativa.
     """
+    from contact_controller import ContactController
+    from fanout import gather
+    from group_controller import GroupController
+
     contact_controller = ContactController(instance_id)
     group_controller = GroupController(instance_id)
 
-    # Busca o contato para obter o nome
-    contact = contact_controller.find_contact_by_jid(remote_jid)
+    # Contato (para o nome), grupos em comum e lista de grupos (para os nomes)
+    # não dependem um do outro: as três consultas rodam em paralelo
+    contact, common_groups_ids, _ = gather(
+        lambda: contact_controller.find_contact_by_jid(remote_jid),
+        lambda: contact_controller.get_common_groups(remote_jid),
+        group_controller.fetch_groups,
+    )
     if not contact:
         return f"Contato com JID {remote_jid} não encontrado."
 
-    # Busca os grupos em comum
-    common_groups_ids = contact_controller.get_common_groups(remote_jid)
-
     if not common_groups_ids:
         return f"Nenhum grupo em comum encontrado com {contact.push_name or contact.number}."
 
-    # Carrega os grupos para obter os nomes
-    group_controller.fetch_groups()
-
     result = f"Grupos em comum com {contact.push_name or contact.number}:\n"
     for group_id in common_groups_ids:
         group = group_controller.find_group_by_id(group_id)
@@ -385,7 +744,7 @@ def get_contact_common_groups(remote_jid: str, instance_id: str | None = None) -
     return result
 
 
-@mcp.tool(name="check_phone_exists")
+@tool("check_phone_exists")
 def check_phone_exists(phone_number: str, instance_id: str | None = None) -> str:
     """
     Verifica se um número de telefone está registrado no WhatsApp.
@@ -400,6 +759,8 @@ def check_phone_exists(phone_number: str, instance_id: str | None = None) -> str
     Returns:
         str: Mensagem indicando se o número existe ou não no WhatsApp.
     """
+    from contact_controller import ContactController
+
     controller = ContactController(instance_id)
     exists = controller.check_contact_exists(phone_number)
 
@@ -415,41 +776,82 @@ def check_phone_exists(phone_number: str, instance_id: str | None = None) -> str
 # acrescimo de ferramentas de mensagens
 # ----------------------------------------------
 
-from message_controller import MessageController
+def _export_job_status(job):
+    from export_jobs import DONE, FAILED
+
+    if job.status == DONE:
+        with open(job.path, encoding="utf-8") as f:
+            content = f.read()
+        return f"Arquivo de mensagens exportado: {job.path} ({job.rows} mensagens)\n{content}"
+    if job.status == FAILED:
+        return (
+            f"Exportação {job.job_id} falhou na página {job.page + 1}: {job.error}\n"
+            f'Use get_export_job(job_id="{job.job_id}", resume=True) para retomar da última página concluída.'
+        )
+    return (
+        f"Exportação {job.job_id} em andamento: página {job.page} de {job.pages or '?'} "
+        f"({job.rows} mensagens até agora).\n"
+        f'Consulte o resultado com get_export_job(job_id="{job.job_id}").'
+    )
 
 
-@mcp.tool(name="fecth_all_contact_messages")
-def fecth_all_contact_messages(remote_jid: str, instance_id: str | None = None) -> str:
+async def _follow_export(job, ctx: Context | None, wait_seconds: float) -> str:
+    """
+    Acompanha o job por até `wait_seconds`, enviando notificações de progresso
+    (páginas concluídas / total) ao cliente MCP a cada página.
+    """
+    deadline = time.monotonic() + wait_seconds
+    reported = None
+    while True:
+        if ctx is not None and job.pages and job.page != reported:
+            reported = job.page
+            await ctx.report_progress(job.page, job.pages)
+        if job.finished or time.monotonic() >= deadline:
+            return _export_job_status(job)
+        await anyio.sleep(0.25)
+
+
+async def _start_export(remote_jid, start_date, end_date, instance_id, ctx):
+    from export_jobs import get_job_manager
+
+    creds = InstanceConfig.resolve_instance(instance_id)
+    try:
+        job = get_job_manager().create(creds.id, remote_jid, start_date, end_date)
+    except ValueError as e:
+        return f"Formato de data inválido: {e}"
+    wait_seconds = float(InstanceConfig.getenv("EVO_EXPORT_WAIT_SECONDS", "20"))
+    return await _follow_export(job, ctx, wait_seconds)
+
+
+@tool("fecth_all_contact_messages")
+async def fecth_all_contact_messages(remote_jid: str, instance_id: str | None = None, ctx: Context = None) -> str:
     """
     Retorna todas as mensagens trocadas com um contato específico do WhatsApp.
 
     Esta ferramenta recupera todo o histórico disponível de mensagens de um contato
-    retornando as mensagens em formato csv.
+    retornando as mensagens em formato csv. A exportação roda em segundo plano e
+    notifica o progresso; se não terminar em alguns segundos, a resposta traz o id
+    do job para consulta posterior com get_export_job.
 
     Args:
         remote_jid (str): JID do contato no formato 'número@c.us'.
 
     Returns:
-        str: As mensagens exportadas em formato csv.
+        str: As mensagens exportadas em formato csv, ou o andamento da exportação.
     """
-    controller = MessageController(instance_id)
-    filepath = controller.fetch_all_messages(remote_jid)
-    return (
-        f"Arquivo de mensagens exportado: {filepath}"
-        if filepath
-        else "Erro ao exportar mensagens."
-    )
+    return await _start_export(remote_jid, None, None, instance_id, ctx)
 
 
-@mcp.tool(name="fecth_interval_contact_messages")
-def fecth_interval_contact_messages(
-    remote_jid: str, start_date: str, end_date: str, instance_id: str | None = None
+@tool("fecth_interval_contact_messages")
+async def fecth_interval_contact_messages(
+    remote_jid: str, start_date: str, end_date: str, instance_id: str | None = None, ctx: Context = None
 ) -> str:
     """
     Retorna todas as mensagens trocadas com um contato específico do WhatsApp dentro de um intervalo de datas..
 
     Esta ferramenta busca todas as mensagens trocadas com o contato especificado
-    entre `start_date` e `end_date`, retornando as mensagens em formato csv.
+    entre `start_date` e `end_date`, retornando as mensagens em formato csv. A
+    exportação roda em segundo plano, como em fecth_all_contact_messages.
 
     Args:
         remote_jid (str): JID do contato no formato 'número@c.us'.
@@ -457,15 +859,245 @@ def fecth_interval_contact_messages(
         end_date (str): Data e hora de término (formato 'YYYY-MM-DD HH:MM:SS').
 
     Returns:
-        str: As mensagens exportadas em formato csv.
+        str: As mensagens exportadas em formato csv, ou o andamento da exportação.
     """
+    return await _start_export(remote_jid, start_date, end_date, instance_id, ctx)
+
+
+@tool("get_export_job")
+async def get_export_job(
+    job_id: str | None = None, resume: bool = False, wait_seconds: float = 0, ctx: Context = None
+) -> str:
+    """
+    Consulta uma exportação de mensagens em segundo plano e devolve o resultado quando pronta.
+
+    As exportações gravam um checkpoint a cada página: se falharem (ou se o servidor
+    for reiniciado) elas continuam da última página concluída, sem repetir mensagens.
+
+    Args:
+        job_id (str, opcional): Id informado por fecth_all_contact_messages ou
+            fecth_interval_contact_messages. Sem id, lista as exportações conhecidas.
+        resume (bool, opcional): Retoma uma exportação que falhou. Padrão: False.
+        wait_seconds (float, opcional): Aguarda até esse tempo pela conclusão,
+            notificando o progresso. Padrão: 0.
+
+    Returns:
+        str: O csv exportado, o andamento ou o erro da exportação.
+    """
+    from export_jobs import get_job_manager
+
+    manager = get_job_manager()
+    if not job_id:
+        jobs = manager.list()
+        if not jobs:
+            return "Nenhuma exportação registrada."
+        return "".join(
+            f"- {job.job_id}: {job.remote_jid} ({job.instance_id}), {job.status}, "
+            f"página {job.page} de {job.pages or '?'}, {job.rows} mensagens\n"
+            for job in jobs
+        )
+
+    job = manager.resume(job_id) if resume else manager.get(job_id)
+    if job is None:
+        return f"Exportação {job_id} não encontrada."
+    return await _follow_export(job, ctx, max(wait_seconds, 0))
+
+
+@tool("export_contact_messages")
+def export_contact_messages(
+    remote_jid: str,
+    format: str = "parquet",
+    columns: list[str] | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    instance_id: str | None = None,
+) -> str:
+    """
+    Exporta o histórico de mensagens de um contato ou grupo para um arquivo colunar.
+
+    Indicado para históricos grandes e para análise posterior (pandas, DuckDB, Spark):
+    o arquivo é gravado com compressão à medida que as páginas chegam da API, no
+    diretório EVO_EXPORT_DIR do servidor. Requer o pacote opcional pyarrow.
+
+    Args:
+        remote_jid (str): JID do contato ('número@s.whatsapp.net') ou do grupo ('...@g.us').
+        format (str, opcional): "parquet" (padrão) ou "arrow" (Arrow IPC).
+        columns (list[str], opcional): Colunas a exportar, entre fromMe, remoteJid,
+            messageType, text, timestamp, pushName e source. Padrão: todas.
+        start_date (str, opcional): Data e hora de início ('YYYY-MM-DD HH:MM:SS').
+        end_date (str, opcional): Data e hora de término ('YYYY-MM-DD HH:MM:SS').
+        instance_id (str, opcional): Instância a consultar.
+
+    Returns:
+        str: Caminho do arquivo gerado e quantidade de mensagens exportadas.
+    """
+    from message_controller import MessageController
+
     controller = MessageController(instance_id)
-    filepath = controller.fetch_interval_messages(remote_jid, start_date, end_date)
-    return (
-        f"Arquivo de mensagens exportado: {filepath}"
-        if filepath
-        else "Erro ao exportar mensagens no intervalo."
+    try:
+        path, rows = controller.export_messages(remote_jid, format, columns, start_date, end_date)
+    except (ImportError, ValueError) as e:
+        return f"Erro ao exportar mensagens: {e}"
+    return f"Arquivo de mensagens exportado: {path} ({rows} mensagens)"
+
+
+@tool("search_messages")
+def search_messages(
+    query: str,
+    remote_jid: str | None = None,
+    sender: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    limit: int = 20,
+    instance_id: str | None = None,
+) -> str:
+    """
+    Pesquisa por palavras no texto das mensagens já armazenadas localmente.
+
+    A busca ignora acentos e maiúsculas e encontra variações pelo início da palavra
+    ("nota" encontra "notas"). Todas as palavras da consulta precisam aparecer. O índice
+    local é alimentado pelo webhook e por toda consulta de mensagens feita pelas outras
+    ferramentas; mensagens nunca obtidas não aparecem nos resultados.
+
+    Args:
+        query (str): Palavras a procurar, por exemplo "nota fiscal".
+        remote_jid (str, opcional): Restringe a um chat (grupo '...@g.us' ou contato).
+        sender (str, opcional): Número ou nome de quem enviou a mensagem.
+        start_date (str, opcional): Data e hora mínima no formato 'YYYY-MM-DD HH:MM:SS'.
+        end_date (str, opcional): Data e hora máxima no formato 'YYYY-MM-DD HH:MM:SS'.
+        limit (int, opcional): Quantidade máxima de resultados. Padrão: 20.
+        instance_id (str, opcional): Instância a pesquisar. Use "all" para todas.
+
+    Returns:
+        str: Mensagens encontradas, da mais relevante para a menos relevante, com chat,
+            remetente, data e hora e um trecho com as palavras encontradas entre ** **.
+    """
+    from event_store import get_store
+
+    instance = None if InstanceConfig.is_all(instance_id) else InstanceConfig.resolve_instance(instance_id).id
+    fmt = "%Y-%m-%d %H:%M:%S"
+    try:
+        timestamp_start = int(datetime.strptime(start_date, fmt).timestamp()) if start_date else None
+        timestamp_end = int(datetime.strptime(end_date, fmt).timestamp()) if end_date else None
+    except ValueError as e:
+        return f"Formato de data inválido: {e}"
+
+    results = get_store().search_messages(
+        query,
+        instance=instance,
+        remote_jid=remote_jid,
+        sender=sender,
+        timestamp_start=timestamp_start,
+        timestamp_end=timestamp_end,
+        limit=limit,
     )
+    if not results:
+        return "Nenhuma mensagem encontrada no índice local."
+
+    results_string = ""
+    for result in results:
+        if result["from_me"]:
+            sender_label = "Eu"
+        else:
+            number = (result["participant"] or result["remote_jid"]).split("@")[0]
+            sender_label = f"{result['push_name']} ({number})" if result["push_name"] else number
+        results_string += f"Mensagem -----------------------------------\n"
+        if instance is None:
+            results_string += f"Instância: {result['instance']}\n"
+        results_string += f"Chat: {result['remote_jid']}\n"
+        results_string += f"Usuário: {sender_label}\n"
+        results_string += f"Data e hora: {datetime.fromtimestamp(result['timestamp']).strftime('%d/%m/%Y %H:%M:%S')}\n"
+        results_string += f"Trecho: {result['snippet']}\n"
+
+    return results_string
+
+
+def _format_receipt_stats(stats):
+    campaign = stats["campaign"] or "(sem campanha)"
+    total = stats["total"]
+
+    def share(count):
+        return f"{count} ({count / total:.0%})" if total else "0"
+
+    result = f"Campanha: {campaign}\n"
+    result += f"Enviadas: {total}\n"
+    result += f"Entregues: {share(stats['delivered'])}\n"
+    result += f"Lidas: {share(stats['read'])}\n"
+    result += f"Falharam: {share(stats['failed'])}\n"
+    if stats["avg_delivery_seconds"] is not None:
+        result += f"Tempo médio até a entrega: {stats['avg_delivery_seconds'] / 60:.1f} min\n"
+    if stats["avg_read_seconds"] is not None:
+        result += f"Tempo médio até a leitura: {stats['avg_read_seconds'] / 60:.1f} min\n"
+    result += f"Período: {datetime.fromtimestamp(stats['first_sent_at']).strftime('%d/%m/%Y %H:%M')} a "
+    result += f"{datetime.fromtimestamp(stats['last_sent_at']).strftime('%d/%m/%Y %H:%M')}\n"
+    return result
+
+
+@tool("get_delivery_status")
+def get_delivery_status(
+    message_id: str | None = None,
+    campaign: str | None = None,
+    refresh: bool = False,
+    instance_id: str | None = None,
+) -> str:
+    """
+    Informa se as mensagens enviadas pelas ferramentas foram entregues e lidas.
+
+    Os status vêm dos eventos de confirmação (webhook messages.update) ou da consulta
+    periódica configurada, gravados em uma tabela local: a resposta não relê o
+    histórico das conversas. Somente mensagens enviadas por este servidor são acompanhadas.
+
+    Args:
+        message_id (str, opcional): Id devolvido por send_message_to_group ou
+            send_message_to_phone. Informe para consultar uma única mensagem.
+        campaign (str, opcional): Campanha informada no envio. Sem message_id nem
+            campaign, lista as estatísticas de todas as campanhas.
+        refresh (bool, opcional): Consulta a API antes de responder, para mensagens
+            ainda não lidas. Útil quando o webhook não está configurado. Padrão: False.
+        instance_id (str, opcional): Instância a consultar. Use "all" para todas.
+
+    Returns:
+        str: Status da mensagem (pendente, enviada, entregue, lida, reproduzida ou falhou)
+            com os horários de envio, entrega e leitura, ou, por campanha, o total enviado,
+            quantas foram entregues, lidas e falharam e o tempo médio até a entrega e a leitura.
+    """
+    import delivery_tracker
+    from event_store import get_store
+
+    instance = None if InstanceConfig.is_all(instance_id) else InstanceConfig.resolve_instance(instance_id).id
+    errors = ""
+    if refresh:
+        targets = [instance] if instance else [inst.id for inst in InstanceConfig.load_instances()]
+        for target in targets:
+            try:
+                delivery_tracker.poll(target)
+            except Exception as e:
+                errors += f"Não foi possível atualizar os status da instância {target}: {e}\n"
+
+    store = get_store()
+    if message_id:
+        receipt = store.get_receipt(message_id, instance)
+        if receipt is None:
+            return errors + f"Mensagem {message_id} não encontrada entre os envios acompanhados."
+
+        def when(timestamp):
+            return datetime.fromtimestamp(timestamp).strftime("%d/%m/%Y %H:%M:%S") if timestamp else "-"
+
+        result = f"Mensagem: {receipt['message_id']}\n"
+        result += f"Instância: {receipt['instance']}\n"
+        result += f"Destinatário: {receipt['remote_jid']}\n"
+        if receipt["campaign"]:
+            result += f"Campanha: {receipt['campaign']}\n"
+        result += f"Status: {delivery_tracker.STATUS_LABELS[receipt['status']]}\n"
+        result += f"Enviada em: {when(receipt['sent_at'])}\n"
+        result += f"Entregue em: {when(receipt['delivered_at'])}\n"
+        result += f"Lida em: {when(receipt['read_at'])}\n"
+        return errors + result
+
+    all_stats = store.receipt_stats(instance=instance, campaign=campaign)
+    if not all_stats:
+        return errors + "Nenhum envio acompanhado" + (f" na campanha {campaign}." if campaign else ".")
+    return errors + "\n".join(_format_receipt_stats(stats) for stats in all_stats)
 
 
 # ----------------------------------------------
@@ -474,6 +1106,38 @@ def fecth_interval_contact_messages(
 
 
 if __name__ == "__main__":
+    from webhook_server import start_webhook_server
+
+    # Receptor de webhooks opcional (EVO_WEBHOOK_PORT) que alimenta o armazenamento local
+    start_webhook_server()
+    # Endpoint OpenMetrics opcional (EVO_METRICS_PORT)
+    metrics.start_metrics_server()
+
+    from export_jobs import resume_interrupted_jobs
+
+    # Exportações interrompidas por um reinício continuam do último checkpoint
+    resume_interrupted_jobs()
+
+    from delivery_tracker import start_receipt_polling
+
+    # Consulta periódica dos status de entrega quando não há webhook (EVO_RECEIPT_POLL_INTERVAL)
+    start_receipt_polling()
+
+    from cache_snapshot import start_snapshots
+    from warmup import warm_up_after_initialize
+
+    # Caches da sessão anterior (EVO_SNAPSHOT_PATH), revalidados em segundo plano
+    restored = start_snapshots()
+    # Contatos e grupos de todas as instâncias carregados em segundo plano após o primeiro
+    # initialize (EVO_WARMUP=1); caches restaurados do snapshot são sempre revalidados
+    warm_up_after_initialize(mcp, refresh=restored > 0)
+
+    # stdio (padrão, um processo por sessão) ou um servidor HTTP de longa duração
+    # ("streamable-http" ou "sse") compartilhado por vários clientes MCP
+    transport = InstanceConfig.getenv("EVO_MCP_TRANSPORT", "stdio")
+    if transport != "stdio":
+        mcp.settings.host = InstanceConfig.getenv("EVO_MCP_HOST", mcp.settings.host)
+        mcp.settings.port = int(InstanceConfig.getenv("EVO_MCP_PORT", str(mcp.settings.port)))
 
-    mcp.run(transport="stdio")
+    mcp.run(transport=transport)
     #print(get_group_messages("120363400095683544@g.us", "2025-05-01 00:00:00", "2025-05-31 23:59:59"))
@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from instance_config import InstanceConfig
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class ExportJob:
+    """State of a CSV export job, checkpointed to disk after every page."""
+
+    job_id: str
+    instance_id: str
+    remote_jid: str
+    path: str
+    start: Optional[str] = None
+    end: Optional[str] = None
+    status: str = PENDING
+    # Última página concluída e total informado pela API
+    page: int = 0
+    pages: Optional[int] = None
+    rows: int = 0
+    # Tamanho do CSV ao fim da última página concluída; o excedente é descartado ao retomar
+    offset: int = 0
+    # Ids da última página concluída, para não repetir mensagens se as páginas se deslocarem
+    last_ids: List[str] = field(default_factory=list)
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class ExportJobManager:
+    """
+    Runs message exports in background threads.
+
+    Each job appends one page at a time to its CSV file and then saves a
+    checkpoint (JSON next to the output). A failed page is retried
+    EVO_EXPORT_RETRIES times; after that the job is marked failed and can be
+    resumed from the last completed page. Jobs interrupted by a restart are
+    resumed when the manager is created.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.jobs_dir = os.path.join(directory, "jobs")
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.retries = int(InstanceConfig.getenv("EVO_EXPORT_RETRIES", "3"))
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ExportJob] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._load()
+
+    def _load(self):
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name), encoding="utf-8") as f:
+                    job = ExportJob(**json.load(f))
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Checkpoint de exportação inválido {name}: {e}", file=sys.stderr)
+                continue
+            self._jobs[job.job_id] = job
+
+    def _save(self, job: ExportJob):
+        job.updated_at = time.time()
+        target = os.path.join(self.jobs_dir, f"{job.job_id}.json")
+        # Grava e renomeia para que um checkpoint nunca fique pela metade
+        with open(target + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f, ensure_ascii=False)
+        os.replace(target + ".tmp", target)
+
+    def create(self, instance_id: str, remote_jid: str, start: Optional[str] = None, end: Optional[str] = None) -> ExportJob:
+        if start or end:
+            # Valida o intervalo antes de criar o job
+            datetime.strptime(start, "%Y-%m-%d %H:%M:%S")
+            datetime.strptime(end, "%Y-%m-%d %H:%M:%S")
+
+        job_id = uuid.uuid4().hex[:12]
+        chat = remote_jid.split("@")[0]
+        job = ExportJob(
+            job_id=job_id,
+            instance_id=instance_id,
+            remote_jid=remote_jid,
+            path=os.path.abspath(os.path.join(self.directory, f"{instance_id}_{chat}_{job_id}.csv")),
+            start=start,
+            end=end,
+        )
+        with self._lock:
+            self._jobs[job_id] = job
+        self._save(job)
+        self.resume(job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[ExportJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.created_at)
+
+    def resume(self, job_id: str) -> Optional[ExportJob]:
+        """Starts (or restarts, from its checkpoint) a job that is not running or done."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status == DONE:
+            return job
+        with self._lock:
+            thread = self._threads.get(job_id)
+            if thread is not None and thread.is_alive():
+                return job
+            job.status = RUNNING
+            job.attempts = 0
+            job.error = None
+            thread = threading.Thread(target=self._run, args=(job,), name=f"evo-export-{job_id}", daemon=True)
+            self._threads[job_id] = thread
+        self._save(job)
+        thread.start()
+        return job
+
+    def resume_interrupted(self):
+        """Resumes jobs that were running when the previous process stopped."""
+        for job in self.list():
+            if job.status in (PENDING, RUNNING):
+                self.resume(job.job_id)
+
+    def _run(self, job: ExportJob):
+        while True:
+            try:
+                self._export(job)
+                job.status = DONE
+                job.error = None
+                self._save(job)
+                return
+            except Exception as e:
+                job.attempts += 1
+                job.error = f"{type(e).__name__}: {e}"
+                if job.attempts > self.retries:
+                    job.status = FAILED
+                    self._save(job)
+                    print(f"Exportação {job.job_id} falhou na página {job.page + 1}: {e}", file=sys.stderr)
+                    return
+                self._save(job)
+                time.sleep(min(2 ** job.attempts, 30))
+
+    def _export(self, job: ExportJob):
+        from message_controller import MessageController
+        from message_service import EXPORT_FIELDS
+
+        controller = MessageController(job.instance_id)
+        service = controller.message_service
+        date_ini = datetime.strptime(job.start, "%Y-%m-%d %H:%M:%S") if job.start else None
+        date_end = datetime.strptime(job.end, "%Y-%m-%d %H:%M:%S") if job.end else None
+
+        mode = "r+b" if os.path.exists(job.path) else "wb"
+        with open(job.path, mode) as output:
+            # Descarta o que foi gravado depois do último checkpoint
+            output.truncate(job.offset)
+            output.seek(job.offset)
+
+            skip_ids = set(job.last_ids)
+            for page, pages, records in service.iter_pages(
+                controller.instance_id, controller.instance_token, job.remote_jid, start_page=job.page + 1
+            ):
+                ids = [(msg.get("key") or {}).get("id") for msg in records]
+                if skip_ids:
+                    records = [msg for msg, key_id in zip(records, ids) if key_id not in skip_ids]
+                    skip_ids = set()
+                if date_ini is not None:
+                    records = [msg for msg in records if service._in_interval(msg, date_ini, date_end)]
+
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=list(EXPORT_FIELDS))
+                if job.offset == 0:
+                    writer.writeheader()
+                writer.writerows(service._simplify(msg) for msg in records)
+                output.write(buffer.getvalue().encode("utf-8"))
+                output.flush()
+                os.fsync(output.fileno())
+
+                job.page = page
+                job.pages = pages
+                job.rows += len(records)
+                job.offset = output.tell()
+                job.last_ids = [key_id for key_id in ids if key_id]
+                job.attempts = 0
+                self._save(job)
+
+
+_manager: Optional[ExportJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> ExportJobManager:
+    """Returns the process-wide job manager (jobs under EVO_EXPORT_DIR, default: exports)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ExportJobManager(InstanceConfig.getenv("EVO_EXPORT_DIR", "exports"))
+                _manager.resume_interrupted()
+    return _manager
+
+
+def resume_interrupted_jobs():
+    """Called at server start: resumes unfinished jobs left by a previous process."""
+    directory = InstanceConfig.getenv("EVO_EXPORT_DIR", "exports")
+    if os.path.isdir(os.path.join(directory, "jobs")):
+        get_job_manager()
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+import profiling
+from instance_config import InstanceConfig
+
+
+@dataclass
+class InstanceResult:
+    """Result of a call made against one instance during a fan-out."""
+
+    instance_id: str
+    value: Any = None
+    error: Optional[Exception] = None
+
+
+def resolve_targets(instance_id: Optional[str]) -> List[Optional[str]]:
+    """
+    Expands the instance selector of a tool: `all` becomes every configured
+    instance, anything else is kept as a single target.
+    """
+    if InstanceConfig.is_all(instance_id):
+        return [inst.id for inst in InstanceConfig.load_instances()]
+    return [instance_id]
+
+
+def _run_all(calls: List[Callable[[], InstanceResult]]) -> List[InstanceResult]:
+    if len(calls) == 1:
+        return [calls[0]()]
+    max_workers = min(len(calls), int(InstanceConfig.getenv("EVO_FANOUT_MAX_WORKERS", "16")))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evo-fanout") as executor:
+        return list(executor.map(lambda call: call(), [profiling.propagate(call) for call in calls]))
+
+
+def _capture(fn: Callable[..., Any], instance_id: str, *args) -> InstanceResult:
+    try:
+        return InstanceResult(instance_id, value=fn(instance_id, *args))
+    except Exception as e:
+        return InstanceResult(instance_id, error=e)
+
+
+def fan_out(fn: Callable[[str], Any], instance_ids: List[str]) -> List[InstanceResult]:
+    """
+    Calls `fn(instance_id)` for every instance concurrently.
+
+    Results keep the order of `instance_ids`; an error in one instance is
+    captured in its result and does not affect the others.
+    """
+    if not instance_ids:
+        return []
+    return _run_all([lambda i=i: _capture(fn, i) for i in instance_ids])
+
+
+def fan_out_each(fn: Callable[[str, Any], Any], instance_ids: List[str], items: List[Any]) -> List[Tuple[Any, InstanceResult]]:
+    """
+    Calls `fn(instance_id, item)` for every instance and item concurrently,
+    e.g. one message query per (instance, group).
+
+    Returns (item, result) pairs ordered by instance, then item; errors are
+    captured per call as in `fan_out`.
+    """
+    pairs = [(i, item) for i in instance_ids for item in items]
+    if not pairs:
+        return []
+    results = _run_all([lambda i=i, item=item: _capture(fn, i, item) for i, item in pairs])
+    return [(item, result) for (_, item), result in zip(pairs, results)]
+
+
+def gather(*calls: Callable[[], Any]) -> List[Any]:
+    """
+    Runs independent zero-argument calls concurrently, so a composite tool
+    takes about as long as its slowest sub-call instead of their sum.
+
+    Returns the values in argument order. Every call runs to completion; the
+    first error, in argument order, is then re-raised.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+    with ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix="evo-gather") as executor:
+        futures = [executor.submit(profiling.propagate(call)) for call in calls]
+    return [future.result() for future in futures]
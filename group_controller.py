@@ -1,14 +1,17 @@
-import os
 from datetime import datetime
-from dotenv import load_dotenv
-from evolutionapi.client import EvolutionClient
 
+import adaptive_limiter
+import circuit_breaker
+import client_pool
+import metrics
+from cache import StaleList, describe_age, get_cache
+from circuit_breaker import describe_failure
+from event_store import get_store
 from group import Group
 from instance_config import InstanceConfig
 from message_sandeco import MessageSandeco
-
-# Load env variables
-load_dotenv()
+from message_service import MessageService
+from singleflight import coalesce
 
 
 class GroupController:
@@ -21,23 +24,42 @@ class GroupController:
         self.instance_id = creds.id
         self.instance_token = creds.token
         self.base_url = creds.url
-        self.api_token = os.getenv(f"EVO_INSTANCE_{self.instance_id}_APIKEY", os.getenv("EVO_API_TOKEN"))
+        self.api_token = creds.api_key
 
         if not all([self.base_url, self.api_token, self.instance_id, self.instance_token]):
             raise ValueError("Variáveis de ambiente necessárias não configuradas corretamente para a instância.")
 
-        self.client = EvolutionClient(base_url=self.base_url, api_token=self.api_token)
+        self.client = client_pool.get_client(self.base_url, self.api_token)
         self.groups = []
+        # Preenchido quando o resultado veio de dados antigos por falha da API
+        self.stale_note = None
 
-    def fetch_groups(self):
+    def fetch_groups(self, refresh: bool = False):
         """
-        Fetches all groups for the instance.
+        Fetches all groups for the instance. `refresh` skips the cache.
         """
-        groups_data = self.client.group.fetch_all_groups(
-            instance_id=self.instance_id,
-            instance_token=self.instance_token,
-            get_participants=False,
-        )
+        store = get_store()
+        live = store.is_live(self.instance_id, "groups")
+        metrics.record_cache("event_store_groups", live)
+        if live:
+            groups_data = store.get_groups(self.instance_id)
+        else:
+            # Cache compartilhado entre todos os clientes do servidor
+            groups_cache = get_cache("groups")
+            groups_data = None if refresh else groups_cache.get(self.instance_id)
+            if groups_data is None:
+                try:
+                    groups_data = coalesce(self.instance_id, "fetchAllGroups", None, self._fetch_all_groups)
+                except Exception as e:
+                    stale = groups_cache.get_stale(self.instance_id)
+                    if stale is None:
+                        raise
+                    groups_data, age = stale
+                    self.stale_note = f"Evolution API indisponível ({describe_failure(e)}); grupos do cache de {describe_age(age)} atrás."
+                else:
+                    groups_cache.put(self.instance_id, groups_data)
+                    if store.is_webhook_active(self.instance_id):
+                        store.replace_groups(self.instance_id, groups_data)
 
         self.groups = []
         for group in groups_data:
@@ -45,22 +67,72 @@ class GroupController:
             self.groups.append(
                 Group(
                     group_id=group_id,
-                    name=group["subject"],
+                    name=group.get("subject"),
                     subject_owner=group.get("subjectOwner"),
-                    subject_time=group["subjectTime"],
+                    subject_time=group.get("subjectTime"),
                     picture_url=group.get("pictureUrl"),
-                    size=group["size"],
-                    creation=group["creation"],
+                    size=group.get("size"),
+                    creation=group.get("creation"),
                     owner=group.get("owner"),
-                    restrict=group["restrict"],
-                    announce=group["announce"],
-                    is_community=group["isCommunity"],
-                    is_community_announce=group["isCommunityAnnounce"],
+                    restrict=group.get("restrict"),
+                    announce=group.get("announce"),
+                    is_community=group.get("isCommunity"),
+                    is_community_announce=group.get("isCommunityAnnounce"),
                 )
             )
 
+        if self.stale_note:
+            self.groups = StaleList(self.groups, self.stale_note)
         return self.groups
 
+    def _fetch_all_groups(self):
+        with circuit_breaker.guard(self.instance_id), metrics.upstream("fetchAllGroups", self.instance_id):
+            return self.client.group.fetch_all_groups(
+                instance_id=self.instance_id,
+                instance_token=self.instance_token,
+                get_participants=False,
+            )
+
+    def fetch_participants(self):
+        """
+        Group records with their participant lists. The API builds them group
+        by group, so they are requested only when needed and cached apart
+        from the plain group list.
+        """
+        participants_cache = get_cache("group_participants")
+        groups_data = participants_cache.get(self.instance_id)
+        if groups_data is None:
+            groups_data = coalesce(
+                self.instance_id, "fetchAllGroups:participants", None, self._fetch_all_groups_with_participants
+            )
+            participants_cache.put(self.instance_id, groups_data)
+        return groups_data
+
+    def _fetch_all_groups_with_participants(self):
+        with (
+            circuit_breaker.guard(self.instance_id),
+            adaptive_limiter.limit(self.instance_id),
+            metrics.upstream("fetchAllGroups", self.instance_id),
+        ):
+            return self.client.group.fetch_all_groups(
+                instance_id=self.instance_id,
+                instance_token=self.instance_token,
+                get_participants=True,
+            )
+
+    def get_member_groups(self, remote_jid):
+        """Ids of the groups where `remote_jid` (or its number) is a participant."""
+        number = remote_jid.split("@")[0]
+        group_ids = []
+        for group in self.fetch_participants():
+            for participant in group.get("participants") or []:
+                # Versões recentes identificam participantes por LID e trazem o número à parte
+                jids = (participant.get("id"), participant.get("jid"), participant.get("phoneNumber"))
+                if any(jid and jid.split("@")[0] == number for jid in jids):
+                    group_ids.append(group["id"])
+                    break
+        return group_ids
+
     def get_groups(self):
         if not self.groups:
             self.fetch_groups()
@@ -86,21 +158,41 @@ class GroupController:
         timestamp_start = to_iso8601(start_date)
         timestamp_end = to_iso8601(end_date)
 
-        group_mensagens = self.client.chat.get_messages(
-            instance_id=self.instance_id,
-            remote_jid=group_id,
-            instance_token=self.instance_token,
-            timestamp_start=timestamp_start,
-            timestamp_end=timestamp_end,
-            page=1,
-            offset=1000,
-        )
-
-        msgs = MessageSandeco.get_messages(group_mensagens)
-
+        store = get_store()
         data_obj = datetime.strptime(timestamp_start, "%Y-%m-%dT%H:%M:%SZ")
         timestamp_limite = int(data_obj.timestamp())
 
+        covered = store.covers_messages(self.instance_id, timestamp_limite)
+        metrics.record_cache("event_store_messages", covered)
+        if covered:
+            # Webhook ativo desde antes do início do intervalo: nenhuma chamada à API
+            timestamp_fim = int(datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S").timestamp())
+            records = store.get_messages(self.instance_id, group_id, timestamp_limite, timestamp_fim)
+            return [MessageSandeco(record) for record in records]
+
+        where = {
+            "key": {"remoteJid": group_id},
+            "messageTimestamp": {"gte": timestamp_start, "lte": timestamp_end},
+        }
+        try:
+            # Decodificada em fluxo, alimenta o índice de busca local e compartilha pedidos idênticos
+            group_mensagens = MessageService(self.client).find_messages(
+                self.instance_id, self.instance_token, where, page=1, offset=1000
+            )
+        except Exception as e:
+            # Sem a API, serve o que já foi obtido antes e está no armazenamento local
+            timestamp_fim = int(datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S").timestamp())
+            records = store.get_messages(self.instance_id, group_id, timestamp_limite, timestamp_fim)
+            if not records:
+                raise
+            self.stale_note = (
+                f"Evolution API indisponível ({describe_failure(e)}); mensagens do armazenamento local, "
+                "podem faltar as mais recentes."
+            )
+            return StaleList([MessageSandeco(record) for record in records], self.stale_note)
+
+        msgs = MessageSandeco.get_messages(group_mensagens)
+
         msgs_filtradas = []
         for msg in msgs:
             if msg.message_timestamp >= timestamp_limite:
@@ -1,9 +1,12 @@
 import os
-from dataclasses import dataclass
-from typing import List, Optional
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Tuple
 
 
-@dataclass
+@dataclass(frozen=True)
 class InstanceInfo:
     """Stores public (non-secret) info about an Evolution API instance."""
 
@@ -12,7 +15,7 @@ class InstanceInfo:
     url: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class InstanceCredentials:
     """Full credentials for an Evolution API instance (includes token)."""
 
@@ -20,50 +23,161 @@ class InstanceCredentials:
     name: str
     url: str
     token: str
+    api_key: Optional[str] = None
 
 
-class InstanceConfig:
-    """Loads Evolution API instances from environment variables."""
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Immutable view of the configuration, parsed and validated once.
 
-    @staticmethod
-    def _parse_instance_ids() -> List[str]:
-        raw = os.getenv("EVO_INSTANCES", "")
-        ids = [i.strip() for i in raw.split(",") if i.strip()]
-        return ids
+    `credentials` indexes every complete instance by id; `declared_ids` keeps
+    the ids listed in EVO_INSTANCES (including incomplete ones) so errors can
+    tell missing and incomplete instances apart.
+    """
+
+    declared_ids: Tuple[str, ...]
+    credentials: Mapping[str, InstanceCredentials]
+    instances: Tuple[InstanceInfo, ...]
+    default_id: Optional[str]
+    legacy: Optional[InstanceCredentials]
+    settings: Mapping[str, str] = field(repr=False)
 
     @staticmethod
-    def load_instances() -> List[InstanceInfo]:
-        ids = InstanceConfig._parse_instance_ids()
-        instances: List[InstanceInfo] = []
+    def build(env: Mapping[str, str]) -> "ConfigSnapshot":
+        raw = env.get("EVO_INSTANCES", "")
+        ids = tuple(i.strip() for i in raw.split(",") if i.strip())
+
+        credentials = {}
+        instances = []
+        legacy = None
 
         if ids:
             for instance_id in ids:
                 prefix = f"EVO_INSTANCE_{instance_id}_"
-                url = os.getenv(prefix + "URL")
-                token = os.getenv(prefix + "TOKEN")  # token not exposed, only used to validate presence
-                name = os.getenv(prefix + "NAME", instance_id)
+                url = env.get(prefix + "URL")
+                token = env.get(prefix + "TOKEN")
+                name = env.get(prefix + "NAME", instance_id)
+                api_key = env.get(prefix + "APIKEY", env.get("EVO_API_TOKEN"))
 
                 if url and token:
+                    credentials[instance_id] = InstanceCredentials(instance_id, name, url, token, api_key)
                     instances.append(InstanceInfo(instance_id, name, url))
-            return instances
 
-        # Fallback to legacy single-instance env vars
-        legacy_url = os.getenv("EVO_API_URL")
-        legacy_token = os.getenv("EVO_API_TOKEN")
-        legacy_name = os.getenv("EVO_INSTANCE_NAME", "default")
+            default_id = env.get("EVO_INSTANCE_DEFAULT") or "default"
+        else:
+            # Fallback to legacy single-instance env vars
+            url = env.get("EVO_API_URL")
+            api_token = env.get("EVO_API_TOKEN")
+            name = env.get("EVO_INSTANCE_NAME", "default")
+            instance_token = env.get("EVO_INSTANCE_TOKEN")
+
+            if url and api_token:
+                instances.append(InstanceInfo("default", name, url))
+                if instance_token:
+                    legacy = InstanceCredentials(
+                        "default", name, url, instance_token, env.get("EVO_INSTANCE_default_APIKEY", api_token)
+                    )
+            default_id = "default"
+
+        return ConfigSnapshot(
+            declared_ids=ids,
+            credentials=MappingProxyType(credentials),
+            instances=tuple(instances),
+            default_id=default_id,
+            legacy=legacy,
+            settings=MappingProxyType(dict(env)),
+        )
+
+
+class InstanceConfig:
+    """
+    Loads Evolution API instances from environment variables and `.env`.
+
+    The configuration is kept in an immutable `ConfigSnapshot` that is swapped
+    atomically when the `.env` file changes, appears or disappears (checked by
+    mtime and size at most once per EVO_CONFIG_RELOAD_INTERVAL seconds), so
+    instances can be added or rotated without restarting the server. Process
+    environment variables take precedence over `.env`, as with `load_dotenv`.
+
+    Only the `.env` file is watched: changes to `os.environ` after the first
+    snapshot are ignored until the file changes or `reload()` is called.
+    """
+
+    # Seletor aceito pelas ferramentas de leitura para consultar todas as instâncias
+    ALL_INSTANCES = "all"
+
+    _snapshot: Optional[ConfigSnapshot] = None
+    _env_file: Optional[str] = None
+    _env_stamp: Optional[Tuple[float, int]] = None
+    _next_check = 0.0
+    _lock = threading.Lock()
 
-        if legacy_url and legacy_token:
-            instances.append(InstanceInfo("default", legacy_name, legacy_url))
+    @staticmethod
+    def _stat_env_file(path: Optional[str]) -> Optional[Tuple[float, int]]:
+        if not path:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime, st.st_size)
+
+    @staticmethod
+    def _find_env_file() -> str:
+        """EVO_ENV_FILE or the `.env` found by python-dotenv ("" when there is none)."""
+        # Importado sob demanda para não pesar na inicialização do servidor
+        from dotenv import find_dotenv
+
+        return os.environ.get("EVO_ENV_FILE") or find_dotenv()
+
+    @classmethod
+    def reload(cls) -> ConfigSnapshot:
+        """Re-reads `.env` and the process environment and swaps the snapshot."""
+        from dotenv import dotenv_values
+
+        with cls._lock:
+            env_file = cls._find_env_file()
+            stamp = cls._stat_env_file(env_file)
+            file_values = {k: v for k, v in dotenv_values(env_file).items() if v is not None} if stamp else {}
+
+            cls._snapshot = ConfigSnapshot.build({**file_values, **os.environ})
+            cls._env_file = env_file
+            cls._env_stamp = stamp
+            cls._next_check = time.monotonic() + float(cls._snapshot.settings.get("EVO_CONFIG_RELOAD_INTERVAL", "1"))
+            return cls._snapshot
+
+    @classmethod
+    def snapshot(cls) -> ConfigSnapshot:
+        snapshot = cls._snapshot
+        if snapshot is None:
+            return cls.reload()
+
+        now = time.monotonic()
+        if now >= cls._next_check:
+            cls._next_check = now + float(snapshot.settings.get("EVO_CONFIG_RELOAD_INTERVAL", "1"))
+            # Sem .env na última leitura, procura de novo: um arquivo criado depois também conta
+            env_file = cls._env_file or cls._find_env_file()
+            if cls._stat_env_file(env_file) != cls._env_stamp:
+                return cls.reload()
+        return snapshot
 
-        return instances
+    @staticmethod
+    def getenv(key: str, default: Optional[str] = None) -> Optional[str]:
+        """`os.getenv` equivalent that also sees (and hot-reloads) values from `.env`."""
+        return InstanceConfig.snapshot().settings.get(key, default)
+
+    @staticmethod
+    def is_all(instance_id: Optional[str]) -> bool:
+        return bool(instance_id) and instance_id.strip().lower() == InstanceConfig.ALL_INSTANCES
+
+    @staticmethod
+    def load_instances() -> List[InstanceInfo]:
+        return list(InstanceConfig.snapshot().instances)
 
     @staticmethod
     def get_default_id() -> Optional[str]:
-        if InstanceConfig._parse_instance_ids():
-            default_id = os.getenv("EVO_INSTANCE_DEFAULT")
-            if default_id:
-                return default_id
-        return "default"
+        return InstanceConfig.snapshot().default_id
 
     @staticmethod
     def resolve_instance(instance_id: Optional[str] = None) -> InstanceCredentials:
@@ -73,37 +187,30 @@ class InstanceConfig:
         Raises:
             ValueError: if the instance is not configured.
         """
-        ids = InstanceConfig._parse_instance_ids()
+        snapshot = InstanceConfig.snapshot()
+        ids = snapshot.declared_ids
 
         # Select instance id
         if ids:
-            target_id = instance_id or InstanceConfig.get_default_id()
+            target_id = instance_id or snapshot.default_id
+            creds = snapshot.credentials.get(target_id)
+            if creds is not None:
+                return creds
+
             if target_id not in ids:
                 raise ValueError(f"Instância '{target_id}' não configurada. IDs disponíveis: {', '.join(ids)}")
 
             prefix = f"EVO_INSTANCE_{target_id}_"
-            url = os.getenv(prefix + "URL")
-            token = os.getenv(prefix + "TOKEN")
-            name = os.getenv(prefix + "NAME", target_id)
-
-            if not (url and token):
-                raise ValueError(
-                    f"Instância '{target_id}' incompleta. Defina {prefix}URL e {prefix}TOKEN (opcional {prefix}NAME)."
-                )
-
-            return InstanceCredentials(target_id, name, url, token)
+            raise ValueError(
+                f"Instância '{target_id}' incompleta. Defina {prefix}URL e {prefix}TOKEN (opcional {prefix}NAME)."
+            )
 
         # Legacy single-instance fallback
-        url = os.getenv("EVO_API_URL")
-        token = os.getenv("EVO_API_TOKEN")
-        name = os.getenv("EVO_INSTANCE_NAME", "default")
-        instance_token = os.getenv("EVO_INSTANCE_TOKEN")
-
-        if url and token and instance_token:
+        if snapshot.legacy is not None:
             target_id = instance_id or "default"
             if target_id != "default":
                 raise ValueError("Somente a instância legado 'default' está configurada.")
-            return InstanceCredentials(target_id, name, url, instance_token)
+            return snapshot.legacy
 
         raise ValueError(
             "Nenhuma instância configurada. Defina EVO_INSTANCES com os blocos EVO_INSTANCE_<ID>_URL/TOKEN "
@@ -0,0 +1,151 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+import requests
+
+# Tamanho dos blocos lidos do socket durante a decodificação incremental
+CHUNK_SIZE = 64 * 1024
+
+
+def _ijson():
+    try:
+        import ijson
+    except ImportError:
+        return None
+    return ijson
+
+
+class _ChunkReader:
+    """
+    File-like view of the response body for ijson. Reads through
+    `iter_content`, so gzip is decoded and network errors surface as
+    requests exceptions; reports the size of each chunk to `on_bytes`.
+    """
+
+    def __init__(self, response: requests.Response, on_bytes: Optional[Callable[[int], None]]):
+        self._chunks = response.iter_content(CHUNK_SIZE)
+        self._pending = b""
+        self.on_bytes = on_bytes
+
+    def read(self, size: int = CHUNK_SIZE) -> bytes:
+        # ijson chama read(0) para descobrir se o arquivo é binário
+        if size == 0:
+            return b""
+        if not self._pending:
+            self._pending = next(self._chunks, b"")
+            if self.on_bytes is not None and self._pending:
+                self.on_bytes(len(self._pending))
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+def _select(value: Any, path: list) -> Iterator[Any]:
+    """Walks an already decoded document along an ijson prefix ('item' = every array element)."""
+    if not path:
+        yield value
+        return
+    head, rest = path[0], path[1:]
+    if head == "item":
+        for element in value or []:
+            yield from _select(element, rest)
+    elif isinstance(value, dict) and head in value:
+        yield from _select(value[head], rest)
+
+
+def _omit(value: Any, path: list):
+    """Removes the member at `path` (dict keys, 'item' = every array element) from a decoded value."""
+    if not path:
+        return
+    head, rest = path[0], path[1:]
+    if head == "item":
+        for element in value if isinstance(value, list) else []:
+            _omit(element, rest)
+    elif isinstance(value, dict) and head in value:
+        if rest:
+            _omit(value[head], rest)
+        else:
+            del value[head]
+
+
+_SCALAR_EVENTS = ("string", "number", "boolean", "null")
+
+
+def _parse_items(ijson, reader, prefix: str, meta: Optional[Dict[str, Any]], omit: Iterable[str]) -> Iterator[Any]:
+    """ijson.items with `meta` and `omit` (see `iter_items`), built from the parser events."""
+    from ijson.common import ObjectBuilder
+
+    omitted = {f"{prefix}.{path}" if prefix else path for path in omit}
+    builder = None
+    for current, event, value in ijson.parse(reader, use_float=True, buf_size=CHUNK_SIZE):
+        if builder is None:
+            if current == prefix:
+                if event in ("start_map", "start_array"):
+                    builder = ObjectBuilder()
+                    builder.event(event, value)
+                elif event in _SCALAR_EVENTS:
+                    yield value
+            elif meta is not None and current in meta and event in _SCALAR_EVENTS:
+                meta[current] = value
+            continue
+
+        if event == "map_key" and (f"{current}.{value}" if current else value) in omitted:
+            continue
+        if current in omitted or any(current.startswith(path + ".") for path in omitted):
+            continue
+        builder.event(event, value)
+        if current == prefix and event in ("end_map", "end_array"):
+            yield builder.value
+            builder = None
+
+
+def iter_items(response: requests.Response, prefix: str = "item",
+               on_bytes: Optional[Callable[[int], None]] = None,
+               meta: Optional[Dict[str, Any]] = None, omit: Iterable[str] = ()) -> Iterator[Any]:
+    """
+    Yields the values found at `prefix` (ijson syntax, e.g. 'item' for the
+    elements of a top-level array) while the body is still being downloaded.
+
+    With ijson installed only the current record is held in memory: neither
+    the raw body nor the full decoded tree is built. Without it, falls back to
+    `response.json()`. Malformed JSON raises requests' InvalidJSONError in both
+    cases. `on_bytes` receives the size of each chunk read. The response is
+    closed once the generator finishes.
+
+    `meta` maps prefixes of scalars outside the items (e.g. 'messages.pages')
+    to the values found there, filled in as they are read; `omit` lists paths
+    inside each item (e.g. 'message.base64') that are dropped while decoding.
+
+    Request the response with `stream=True`, otherwise the body has already
+    been read in full.
+    """
+    ijson = _ijson()
+    path = prefix.split(".") if prefix else []
+    try:
+        if ijson is None:
+            if on_bytes is not None:
+                on_bytes(len(response.content))
+            document = response.json()
+            for key in meta or ():
+                for value in _select(document, key.split(".")):
+                    meta[key] = value
+            for item in _select(document, path):
+                for omitted in omit:
+                    _omit(item, omitted.split("."))
+                yield item
+            return
+        try:
+            reader = _ChunkReader(response, on_bytes)
+            if meta is None and not omit:
+                yield from ijson.items(reader, prefix, use_float=True, buf_size=CHUNK_SIZE)
+            else:
+                yield from _parse_items(ijson, reader, prefix, meta, omit)
+        except ijson.JSONError as e:
+            raise requests.exceptions.InvalidJSONError(f"Resposta JSON inválida: {e}", response=response) from e
+    finally:
+        response.close()
+
+
+def load(response: requests.Response, on_bytes: Optional[Callable[[int], None]] = None) -> Any:
+    """Decodes the whole body incrementally (see `iter_items`) and returns the document."""
+    for document in iter_items(response, "", on_bytes):
+        return document
+    return None
@@ -1,14 +1,11 @@
 import os
+import time
 from datetime import datetime
-from dotenv import load_dotenv
 
-from evolutionapi.client import EvolutionClient
+import client_pool
 from instance_config import InstanceConfig
 from message_service import MessageService
 
-# Load env variables
-load_dotenv()
-
 
 class MessageController:
     def __init__(self, instance_id: str | None = None):
@@ -20,12 +17,12 @@ class MessageController:
         self.instance_id = creds.id
         self.instance_token = creds.token
         self.base_url = creds.url
-        self.api_token = os.getenv(f"EVO_INSTANCE_{self.instance_id}_APIKEY", os.getenv("EVO_API_TOKEN"))
+        self.api_token = creds.api_key
 
         if not all([self.base_url, self.api_token, self.instance_id, self.instance_token]):
             raise ValueError("Variáveis de ambiente necessárias não configuradas corretamente para a instância.")
 
-        self.client = EvolutionClient(base_url=self.base_url, api_token=self.api_token)
+        self.client = client_pool.get_client(self.base_url, self.api_token)
         self.message_service = MessageService(self.client)
 
     def fetch_all_messages(self, remote_jid: str):
@@ -50,3 +47,34 @@ class MessageController:
             date_end=dt_end,
             remoteJid=remote_jid,
         )
+
+    def export_messages(self, remote_jid: str, fmt: str = "parquet", columns=None, start: str = None, end: str = None):
+        """
+        Exports the chat history to a Parquet/Arrow file under EVO_EXPORT_DIR
+        (default: exports). Returns (path, number of messages).
+        """
+        from columnar_export import EXTENSIONS
+
+        dt_start = datetime.strptime(start, "%Y-%m-%d %H:%M:%S") if start else None
+        dt_end = datetime.strptime(end, "%Y-%m-%d %H:%M:%S") if end else None
+        if (dt_start is None) != (dt_end is None):
+            raise ValueError("Informe start_date e end_date juntos.")
+
+        directory = InstanceConfig.getenv("EVO_EXPORT_DIR", "exports")
+        os.makedirs(directory, exist_ok=True)
+        chat = remote_jid.split("@")[0]
+        path = os.path.abspath(
+            os.path.join(directory, f"{self.instance_id}_{chat}_{time.strftime('%Y%m%d-%H%M%S')}{EXTENSIONS.get(fmt, '')}")
+        )
+
+        rows = self.message_service.export_messages(
+            instance_id=self.instance_id,
+            instance_token=self.instance_token,
+            remoteJid=remote_jid,
+            path=path,
+            fmt=fmt,
+            columns=columns,
+            date_ini=dt_start,
+            date_end=dt_end,
+        )
+        return path, rows
@@ -0,0 +1,210 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from softmax_temperature import softmax
+
+# Pesos das características de relevância (aplicados sobre valores normalizados em [0, 1])
+WEIGHTS = {
+    "length": 1.0,
+    "quoted": 0.8,
+    "replied": 1.2,
+    "mentions": 0.6,
+    "media": 0.5,
+    "rarity": 0.7,
+}
+
+_MEDIA_LABELS = {
+    "imageMessage": "[imagem]",
+    "videoMessage": "[vídeo]",
+    "audioMessage": "[áudio]",
+    "documentMessage": "[documento]",
+    "stickerMessage": "[figurinha]",
+    "locationMessage": "[localização]",
+    "contactMessage": "[contato]",
+}
+
+
+@dataclass
+class DigestEntry:
+    """A run of consecutive messages from one sender selected for the digest."""
+
+    sender: str
+    first_timestamp: int
+    last_timestamp: int
+    count: int
+    text: str
+    score: float
+
+
+def _context_info(msg) -> dict:
+    block = msg.message_block or {}
+    for inner in block.values():
+        if isinstance(inner, dict) and isinstance(inner.get("contextInfo"), dict):
+            return inner["contextInfo"]
+    return msg.data.get("contextInfo") or {}
+
+
+def _text(msg) -> str:
+    text = msg.get_text()
+    if text:
+        return text
+    block = msg.message_block or {}
+    extended = block.get("extendedTextMessage")
+    if isinstance(extended, dict) and extended.get("text"):
+        return extended["text"]
+    for key in ("imageMessage", "videoMessage", "documentMessage"):
+        inner = block.get(key)
+        if isinstance(inner, dict) and inner.get("caption"):
+            return f"{_MEDIA_LABELS[key]} {inner['caption']}"
+    return _MEDIA_LABELS.get(msg.message_type, "")
+
+
+def _sender(msg) -> str:
+    if msg.from_me:
+        return "me"
+    return msg.participant or msg.remote_jid or ""
+
+
+def _scale(values: np.ndarray) -> np.ndarray:
+    low, high = values.min(), values.max()
+    if high == low:
+        return np.zeros_like(values)
+    return (values - low) / (high - low)
+
+
+def score_messages(messages, texts: Optional[List[str]] = None, senders: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Returns a salience score per message, computed column-wise with numpy:
+    text length, quoting another message, being quoted by others, mentions,
+    media and sender rarity (messages from less active members stand out).
+    """
+    n = len(messages)
+    if n == 0:
+        return np.zeros(0)
+    texts = texts if texts is not None else [_text(m) for m in messages]
+    senders = senders if senders is not None else [_sender(m) for m in messages]
+
+    contexts = [_context_info(m) for m in messages]
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.float64, count=n)
+    quoted = np.fromiter((bool(c.get("quotedMessage") or c.get("stanzaId")) for c in contexts), dtype=np.float64, count=n)
+    mentions = np.fromiter((len(c.get("mentionedJid") or ()) for c in contexts), dtype=np.float64, count=n)
+    media = np.fromiter((m.message_type in _MEDIA_LABELS for m in messages), dtype=np.float64, count=n)
+
+    ids = np.array([m.message_id or "" for m in messages])
+    quoted_ids = np.array([c.get("stanzaId") or "" for c in contexts])
+    quoted_ids = quoted_ids[quoted_ids != ""]
+    if quoted_ids.size:
+        unique_quoted, quoted_counts = np.unique(quoted_ids, return_counts=True)
+        pos = np.searchsorted(unique_quoted, ids)
+        pos = np.clip(pos, 0, unique_quoted.size - 1)
+        replied = np.where(unique_quoted[pos] == ids, quoted_counts[pos], 0).astype(np.float64)
+    else:
+        replied = np.zeros(n)
+
+    _, sender_codes, sender_counts = np.unique(
+        np.array(senders), return_inverse=True, return_counts=True
+    )
+    rarity = 1.0 / sender_counts[sender_codes]
+
+    return (
+        WEIGHTS["length"] * _scale(np.log1p(lengths))
+        + WEIGHTS["quoted"] * _scale(quoted)
+        + WEIGHTS["replied"] * _scale(np.log1p(replied))
+        + WEIGHTS["mentions"] * _scale(np.log1p(mentions))
+        + WEIGHTS["media"] * _scale(media)
+        + WEIGHTS["rarity"] * _scale(rarity)
+    )
+
+
+def format_entry(entry: DigestEntry) -> str:
+    """Formats a digest entry as get_group_digest shows it."""
+    fmt = "%d/%m/%Y %H:%M:%S"
+    when = datetime.fromtimestamp(entry.first_timestamp).strftime(fmt)
+    if entry.count > 1:
+        when += f" - {datetime.fromtimestamp(entry.last_timestamp).strftime(fmt)} ({entry.count} mensagens)"
+    return (
+        f"Mensagem -----------------------------------\n"
+        f"Usuário: {entry.sender}\n"
+        f"Data e hora: {when}\n"
+        f"Texto: {entry.text}\n"
+    )
+
+
+def digest_messages(
+    messages,
+    max_chars: int = 6000,
+    temperature: float = 0.0,
+    seed: Optional[int] = None,
+    sender_names: Optional[dict] = None,
+    format_entry: Callable[[DigestEntry], str] = format_entry,
+) -> List[DigestEntry]:
+    """
+    Selects the most salient messages of a conversation under a character budget.
+
+    Consecutive messages from the same sender are collapsed into one entry
+    (scored by its best message). With `temperature` 0 the entries are picked
+    deterministically by score (top-k); with a positive temperature they are
+    sampled without replacement from `softmax(scores / temperature)`, so low
+    temperatures approach top-k and high ones approach uniform sampling.
+    Each entry is charged the length of `format_entry(entry)`, so the
+    formatted entries together never exceed `max_chars`.
+    Selected entries are returned in chronological order.
+    """
+    messages = sorted(messages, key=lambda m: m.message_timestamp or 0)
+    if not messages:
+        return []
+
+    senders = [_sender(m) for m in messages]
+    texts = [_text(m) for m in messages]
+    scores = score_messages(messages, texts, senders)
+
+    # Início de cada sequência de mensagens consecutivas do mesmo remetente
+    _, codes = np.unique(np.array(senders), return_inverse=True)
+    starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    ends = np.append(starts[1:], len(messages))
+    block_scores = np.maximum.reduceat(scores, starts)
+
+    names = sender_names or {}
+
+    def entry(block):
+        first, last = int(starts[block]), int(ends[block])
+        head = messages[first]
+        sender = senders[first]
+        display = names.get(sender) or ("Eu" if sender == "me" else head.push_name or sender.split("@")[0])
+        return DigestEntry(
+            sender=display,
+            first_timestamp=head.message_timestamp,
+            last_timestamp=messages[last - 1].message_timestamp,
+            count=last - first,
+            text="\n".join(t for t in texts[first:last] if t),
+            score=float(block_scores[block]),
+        )
+
+    if temperature and temperature > 0 and len(starts) > 1:
+        rng = np.random.default_rng(seed)
+        probabilities = softmax(block_scores / temperature)
+        # Evita probabilidades exatamente zero, exigidas pelo choice sem reposição
+        probabilities = np.maximum(probabilities, 1e-12)
+        probabilities /= probabilities.sum()
+        order = rng.choice(len(starts), size=len(starts), replace=False, p=probabilities)
+    else:
+        order = np.argsort(-block_scores, kind="stable")
+
+    # Nenhum item custa menos que o formato de um item vazio: abaixo disso a seleção termina
+    smallest = len(format_entry(DigestEntry("", messages[0].message_timestamp or 0, 0, 1, "", 0.0)))
+    selected = {}
+    remaining = max_chars
+    for block in order:
+        if remaining < smallest:
+            break
+        # Só os candidatos examinados são formatados, não o histórico inteiro
+        candidate = entry(int(block))
+        cost = len(format_entry(candidate))
+        if cost <= remaining:
+            selected[int(block)] = candidate
+            remaining -= cost
+
+    return [selected[block] for block in sorted(selected)]
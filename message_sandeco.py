@@ -156,9 +156,13 @@ class MessageSandeco:
         self.document_file_enc_sha256 = document_data.get("fileEncSha256")
         self.document_direct_path = document_data.get("directPath")
         self.document_caption = document_data.get("caption", None)
-        self.document_base64_bytes = self.decode_base64(
-            self.data["message"].get("base64")
-        )
+        # Decodificado só quando acessado (ver document_base64_bytes)
+        self._document_base64 = self.data["message"].get("base64")
+
+    @property
+    def document_base64_bytes(self):
+        """Bytes do documento. Páginas com muitos anexos não pagam a decodificação de quem não os usa."""
+        return self.decode_base64(getattr(self, "_document_base64", None))
 
     def decode_base64(self, base64_string):
         """Converte uma string base64 em bytes."""
@@ -182,7 +186,10 @@ class MessageSandeco:
 
     def get(self) -> Dict[str, Any]:
         """Get all attributes as a dictionary."""
-        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+        attributes = {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+        if self.message_type == self.TYPE_DOCUMENT:
+            attributes["document_base64_bytes"] = self.document_base64_bytes
+        return attributes
 
     @staticmethod
     def get_messages(messages):
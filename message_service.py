@@ -1,140 +1,237 @@
-import requests
-import csv
-import io
-from datetime import datetime
-
-class MessageService:
-    def __init__(self, client):
-        self.client = client
-
-    def _convert_to_csv(self, data):
-        """
-        Converte os dados para formato CSV e retorna como string.
-        """
-        if not data:
-            return ""
-        
-        # Criar um buffer de string para o CSV
-        output = io.StringIO()
-        
-        # Definir os cabeçalhos baseados nas chaves do primeiro item
-        if data:
-            fieldnames = data[0].keys()
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            
-            # Escrever cabeçalho
-            writer.writeheader()
-            
-            # Escrever dados
-            writer.writerows(data)
-        
-        # Obter o conteúdo CSV como string
-        csv_content = output.getvalue()
-        output.close()
-        
-        return csv_content
-
-    def fetch_all_messages(self, instance_id, instance_token, remoteJid: str):
-        """
-        Busca todas as mensagens associadas ao remoteJid, extrai apenas propriedades relevantes,
-        e retorna o conteúdo CSV como string.
-        """
-        url = f"{self.client.base_url}/chat/findMessages/{instance_id}"
-        headers = {
-            "Content-Type": "application/json",
-            "apikey": self.client.api_token,
-            "Authorization": f"Bearer {self.client.api_token}",
-            "Instance-Token": instance_token
-        }
-        payload = {"where": {"key": {"remoteJid": remoteJid}}}
-
-        all_messages = []
-        current_page = 1
-
-        try:
-            while True:
-                params = {"limit": 100, "page": current_page}
-                response = requests.post(url, json=payload, headers=headers, params=params)
-                response.raise_for_status()
-                result = response.json()
-
-                records = result.get("messages", []).get("records", [])
-                for msg in records:
-                    simplified = {
-                        "fromMe": msg.get("key", {}).get("fromMe"),
-                        "remoteJid": msg.get("key", {}).get("remoteJid"),
-                        "messageType": msg.get("messageType"),
-                        "text": msg.get("message", {}).get("conversation"),
-                        "timestamp": msg.get("messageTimestamp"),
-                        "pushName": msg.get("pushName"),
-                        "source": msg.get("source")
-                    }
-                    all_messages.append(simplified)
-
-                if current_page >= result.get("messages").get("pages"):
-                    break
-
-                current_page += 1
-
-            return self._convert_to_csv(all_messages)
-
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao buscar mensagens: {e}")
-            return None
-
-    def fetch_interval_messages(self, instance_id, instance_token, date_ini: datetime, date_end: datetime, remoteJid: str):
-        """
-        Retorna o conteúdo CSV contendo mensagens de um remoteJid dentro de um intervalo de datas.
-        Apenas as propriedades relevantes são mantidas.
-        """
-        url = f"{self.client.base_url}/chat/findMessages/{instance_id}"
-        headers = {
-            "Content-Type": "application/json",
-            "apikey": self.client.api_token,
-            "Authorization": f"Bearer {self.client.api_token}",
-            "Instance-Token": instance_token
-        }
-        payload = {"where": {"key": {"remoteJid": remoteJid}}}
-
-        all_messages = []
-        current_page = 1
-
-        try:
-            # Buscar todas as mensagens
-            while True:
-                params = {"limit": 100, "page": current_page}
-                response = requests.post(url, json=payload, headers=headers, params=params)
-                response.raise_for_status()
-                result = response.json()
-
-                records = result.get("messages", []).get("records", [])
-                for msg in records:
-                    try:
-                        timestamp = int(msg.get("messageTimestamp", 0))
-                        msg_time = datetime.fromtimestamp(timestamp)
-                        
-                        # Filtrar por intervalo de datas
-                        if date_ini <= msg_time <= date_end:
-                            simplified = {
-                                "fromMe": msg.get("key", {}).get("fromMe"),
-                                "remoteJid": msg.get("key", {}).get("remoteJid"),
-                                "messageType": msg.get("messageType"),
-                                "text": msg.get("message", {}).get("conversation"),
-                                "timestamp": msg.get("messageTimestamp"),
-                                "pushName": msg.get("pushName"),
-                                "source": msg.get("source")
-                            }
-                            all_messages.append(simplified)
-                    except Exception:
-                        continue
-
-                if current_page >= result.get("messages").get("pages"):
-                    break
-
-                current_page += 1
-
-            return self._convert_to_csv(all_messages)
-
-        except requests.exceptions.RequestException as e:
-            print(f"Erro ao buscar mensagens: {e}")
-            return None
\ No newline at end of file
+import requests
+import csv
+import io
+from datetime import datetime
+
+import adaptive_limiter
+import circuit_breaker
+import client_pool
+import json_stream
+import metrics
+from event_store import get_store
+from singleflight import coalesce
+
+# Campos extraídos de cada mensagem nas exportações, com o tipo Arrow correspondente
+EXPORT_FIELDS = {
+    "fromMe": "bool_",
+    "remoteJid": "string",
+    "messageType": "string",
+    "text": "string",
+    "timestamp": "int64",
+    "pushName": "string",
+    "source": "string",
+}
+
+
+# Metadados de paginação de findMessages, lidos fora da lista de registros
+PAGE_FIELDS = ("total", "pages", "currentPage")
+
+
+class MessageService:
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _simplify(msg):
+        """Mantém apenas as propriedades relevantes de uma mensagem."""
+        return {
+            "fromMe": msg.get("key", {}).get("fromMe"),
+            "remoteJid": msg.get("key", {}).get("remoteJid"),
+            "messageType": msg.get("messageType"),
+            "text": msg.get("message", {}).get("conversation"),
+            "timestamp": msg.get("messageTimestamp"),
+            "pushName": msg.get("pushName"),
+            "source": msg.get("source")
+        }
+
+    @staticmethod
+    def _in_interval(msg, date_ini, date_end):
+        try:
+            msg_time = datetime.fromtimestamp(int(msg.get("messageTimestamp", 0)))
+        except Exception:
+            return False
+        return date_ini <= msg_time <= date_end
+
+    def _convert_to_csv(self, data):
+        """
+        Converte os dados para formato CSV e retorna como string.
+        """
+        if not data:
+            return ""
+        
+        # Criar um buffer de string para o CSV
+        output = io.StringIO()
+        
+        # Definir os cabeçalhos baseados nas chaves do primeiro item
+        if data:
+            fieldnames = data[0].keys()
+            writer = csv.DictWriter(output, fieldnames=fieldnames)
+            
+            # Escrever cabeçalho
+            writer.writeheader()
+            
+            # Escrever dados
+            writer.writerows(data)
+        
+        # Obter o conteúdo CSV como string
+        csv_content = output.getvalue()
+        output.close()
+        
+        return csv_content
+
+    def _fetch_page(self, instance_id, url, headers, payload, params=None):
+        """
+        Busca uma página de findMessages. Pedidos idênticos simultâneos
+        (mesma instância, filtro e página) compartilham uma única requisição.
+
+        Os registros são decodificados um a um enquanto a resposta chega, sem a
+        mídia inline (message.base64), que nenhuma consulta usa; os metadados de
+        paginação vêm dos eventos do parser. As mensagens obtidas alimentam o
+        índice de busca local.
+        """
+
+        def request():
+            meta = {f"messages.{name}": None for name in PAGE_FIELDS}
+            with (
+                circuit_breaker.guard(instance_id),
+                adaptive_limiter.limit(instance_id),
+                metrics.upstream("findMessages", instance_id) as call,
+            ):
+                response = client_pool.get_session(self.client.base_url).post(
+                    url, json=payload, headers=headers, params=params, timeout=client_pool.get_timeout(), stream=True
+                )
+                call.add_pages(1)
+                if not response.ok:
+                    response.close()
+                    response.raise_for_status()
+                records = list(
+                    json_stream.iter_items(
+                        response, "messages.records.item", call.add_bytes, meta=meta, omit=("message.base64",)
+                    )
+                )
+            get_store().add_messages(instance_id, records)
+            page = {name: meta[f"messages.{name}"] for name in PAGE_FIELDS if meta[f"messages.{name}"] is not None}
+            return {"messages": {**page, "records": records}}
+
+        return coalesce(instance_id, "findMessages", {"payload": payload, "params": params}, request)
+
+    def find_messages(self, instance_id, instance_token, where, page=1, offset=50):
+        """
+        Uma página de findMessages com o filtro `where`, no formato do
+        EvolutionClient (page e offset no corpo), decodificada como em `_fetch_page`.
+        """
+        url = f"{self.client.base_url}/chat/findMessages/{instance_id}"
+        headers = {
+            "Content-Type": "application/json",
+            "apikey": self.client.api_token,
+            "Authorization": f"Bearer {self.client.api_token}",
+            "Instance-Token": instance_token
+        }
+        return self._fetch_page(instance_id, url, headers, {"where": where, "page": page, "offset": offset})
+
+    def iter_pages(self, instance_id, instance_token, remoteJid: str, start_page: int = 1):
+        """
+        Percorre as páginas de mensagens do remoteJid a partir de `start_page`,
+        produzindo (página, total de páginas, registros) a cada página obtida.
+        """
+        url = f"{self.client.base_url}/chat/findMessages/{instance_id}"
+        headers = {
+            "Content-Type": "application/json",
+            "apikey": self.client.api_token,
+            "Authorization": f"Bearer {self.client.api_token}",
+            "Instance-Token": instance_token
+        }
+        payload = {"where": {"key": {"remoteJid": remoteJid}}}
+
+        current_page = start_page
+        while True:
+            params = {"limit": 100, "page": current_page}
+            result = self._fetch_page(instance_id, url, headers, payload, params)
+
+            pages = result.get("messages").get("pages")
+            yield current_page, pages, result.get("messages", []).get("records", [])
+
+            if current_page >= pages:
+                break
+
+            current_page += 1
+
+    def fetch_all_messages(self, instance_id, instance_token, remoteJid: str):
+        """
+        Busca todas as mensagens associadas ao remoteJid, extrai apenas propriedades relevantes,
+        e retorna o conteúdo CSV como string.
+        """
+        try:
+            return self._convert_to_csv([
+                self._simplify(msg)
+                for _, _, records in self.iter_pages(instance_id, instance_token, remoteJid)
+                for msg in records
+            ])
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao buscar mensagens: {e}")
+            return None
+
+    def fetch_interval_messages(self, instance_id, instance_token, date_ini: datetime, date_end: datetime, remoteJid: str):
+        """
+        Retorna o conteúdo CSV contendo mensagens de um remoteJid dentro de um intervalo de datas.
+        Apenas as propriedades relevantes são mantidas.
+        """
+        try:
+            return self._convert_to_csv([
+                self._simplify(msg)
+                for _, _, records in self.iter_pages(instance_id, instance_token, remoteJid)
+                for msg in records
+                if self._in_interval(msg, date_ini, date_end)
+            ])
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao buscar mensagens: {e}")
+            return None
+
+    def export_messages(self, instance_id, instance_token, remoteJid: str, path: str, fmt="parquet",
+                        columns=None, date_ini: datetime = None, date_end: datetime = None):
+        """
+        Exporta as mensagens do remoteJid para um arquivo colunar (Parquet ou Arrow IPC)
+        com compressão zstd, gravando em row groups à medida que as páginas chegam.
+        Opcionalmente filtra por intervalo de datas e seleciona colunas de EXPORT_FIELDS.
+
+        Retorna a quantidade de mensagens exportadas.
+        """
+        from columnar_export import ColumnarWriter
+
+        with ColumnarWriter(path, EXPORT_FIELDS, fmt, columns) as writer:
+            for _, _, records in self.iter_pages(instance_id, instance_token, remoteJid):
+                if date_ini is not None and date_end is not None:
+                    records = [msg for msg in records if self._in_interval(msg, date_ini, date_end)]
+                writer.write_rows(self._simplify(msg) for msg in records)
+
+        return writer.rows_written
+
+    def fetch_status_updates(self, instance_id, instance_token, remoteJid: str):
+        """
+        Busca os status de entrega (findStatusMessage) das mensagens do remoteJid,
+        uma lista de registros com keyId e status.
+        """
+        url = f"{self.client.base_url}/chat/findStatusMessage/{instance_id}"
+        headers = {
+            "Content-Type": "application/json",
+            "apikey": self.client.api_token,
+            "Authorization": f"Bearer {self.client.api_token}",
+            "Instance-Token": instance_token
+        }
+        payload = {"where": {"remoteJid": remoteJid}}
+
+        def request():
+            with (
+                circuit_breaker.guard(instance_id),
+                adaptive_limiter.limit(instance_id),
+                metrics.upstream("findStatusMessage", instance_id) as call,
+            ):
+                response = client_pool.get_session(self.client.base_url).post(
+                    url, json=payload, headers=headers, timeout=client_pool.get_timeout(), stream=True
+                )
+                if not response.ok:
+                    response.close()
+                    response.raise_for_status()
+                return json_stream.load(response, call.add_bytes)
+
+        return coalesce(instance_id, "findStatusMessage", payload, request)
@@ -0,0 +1,281 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Buckets de latência em segundos (de chamadas locais a exportações longas)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Family:
+    """A metric family with a fixed set of label names; thread safe."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), unit: str = ""):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.unit = unit
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _header(self):
+        lines = [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {self.help}"]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        return lines
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}_total{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def get(self, *labels) -> Optional[float]:
+        return self._values.get(labels)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), unit="", buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels, unit)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [contagens por bucket (+Inf no fim), soma]
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            for labels, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _labels(self.label_names, labels, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+        return lines
+
+
+TOOL_DURATION = Histogram(
+    "evoapi_tool_duration_seconds", "Duração das chamadas de ferramentas MCP.", ("tool",), "seconds"
+)
+TOOL_ERRORS = Counter("evoapi_tool_errors", "Chamadas de ferramentas MCP que lançaram exceção.", ("tool",))
+UPSTREAM_DURATION = Histogram(
+    "evoapi_upstream_duration_seconds", "Duração das chamadas à Evolution API.", ("endpoint", "instance"), "seconds"
+)
+UPSTREAM_REQUESTS = Counter(
+    "evoapi_upstream_requests", "Requisições à Evolution API.", ("endpoint", "instance", "outcome")
+)
+UPSTREAM_BYTES = Counter(
+    "evoapi_upstream_bytes", "Bytes recebidos da Evolution API.", ("endpoint", "instance"), "bytes"
+)
+UPSTREAM_PAGES = Counter("evoapi_upstream_pages", "Páginas de resultados obtidas.", ("endpoint", "instance"))
+UPSTREAM_COALESCED = Counter(
+    "evoapi_upstream_coalesced",
+    "Chamadas atendidas por uma requisição idêntica já em andamento.",
+    ("endpoint", "instance"),
+)
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "evoapi_upstream_concurrency_limit", "Limite adaptativo de leituras simultâneas por instância.", ("instance",)
+)
+UPSTREAM_IN_FLIGHT = Gauge("evoapi_upstream_in_flight", "Leituras em andamento por instância.", ("instance",))
+CIRCUIT_STATE = Gauge(
+    "evoapi_circuit_state", "Estado do circuit breaker por instância (0 fechado, 1 meio-aberto, 2 aberto).", ("instance",)
+)
+CACHE_REQUESTS = Counter("evoapi_cache_requests", "Consultas a caches locais.", ("cache", "result"))
+CACHE_HIT_RATIO = Gauge("evoapi_cache_hit_ratio", "Proporção de acertos por cache.", ("cache",))
+
+FAMILIES = [
+    TOOL_DURATION,
+    TOOL_ERRORS,
+    UPSTREAM_DURATION,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_BYTES,
+    UPSTREAM_PAGES,
+    UPSTREAM_COALESCED,
+    UPSTREAM_CONCURRENCY_LIMIT,
+    UPSTREAM_IN_FLIGHT,
+    CIRCUIT_STATE,
+    CACHE_REQUESTS,
+    CACHE_HIT_RATIO,
+]
+
+
+def instrument_tool(name: str):
+    """Decorator that records latency and errors of a tool function (sync or async)."""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    TOOL_ERRORS.inc(name)
+                    raise
+                finally:
+                    TOOL_DURATION.observe(name, value=time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                TOOL_ERRORS.inc(name)
+                raise
+            finally:
+                TOOL_DURATION.observe(name, value=time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class _UpstreamCall:
+    def __init__(self, endpoint: str, instance: str):
+        self.endpoint = endpoint
+        self.instance = instance
+
+    def add_bytes(self, size: int):
+        UPSTREAM_BYTES.inc(self.endpoint, self.instance, amount=size)
+
+    def add_pages(self, count: int = 1):
+        UPSTREAM_PAGES.inc(self.endpoint, self.instance, amount=count)
+
+
+@contextmanager
+def upstream(endpoint: str, instance: str):
+    """
+    Measures one Evolution API call.
+
+    Usage:
+        with metrics.upstream("findContacts", instance_id) as call:
+            response = requests.post(...)
+            call.add_bytes(len(response.content))
+    """
+    call = _UpstreamCall(endpoint, instance)
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield call
+        outcome = "ok"
+    finally:
+        UPSTREAM_DURATION.observe(endpoint, instance, value=time.perf_counter() - start)
+        UPSTREAM_REQUESTS.inc(endpoint, instance, outcome)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def render() -> str:
+    """Renders every metric in the OpenMetrics text format."""
+    # A razão de acertos é derivada dos contadores no momento da coleta
+    caches = {labels[0] for labels in list(CACHE_REQUESTS._values)}
+    for cache in caches:
+        hits = CACHE_REQUESTS.get(cache, "hit")
+        total = hits + CACHE_REQUESTS.get(cache, "miss")
+        CACHE_HIT_RATIO.set(cache, value=hits / total if total else 0.0)
+
+    lines = []
+    for family in FAMILIES:
+        lines.extend(family.render())
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        data = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host: Optional[str] = None, port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Serves GET /metrics in a daemon thread.
+
+    Disabled unless a port is given or EVO_METRICS_PORT is set.
+    """
+    from instance_config import InstanceConfig
+
+    if port is None:
+        port = InstanceConfig.getenv("EVO_METRICS_PORT")
+        if not port:
+            return None
+
+    host = host or InstanceConfig.getenv("EVO_METRICS_HOST", "127.0.0.1")
+    server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="evo-metrics", daemon=True).start()
+    return server
@@ -1,30 +1,41 @@
 import os
-from dotenv import load_dotenv
-from evolutionapi.client import EvolutionClient
 from evolutionapi.models.message import MediaMessage, TextMessage
 
+import client_pool
+import delivery_tracker
+import metrics
 from instance_config import InstanceConfig
 
 
 class SendMessage:
     def __init__(self, instance_id: str | None = None) -> None:
-        # Load env variables
-        load_dotenv()
-
         creds = InstanceConfig.resolve_instance(instance_id)
         self.evo_instance_id = creds.id
         self.evo_instance_token = creds.token
         self.evo_base_url = creds.url
-        self.evo_api_token = os.getenv(f"EVO_INSTANCE_{self.evo_instance_id}_APIKEY", os.getenv("EVO_API_TOKEN"))
+        self.evo_api_token = creds.api_key
 
-        self.client = EvolutionClient(base_url=self.evo_base_url, api_token=self.evo_api_token)
+        self.client = client_pool.get_client(self.evo_base_url, self.evo_api_token)
 
-    def textMessage(self, number, msg, mentions=None):
+    def textMessage(self, number, msg, mentions=None, campaign=None):
         if mentions is None:
             mentions = []
 
         text_message = TextMessage(number=str(number), text=msg, mentioned=mentions)
-        return self.client.messages.send_text(self.evo_instance_id, text_message, self.evo_instance_token)
+        try:
+            with metrics.upstream("sendText", self.evo_instance_id):
+                response = self.client.messages.send_text(self.evo_instance_id, text_message, self.evo_instance_token)
+        except Exception as e:
+            delivery_tracker.record_failure(self.evo_instance_id, number, e, campaign)
+            raise
+        reason = delivery_tracker.rejection_reason(response)
+        if reason is not None:
+            error = delivery_tracker.SendRejectedError(reason)
+            delivery_tracker.record_failure(self.evo_instance_id, number, error, campaign)
+            raise error
+        # O status de entrega é acompanhado pelos eventos de ack (ver delivery_tracker)
+        delivery_tracker.record_sent(self.evo_instance_id, number, response, campaign)
+        return response
 
     def PDF(self, number, pdf_file, caption=""):
         if not os.path.exists(pdf_file):
@@ -39,7 +50,8 @@ class SendMessage:
             media="",
         )
 
-        self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, pdf_file)
+        with metrics.upstream("sendMedia", self.evo_instance_id):
+            self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, pdf_file)
 
     def audio(self, number, audio_file, caption=""):
         if not os.path.exists(audio_file):
@@ -52,9 +64,10 @@ class SendMessage:
             "caption": caption,
         }
 
-        self.client.messages.send_whatsapp_audio(
-            self.evo_instance_id, audio_message, self.evo_instance_token, audio_file
-        )
+        with metrics.upstream("sendWhatsAppAudio", self.evo_instance_id):
+            self.client.messages.send_whatsapp_audio(
+                self.evo_instance_id, audio_message, self.evo_instance_token, audio_file
+            )
         return "Áudio enviado"
 
     def image(self, number, image_file, caption=""):
@@ -70,7 +83,8 @@ class SendMessage:
             media="",
         )
 
-        self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, image_file)
+        with metrics.upstream("sendMedia", self.evo_instance_id):
+            self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, image_file)
 
         return "Imagem enviada"
 
@@ -87,7 +101,8 @@ class SendMessage:
             media="",
         )
 
-        self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, video_file)
+        with metrics.upstream("sendMedia", self.evo_instance_id):
+            self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, video_file)
 
         return "Vídeo enviado"
 
@@ -104,6 +119,7 @@ class SendMessage:
             media="",
         )
 
-        self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, document_file)
+        with metrics.upstream("sendMedia", self.evo_instance_id):
+            self.client.messages.send_media(self.evo_instance_id, media_message, self.evo_instance_token, document_file)
 
         return "Documento enviado"
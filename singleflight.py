@@ -0,0 +1,66 @@
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for `key` is in flight,
+    other callers with the same key wait for it and share its result (or its
+    exception) instead of issuing their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+_flights = SingleFlight()
+
+
+def coalesce(instance: str, endpoint: str, payload: Any, fn: Callable[[], Any]) -> Any:
+    """Runs `fn` once for concurrent requests with the same instance, endpoint and payload."""
+    key = (instance, endpoint, json.dumps(payload, sort_keys=True, default=str))
+    leader = []
+
+    def run():
+        leader.append(True)
+        return fn()
+
+    result = _flights.do(key, run)
+    if not leader:
+        metrics.UPSTREAM_COALESCED.inc(endpoint, instance)
+    return result
@@ -0,0 +1,4 @@
+import os
+
+# Isola os testes de um .env local
+os.environ["EVO_ENV_FILE"] = os.devnull
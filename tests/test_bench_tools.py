@@ -0,0 +1,16 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import evoapi_mcp  # noqa: E402
+from bench_tools import build_cases, missing_cases, registered_tools  # noqa: E402
+from fake_evolution import FakeData  # noqa: E402
+
+
+def test_every_registered_tool_has_a_case():
+    cases = build_cases(FakeData(contacts=5, groups=2, messages_per_chat=1, media_ratio=0))
+
+    assert missing_cases(cases, evoapi_mcp) == []
+    # Casos de ferramentas removidas também precisam sair do benchmark
+    assert {name for name, _ in cases} <= set(registered_tools(evoapi_mcp))
@@ -0,0 +1,43 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from columnar_export import ColumnarWriter  # noqa: E402
+
+FIELDS = {"text": "string", "timestamp": "int64"}
+ROWS = [{"text": f"m{i}", "timestamp": i} for i in range(10)]
+
+
+def _read(path, fmt):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path)
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_file_appears_only_when_complete(tmp_path, fmt):
+    path = tmp_path / f"out.{fmt}"
+
+    with ColumnarWriter(str(path), FIELDS, fmt, row_group_size=4) as writer:
+        writer.write_rows(ROWS)
+        assert not path.exists()
+
+    assert _read(path, fmt).column("text").to_pylist() == [row["text"] for row in ROWS]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_failure_leaves_no_partial_file(tmp_path, fmt):
+    path = tmp_path / f"out.{fmt}"
+    path.write_bytes(b"exportacao anterior")
+
+    with pytest.raises(RuntimeError):
+        with ColumnarWriter(str(path), FIELDS, fmt, row_group_size=4) as writer:
+            writer.write_rows(ROWS)
+            raise RuntimeError("API indisponível")
+
+    assert path.read_bytes() == b"exportacao anterior"
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+import delivery_tracker
+import send_message
+from event_store import EventStore
+from send_message import SendMessage
+
+REJECTED = {
+    "status": 400,
+    "error": "Bad Request",
+    "response": {"message": [{"exists": False, "jid": "5511000@s.whatsapp.net", "number": "5511000"}]},
+}
+ACCEPTED = {
+    "key": {"remoteJid": "5511999@s.whatsapp.net", "fromMe": True, "id": "ABC123"},
+    "message": {"conversation": "oi"},
+    "status": "PENDING",
+}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = EventStore()
+    monkeypatch.setattr(delivery_tracker, "get_store", lambda: store)
+    return store
+
+
+def sender(response):
+    send = SendMessage.__new__(SendMessage)
+    send.evo_instance_id = "inst"
+    send.evo_instance_token = "token"
+    send.client = SimpleNamespace(messages=SimpleNamespace(send_text=lambda *args: response))
+    return send
+
+
+def test_rejection_reason():
+    assert delivery_tracker.rejection_reason(ACCEPTED) is None
+    assert delivery_tracker.rejection_reason(REJECTED).startswith("400 Bad Request: ")
+    assert delivery_tracker.rejection_reason({"message": "Instance not connected"}) is not None
+    assert delivery_tracker.rejection_reason(None) is not None
+    assert delivery_tracker.rejection_reason({"status": 404, "response": {"message": "Not Found"}}) is not None
+
+
+@pytest.mark.parametrize("ack, expected", [(1, "PENDING"), (2, "SERVER_ACK"), ("3", "DELIVERY_ACK")])
+def test_numeric_ack_send_is_tracked(store, ack, expected):
+    # Algumas versões serializam o status do envio como o número do ack do Baileys
+    response = {**ACCEPTED, "status": ack}
+    assert delivery_tracker.rejection_reason(response) is None
+
+    sender(response).textMessage("5511999", "oi", campaign="ack")
+
+    receipt = store.get_receipt("ABC123", "inst")
+    assert receipt["status"] == expected
+    [stats] = store.receipt_stats(campaign="ack")
+    assert stats["failed"] == 0
+
+
+def test_rejected_send_is_recorded_as_error(store):
+    with pytest.raises(delivery_tracker.SendRejectedError, match="400 Bad Request"):
+        sender(REJECTED).textMessage("5511000", "oi", campaign="promo")
+
+    [stats] = store.receipt_stats(campaign="promo")
+    assert stats["total"] == 1 and stats["failed"] == 1
+    assert store.pending_receipts("inst", since=0) == []
+
+
+def test_accepted_send_is_tracked(store):
+    assert sender(ACCEPTED).textMessage("5511999", "oi", campaign="promo") == ACCEPTED
+
+    receipt = store.get_receipt("ABC123", "inst")
+    assert receipt["status"] == "PENDING" and receipt["campaign"] == "promo"
+
+    delivery_tracker.apply_events("inst", [{"keyId": "ABC123", "status": "READ"}])
+    delivery_tracker.apply_events("inst", [{"key": {"id": "ABC123"}, "update": {"status": 3}}])
+    receipt = store.get_receipt("ABC123", "inst")
+    assert receipt["status"] == "READ" and receipt["read_at"] is not None
+
+
+def test_send_tool_reports_rejection(monkeypatch, store):
+    import evoapi_mcp
+
+    monkeypatch.setattr(send_message, "SendMessage", lambda instance_id: sender(REJECTED))
+    result = evoapi_mcp.send_message_to_phone("5511000", "oi")
+    assert result.startswith("Erro ao enviar mensagem: 400 Bad Request")
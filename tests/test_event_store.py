@@ -0,0 +1,126 @@
+import pytest
+
+import event_store
+from event_store import EventStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(event_store.time, "time", clock)
+    return clock
+
+
+def test_webhook_coverage_starts_with_first_event(clock):
+    store = EventStore(heartbeat=60)
+    assert not store.is_webhook_active("inst")
+    assert not store.covers_messages("inst", int(clock.now))
+
+    store.mark_webhook_active("inst")
+    store.replace_contacts("inst", [{"remoteJid": "5511900000000@s.whatsapp.net"}])
+
+    assert store.is_live("inst", "contacts")
+    assert store.covers_messages("inst", int(clock.now))
+    assert not store.covers_messages("inst", int(clock.now) - 1)
+
+
+def test_restart_forgets_coverage(tmp_path, clock):
+    path = str(tmp_path / "store.db")
+    store = EventStore(path, heartbeat=60)
+    store.mark_webhook_active("inst")
+    store.replace_contacts("inst", [{"remoteJid": "5511900000000@s.whatsapp.net"}])
+    store.add_messages("inst", [{"key": {"id": "A", "remoteJid": "g@g.us"}, "messageTimestamp": int(clock.now)}])
+    store._conn.close()
+
+    clock.now += 5
+    reopened = EventStore(path, heartbeat=60)
+    # Os dados continuam no arquivo, mas nada garante que nenhum evento se perdeu
+    assert reopened.get_messages("inst", "g@g.us", 0, int(clock.now))
+    assert not reopened.is_webhook_active("inst")
+    assert not reopened.is_live("inst", "contacts")
+    assert not reopened.covers_messages("inst", int(clock.now) - 5)
+
+
+def test_gap_between_events_restarts_coverage(clock):
+    store = EventStore(heartbeat=60)
+    start = int(clock.now)
+    store.mark_webhook_active("inst")
+    store.replace_groups("inst", [{"id": "g@g.us"}])
+
+    clock.now += 30
+    store.mark_webhook_active("inst")
+    assert store.covers_messages("inst", start)
+
+    # Silêncio maior que o heartbeat: o webhook pode ter parado de entregar
+    clock.now += 61
+    assert not store.is_webhook_active("inst")
+    assert not store.is_live("inst", "groups")
+    assert not store.covers_messages("inst", start)
+
+    store.mark_webhook_active("inst")
+    assert store.is_webhook_active("inst")
+    assert not store.covers_messages("inst", start)
+    assert store.covers_messages("inst", int(clock.now))
+    # Grupos precisam ser semeados de novo pela API
+    assert not store.is_live("inst", "groups")
+
+
+def test_receiver_start_resets_coverage(clock):
+    from webhook_server import WebhookReceiver
+
+    store = EventStore(heartbeat=60)
+    store.mark_webhook_active("inst")
+    WebhookReceiver(store)
+    assert not store.is_webhook_active("inst")
+
+
+def message(message_id, timestamp, text="nota fiscal", jid="g@g.us"):
+    return {
+        "key": {"id": message_id, "remoteJid": jid},
+        "messageTimestamp": timestamp,
+        "message": {"conversation": text},
+    }
+
+
+def test_message_cap_prunes_oldest_and_moves_coverage(clock):
+    store = EventStore(heartbeat=60, max_messages=10)
+    now = int(clock.now)
+    store.mark_webhook_active("inst")
+    assert not store.covers_messages("inst", now - 100)
+
+    # 15 mensagens com timestamps crescentes, inseridas fora de ordem
+    store.add_messages("inst", [message(f"m{i}", now + i) for i in reversed(range(15))])
+
+    stored = store.get_messages("inst", "g@g.us", 0, now + 100)
+    assert len(stored) == 10
+    assert [m["key"]["id"] for m in stored] == [f"m{i}" for i in range(15 - len(stored), 15)]
+    # O índice de busca não guarda mensagens removidas
+    assert len(store.search_messages("nota", instance="inst", limit=100)) == len(stored)
+    # A cobertura começa depois da mensagem mais nova removida
+    oldest_kept = stored[0]["messageTimestamp"]
+    assert not store.covers_messages("inst", now)
+    assert store.covers_messages("inst", oldest_kept)
+
+
+def test_retention_prunes_old_messages(clock):
+    store = EventStore(heartbeat=60, max_messages=0, retention=3600)
+    now = int(clock.now)
+    store.add_messages("inst", [message("old", now - 7200), message("new", now - 60)])
+
+    assert store.prune() == 1
+    assert [m["key"]["id"] for m in store.get_messages("inst", "g@g.us", 0, now)] == ["new"]
+
+
+def test_unbounded_store_keeps_everything(clock):
+    store = EventStore(max_messages=0)
+    store.add_messages("inst", [message(f"m{i}", i) for i in range(50)])
+    assert store.prune() == 0
+    assert len(store.get_messages("inst", "g@g.us", 0, 100)) == 50
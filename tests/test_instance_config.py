@@ -0,0 +1,43 @@
+import dotenv
+import pytest
+
+from instance_config import InstanceConfig
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    """A .env that python-dotenv only finds once it exists, as in a fresh checkout."""
+    path = tmp_path / ".env"
+    monkeypatch.delenv("EVO_ENV_FILE", raising=False)
+    monkeypatch.delenv("EVO_API_URL", raising=False)
+    monkeypatch.setenv("EVO_CONFIG_RELOAD_INTERVAL", "0")
+    monkeypatch.setattr(dotenv, "find_dotenv", lambda *args, **kwargs: str(path) if path.exists() else "")
+    for attr in ("_snapshot", "_env_file", "_env_stamp", "_next_check"):
+        monkeypatch.setattr(InstanceConfig, attr, getattr(InstanceConfig, attr))
+    InstanceConfig.reload()
+    return path
+
+
+def test_env_file_created_after_startup_is_loaded(env_file):
+    assert InstanceConfig.getenv("EVO_API_URL") is None
+
+    env_file.write_text("EVO_API_URL=http://evolution.local\n")
+
+    assert InstanceConfig.getenv("EVO_API_URL") == "http://evolution.local"
+
+
+def test_env_file_removed_after_startup_is_unloaded(env_file):
+    env_file.write_text("EVO_API_URL=http://evolution.local\n")
+    assert InstanceConfig.getenv("EVO_API_URL") == "http://evolution.local"
+
+    env_file.unlink()
+
+    assert InstanceConfig.getenv("EVO_API_URL") is None
+
+
+def test_process_environment_is_only_read_on_reload(env_file, monkeypatch):
+    InstanceConfig.getenv("EVO_API_URL")
+    monkeypatch.setenv("EVO_API_URL", "http://outra.local")
+
+    assert InstanceConfig.getenv("EVO_API_URL") is None
+    assert InstanceConfig.reload().settings.get("EVO_API_URL") == "http://outra.local"
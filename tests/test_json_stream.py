@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import json_stream
+
+PAGE = {
+    "messages": {
+        "total": 2,
+        "pages": 1,
+        "currentPage": 1,
+        "records": [
+            {"key": {"id": "A"}, "message": {"conversation": "oi", "base64": "QUJD" * 1000}},
+            {"key": {"id": "B"}, "message": {"imageMessage": {"caption": "foto"}, "base64": "QUJD"}},
+        ],
+    }
+}
+
+
+class FakeResponse:
+    """Serves the body in small chunks, as a streamed requests.Response would."""
+
+    def __init__(self, document):
+        self.content = json.dumps(document).encode()
+        self.closed = False
+
+    def iter_content(self, size):
+        for i in range(0, len(self.content), 100):
+            yield self.content[i:i + 100]
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(params=["ijson", "fallback"])
+def backend(request, monkeypatch):
+    if request.param == "ijson":
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setattr(json_stream, "_ijson", lambda: None)
+    return request.param
+
+
+def test_records_stream_without_inline_media_and_with_page_metadata(backend):
+    response = FakeResponse(PAGE)
+    meta = {"messages.pages": None, "messages.total": None}
+
+    records = list(
+        json_stream.iter_items(response, "messages.records.item", meta=meta, omit=("message.base64",))
+    )
+
+    assert records == [
+        {"key": {"id": "A"}, "message": {"conversation": "oi"}},
+        {"key": {"id": "B"}, "message": {"imageMessage": {"caption": "foto"}}},
+    ]
+    assert meta == {"messages.pages": 1, "messages.total": 2}
+    assert response.closed
+
+
+def test_items_without_options_are_unchanged(backend):
+    records = list(json_stream.iter_items(FakeResponse(PAGE), "messages.records.item"))
+
+    assert records == PAGE["messages"]["records"]
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import evoapi_mcp  # noqa: E402
+import group_controller  # noqa: E402
+from fake_evolution import FakeData  # noqa: E402
+from message_digest import digest_messages, format_entry  # noqa: E402
+from message_sandeco import MessageSandeco  # noqa: E402
+
+# Orçamento folgado para máquinas de CI lentas; localmente o resumo leva dezenas de ms
+BUDGET_SECONDS = 1.0
+
+
+def _busy_group(count=10_000):
+    data = FakeData(contacts=60, groups=1, messages_per_chat=count, media_ratio=0, media_bytes=0)
+    records = data.messages[data.groups[0]["id"]]
+    # Respostas e menções, para que todas as características entrem no cálculo
+    for i in range(7, count, 7):
+        text = records[i]["message"].pop("conversation")
+        records[i]["messageType"] = "extendedTextMessage"
+        records[i]["message"]["extendedTextMessage"] = {
+            "text": text,
+            "contextInfo": {
+                "stanzaId": records[i - 5]["key"]["id"],
+                "mentionedJid": [records[i - 5]["key"]["participant"]],
+            },
+        }
+    return [MessageSandeco(record) for record in records]
+
+
+def test_digest_of_10k_messages_is_fast():
+    messages = _busy_group()
+
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        entries = digest_messages(messages, max_chars=6000)
+        best = min(best, time.perf_counter() - start)
+
+    assert best < BUDGET_SECONDS, f"resumo de {len(messages)} mensagens levou {best * 1000:.0f} ms"
+    assert entries
+    assert sum(len(format_entry(e)) for e in entries) <= 6000
+    assert [e.first_timestamp for e in entries] == sorted(e.first_timestamp for e in entries)
+
+
+def test_digest_with_temperature_is_reproducible_by_seed():
+    messages = _busy_group(2_000)
+
+    first = digest_messages(messages, max_chars=3000, temperature=0.5, seed=7)
+    second = digest_messages(messages, max_chars=3000, temperature=0.5, seed=7)
+
+    assert [e.first_timestamp for e in first] == [e.first_timestamp for e in second]
+
+
+@pytest.mark.parametrize("max_chars", [500, 2000, 6000])
+def test_group_digest_output_fits_max_chars(monkeypatch, max_chars):
+    messages = _busy_group(2_000)
+
+    class FakeGroupController:
+        def __init__(self, instance_id=None):
+            pass
+
+        def get_messages(self, group_id, start_date, end_date):
+            return list(messages)
+
+    monkeypatch.setattr(group_controller, "GroupController", FakeGroupController)
+    monkeypatch.setattr(evoapi_mcp, "_resolve_sender_names", lambda pairs, instance_id: {})
+
+    output = evoapi_mcp.get_group_digest("1@g.us", "2025-01-01 00:00:00", "2025-12-31 23:59:59", max_chars=max_chars)
+
+    assert len(output) <= max_chars
+    assert output.count("Mensagem ---") >= max_chars // 500
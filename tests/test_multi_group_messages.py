@@ -0,0 +1,83 @@
+import re
+
+import pytest
+
+import evoapi_mcp
+import group_controller
+from message_sandeco import MessageSandeco
+
+GROUPS = ["111@g.us", "222@g.us", "333@g.us"]
+START = 1_750_000_000
+
+
+def _message(group_id, timestamp):
+    return MessageSandeco(
+        {
+            "key": {"id": f"{group_id}-{timestamp}", "fromMe": False, "remoteJid": group_id,
+                    "participant": "5511900000000@s.whatsapp.net"},
+            "pushName": "Ana",
+            "messageType": "conversation",
+            "message": {"conversation": f"{group_id}-{timestamp}"},
+            "messageTimestamp": timestamp,
+        }
+    )
+
+
+# Horários intercalados entre os grupos, fora de ordem dentro de cada grupo
+HISTORY = {
+    group_id: [_message(group_id, START + 3 * i + offset) for i in reversed(range(5))]
+    for offset, group_id in enumerate(GROUPS)
+}
+
+
+class FakeGroupController:
+    def __init__(self, instance_id=None):
+        self.instance_id = instance_id
+
+    def get_messages(self, group_id, start_date, end_date):
+        return list(HISTORY[group_id])
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(group_controller, "GroupController", FakeGroupController)
+    monkeypatch.setattr(evoapi_mcp, "_resolve_sender_names", lambda pairs, instance_id: {})
+
+
+def _texts(output):
+    return re.findall(r"^Texto: (.*)$", output, re.MULTILINE)
+
+
+def _expected():
+    messages = sorted((m for history in HISTORY.values() for m in history), key=lambda m: m.message_timestamp)
+    return [m.get_text() for m in messages]
+
+
+def test_messages_from_all_groups_are_interleaved_by_time():
+    output = evoapi_mcp.get_multi_group_messages(GROUPS, "2025-01-01 00:00:00", "2025-12-31 23:59:59")
+
+    assert _texts(output) == _expected()
+    assert "omitidas" not in output
+
+
+def test_max_chars_keeps_the_most_recent_messages():
+    expected = _expected()
+    by_text = {m.get_text(): (group_id, m) for group_id, history in HISTORY.items() for m in history}
+    kept = expected[-4:]
+    max_chars = sum(len(evoapi_mcp._format_message(None, by_text[t][1], {}, by_text[t][0])) for t in kept)
+
+    output = evoapi_mcp.get_multi_group_messages(
+        GROUPS, "2025-01-01 00:00:00", "2025-12-31 23:59:59", max_chars=max_chars
+    )
+
+    assert _texts(output) == kept
+    assert f"{len(expected) - 4} de {len(expected)} mensagens mais antigas omitidas" in output
+    assert len(output.split("\n\n")[0]) <= max_chars
+
+
+def test_duplicate_group_ids_are_fetched_once():
+    output = evoapi_mcp.get_multi_group_messages(
+        GROUPS[:2] + GROUPS[:1], "2025-01-01 00:00:00", "2025-12-31 23:59:59"
+    )
+
+    assert _texts(output) == [t for t in _expected() if not t.startswith(GROUPS[2])]
@@ -0,0 +1,108 @@
+import os
+import threading
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    profiling.configure(enabled=True, rate=1.0, directory=str(tmp_path))
+    yield tmp_path
+    profiling._overrides.clear()
+
+
+def test_sampled_call_writes_report(profile_dir):
+    tool = profiling.profile_tool("tool")(lambda x: x * 2)
+
+    assert tool(21) == 42
+    assert len([f for f in os.listdir(profile_dir) if f.endswith(".prof")]) == 1
+
+
+def test_overlapping_sampled_calls_both_succeed(profile_dir):
+    first_running = threading.Event()
+    second_done = threading.Event()
+
+    @profiling.profile_tool("slow")
+    def slow():
+        first_running.set()
+        assert second_done.wait(5)
+        return "slow"
+
+    @profiling.profile_tool("fast")
+    def fast():
+        return "fast"
+
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault("slow", slow()))
+    thread.start()
+    assert first_running.wait(5)
+    try:
+        # Roda enquanto a outra chamada está sendo perfilada em outra thread
+        results["fast"] = fast()
+    finally:
+        second_done.set()
+        thread.join(5)
+
+    assert results == {"slow": "slow", "fast": "fast"}
+    reports = [f for f in os.listdir(profile_dir) if f.endswith(".prof")]
+    assert len(reports) == 1 and "_slow_" in reports[0]
+
+
+def test_errors_of_profiled_calls_propagate(profile_dir):
+    @profiling.profile_tool("failing")
+    def failing():
+        raise KeyError("x")
+
+    with pytest.raises(KeyError):
+        failing()
+    # A trava é liberada mesmo após erro
+    assert profiling.profile_tool("after")(lambda: 1)() == 1
+
+
+def _profiled_functions(profile_dir):
+    import pstats
+
+    (report,) = [f for f in os.listdir(profile_dir) if f.endswith(".prof")]
+    return {func for _, _, func in pstats.Stats(str(profile_dir / report)).stats}
+
+
+def fetch_in_worker():
+    return sum(range(1000))
+
+
+def format_in_worker():
+    return "-".join(str(i) for i in range(100))
+
+
+def test_sub_calls_on_worker_threads_are_in_the_profile(profile_dir):
+    from fanout import gather
+
+    @profiling.profile_tool("composite")
+    def composite():
+        return gather(fetch_in_worker, format_in_worker)
+
+    assert composite() == [fetch_in_worker(), format_in_worker()]
+    functions = _profiled_functions(profile_dir)
+    assert {"fetch_in_worker", "format_in_worker", "composite"} <= functions
+
+
+def test_nested_fan_out_inside_gather_is_in_the_profile(profile_dir):
+    from fanout import fan_out, gather
+
+    @profiling.profile_tool("nested")
+    def nested():
+        return gather(lambda: fan_out(lambda inst: fetch_in_worker(), ["a", "b"]), format_in_worker)
+
+    nested()
+    assert {"fetch_in_worker", "format_in_worker"} <= _profiled_functions(profile_dir)
+
+
+def test_worker_threads_outside_profiled_calls_are_not_profiled(profile_dir):
+    from fanout import gather
+
+    profiling.configure(enabled=False)
+    assert gather(fetch_in_worker, format_in_worker)
+    assert profiling.propagate(fetch_in_worker) is fetch_in_worker
+    assert not os.listdir(profile_dir)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import evoapi_mcp  # noqa: E402
+from cache import get_cache  # noqa: E402
+from contact_controller import ContactController  # noqa: E402
+from fake_evolution import FakeData, FakeEvolutionServer  # noqa: E402
+from instance_config import InstanceConfig  # noqa: E402
+from message_sandeco import MessageSandeco  # noqa: E402
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = FakeEvolutionServer(FakeData(contacts=20, groups=1, messages_per_chat=0, media_ratio=0)).start()
+    for key, value in server.env().items():
+        monkeypatch.setenv(key, value)
+    for attr in ("_snapshot", "_env_file", "_env_stamp", "_next_check"):
+        monkeypatch.setattr(InstanceConfig, attr, getattr(InstanceConfig, attr))
+    InstanceConfig.reload()
+    get_cache("contacts").invalidate()
+    yield server
+    get_cache("contacts").invalidate()
+    server.stop()
+
+
+def _pair(sender, push_name):
+    return None, MessageSandeco(
+        {
+            "key": {"id": sender, "fromMe": False, "remoteJid": "1@g.us", "participant": sender},
+            "pushName": push_name,
+            "messageType": "conversation",
+            "message": {"conversation": "oi"},
+            "messageTimestamp": 1_750_000_000,
+        }
+    )
+
+
+SENDER = "5511900000003@s.whatsapp.net"
+
+
+def test_named_senders_do_not_download_the_directory(server):
+    names = evoapi_mcp._resolve_sender_names([_pair(SENDER, "Ana")], None)
+
+    assert names == {}
+    assert server.requests["chat/findContacts"] == 0
+
+
+def test_unnamed_sender_downloads_the_directory_once(server):
+    names = evoapi_mcp._resolve_sender_names([_pair(SENDER, "Ana"), _pair(SENDER.replace("3@", "4@"), None)], None)
+
+    assert set(names) == {SENDER, SENDER.replace("3@", "4@")}
+    assert server.requests["chat/findContacts"] == 1
+
+
+def test_cached_directory_is_used_without_requests(server):
+    ContactController().get_contacts()
+    server.reset_counters()
+
+    names = evoapi_mcp._resolve_sender_names([_pair(SENDER, "Ana")], None)
+
+    assert names[SENDER].endswith(" 3")
+    assert server.requests["chat/findContacts"] == 0
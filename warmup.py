@@ -0,0 +1,89 @@
+import sys
+import threading
+import time
+from typing import Optional
+
+from instance_config import InstanceConfig
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _warm_instance(instance_id: str, refresh: bool = False):
+    from contact_controller import ContactController
+    from fanout import gather
+    from group_controller import GroupController
+
+    gather(
+        lambda: ContactController(instance_id).fetch_contacts(refresh=refresh),
+        lambda: GroupController(instance_id).fetch_groups(refresh=refresh),
+    )
+
+
+def warm_up(refresh: bool = False):
+    """
+    Prefetches the contact directory and the group list of every configured
+    instance into the shared caches. A tool call made meanwhile joins the
+    in-flight request (see singleflight) instead of starting another download.
+
+    With `refresh`, cached entries (e.g. restored from a snapshot) are
+    downloaded again and replaced; until then they keep being served.
+    """
+    from fanout import fan_out
+
+    start = time.perf_counter()
+    instance_ids = [inst.id for inst in InstanceConfig.load_instances()]
+    for result in fan_out(lambda instance_id: _warm_instance(instance_id, refresh), instance_ids):
+        if result.error is not None:
+            print(f"Pré-carregamento da instância {result.instance_id} falhou: {result.error}", file=sys.stderr)
+    print(
+        f"Pré-carregamento de contatos e grupos concluído em {time.perf_counter() - start:.1f}s "
+        f"({len(instance_ids)} instâncias)",
+        file=sys.stderr,
+    )
+
+
+def is_enabled() -> bool:
+    return InstanceConfig.getenv("EVO_WARMUP", "0").lower() in ("1", "true", "yes", "on")
+
+
+def start_warmup(refresh: bool = False) -> Optional[threading.Thread]:
+    """
+    Runs `warm_up` in a daemon thread, at most once per process.
+
+    Disabled unless EVO_WARMUP=1: with the stdio transport every client session
+    launches a new server, and each launch would download every directory.
+    With `refresh` (caches restored from a snapshot) it runs anyway, to
+    revalidate them.
+    """
+    global _started
+    if not (refresh or is_enabled()):
+        return None
+    with _start_lock:
+        if _started:
+            return None
+        _started = True
+
+    def run():
+        try:
+            warm_up(refresh)
+        except Exception as e:
+            print(f"Pré-carregamento falhou: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=run, name="evo-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_after_initialize(server, refresh: bool = False):
+    """
+    Calls `start_warmup` when the first client completes the MCP handshake
+    (the `initialized` notification) on `server`, a FastMCP instance, so the
+    transport is up and initialize was answered before any download starts.
+    """
+    from mcp import types
+
+    async def on_initialized(notification):
+        start_warmup(refresh)
+
+    server._mcp_server.notification_handlers[types.InitializedNotification] = on_initialized
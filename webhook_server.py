@@ -0,0 +1,173 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import delivery_tracker
+import metrics
+from event_store import EventStore, get_store
+from instance_config import InstanceConfig
+from message_sandeco import MessageSandeco
+
+
+EVENT_MESSAGES_UPSERT = "messages.upsert"
+EVENT_MESSAGES_SET = "messages.set"
+EVENT_MESSAGES_UPDATE = "messages.update"
+EVENT_CONTACTS_SET = "contacts.set"
+EVENT_CONTACTS_UPSERT = "contacts.upsert"
+EVENT_CONTACTS_UPDATE = "contacts.update"
+EVENT_GROUPS_UPSERT = "groups.upsert"
+EVENT_GROUPS_UPDATE = "groups.update"
+EVENT_GROUP_UPDATE = "group.update"
+
+
+def _normalize_event(event: Optional[str]) -> str:
+    # Evolution envia "messages.upsert" no corpo e "MESSAGES_UPSERT" no modo webhook_by_events
+    return (event or "").strip().lower().replace("_", ".").replace("-", ".")
+
+
+def _as_list(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)]
+    if isinstance(data, dict):
+        # messages.set/contacts.set podem vir embrulhados em um objeto
+        for key in ("messages", "contacts", "groups"):
+            if isinstance(data.get(key), list):
+                return [item for item in data[key] if isinstance(item, dict)]
+        return [data]
+    return []
+
+
+class WebhookReceiver:
+    """Turns Evolution API webhook payloads into event store updates."""
+
+    def __init__(self, store: EventStore):
+        self.store = store
+        # Eventos anteriores a este receptor podem ter se perdido
+        self.store.reset_coverage()
+
+    def authorize(self, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Returns the instance id of the payload if it is configured and the
+        payload apikey matches the instance token, otherwise None.
+        """
+        instance = payload.get("instance")
+        if not instance:
+            return None
+        try:
+            creds = InstanceConfig.resolve_instance(instance)
+        except ValueError:
+            return None
+        if payload.get("apikey") != creds.token:
+            return None
+        return creds.id
+
+    def handle(self, payload: Dict[str, Any]) -> bool:
+        instance = self.authorize(payload)
+        if instance is None:
+            return False
+
+        event = _normalize_event(payload.get("event"))
+        records = _as_list(payload.get("data"))
+        self.store.mark_webhook_active(instance)
+
+        if event in (EVENT_MESSAGES_UPSERT, EVENT_MESSAGES_SET):
+            self.store.add_messages(instance, self._parse_messages(payload, records))
+            # Mensagens enviadas voltam pelo upsert já com o primeiro status
+            sent = [record for record in records if (record.get("key") or {}).get("fromMe")]
+            delivery_tracker.apply_events(instance, sent, self.store)
+        elif event == EVENT_MESSAGES_UPDATE:
+            delivery_tracker.apply_events(instance, records, self.store)
+        elif event in (EVENT_CONTACTS_SET, EVENT_CONTACTS_UPSERT, EVENT_CONTACTS_UPDATE):
+            self.store.upsert_contacts(instance, records)
+        elif event in (EVENT_GROUPS_UPSERT, EVENT_GROUPS_UPDATE, EVENT_GROUP_UPDATE):
+            self.store.upsert_groups(instance, records)
+
+        return True
+
+    def _parse_messages(self, payload: Dict[str, Any], records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        valid = []
+        for record in records:
+            try:
+                # MessageSandeco espera os metadados do webhook junto ao bloco da mensagem
+                MessageSandeco(
+                    {
+                        **record,
+                        "event": payload.get("event"),
+                        "instance": payload.get("instance"),
+                        "destination": payload.get("destination"),
+                        "date_time": payload.get("date_time"),
+                        "server_url": payload.get("server_url"),
+                    }
+                )
+            except Exception as e:
+                print(f"Mensagem de webhook ignorada: {e}", file=sys.stderr)
+                continue
+            valid.append(record)
+        return valid
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    receiver: WebhookReceiver = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "invalid json"})
+            return
+
+        if not isinstance(payload, dict) or not self.receiver.handle(payload):
+            self._reply(403, {"error": "unknown instance or invalid apikey"})
+            return
+
+        self._reply(200, {"status": "ok"})
+
+    def do_GET(self):
+        # Permite coletar as métricas pela mesma porta do webhook
+        if self.path.split("?")[0] != "/metrics":
+            self._reply(404, {"error": "not found"})
+            return
+        data = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", metrics.OPENMETRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # stdout é o canal do transporte stdio do MCP; não poluir
+        pass
+
+
+def start_webhook_server(
+    host: Optional[str] = None, port: Optional[int] = None, store: Optional[EventStore] = None
+) -> Optional[ThreadingHTTPServer]:
+    """
+    Starts the webhook receiver in a daemon thread.
+
+    Disabled unless a port is given or EVO_WEBHOOK_PORT is set.
+    """
+    if port is None:
+        port = InstanceConfig.getenv("EVO_WEBHOOK_PORT")
+        if not port:
+            return None
+
+    host = host or InstanceConfig.getenv("EVO_WEBHOOK_HOST", "0.0.0.0")
+    handler = type("WebhookHandler", (_WebhookHandler,), {"receiver": WebhookReceiver(store or get_store())})
+    server = ThreadingHTTPServer((host, int(port)), handler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(target=server.serve_forever, name="evo-webhook", daemon=True)
+    thread.start()
+    return server